@@ -1,29 +1,79 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Header, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.security import HTTPBearer
 from pydantic import BaseModel, EmailStr
 from users.users import create_user
-from authentication.authh import authenticate_user_detailed, create_access_token, get_current_user, update_last_login
-from users.profiles import get_therapist_profile, get_parent_profile, update_therapist_profile, update_parent_profile
+from authentication.authh import (
+    authenticate_user_detailed, create_access_token, decode_access_token, get_current_user, get_current_parent,
+    get_cached_user_by_email, invalidate_cached_user, update_last_login, revoke_access_token, ParentContext, ACCESS_TOKEN_EXPIRE_MINUTES,
+    issue_stream_ticket, redeem_stream_ticket, resolve_active_user, STREAM_TICKET_TTL_SECONDS
+)
+from authentication.tokens import issue_refresh_token, rotate_refresh_token, revoke_refresh_token, RefreshTokenError
+from authentication.throttle import login_throttle
+from authentication.passwords import get_password_rounds, run_password_work
+from users.bookkeeping import user_bookkeeping
+from users.profiles import get_therapist_profile, get_parent_profile, update_therapist_profile, update_parent_profile, parent_details_from_profile
 from students.students import get_all_students, get_student_by_id, get_students_by_therapist, enroll_student
-from notes.notes import get_notes_by_date_and_therapist, create_session_note, get_notes_with_dates_for_therapist, SessionNoteCreate, SessionNoteResponse
+from notes.notes import get_notes_by_date_and_therapist, get_note_summaries_by_date_and_therapist, get_note_by_id, get_notes_in_range_grouped, SessionNoteSummary, NotesForDate, MAX_NOTES_RANGE_DAYS, create_session_note, get_notes_with_dates_for_therapist, get_note_dates_for_month, SessionNoteCreate, SessionNoteResponse
 from sessions.sessions import (
-    create_session, get_sessions_by_therapist, get_session_by_id, update_session, delete_session,
-    get_completed_sessions_by_child_id, update_session_parent_feedback, get_session_for_parent_verification, SessionFeedbackCreate,
+    create_session, get_sessions_by_therapist, get_session_by_id, get_session_detail, update_session, update_session_minimal, delete_session,
+    get_completed_sessions_by_child_id, update_session_parent_feedback, SessionFeedbackCreate,
     add_activity_to_session, get_session_activities, get_available_student_activities, 
     remove_activity_from_session, SessionCreate, SessionUpdate, SessionResponse,
-    SessionActivityCreate, SessionActivityUpdate, SessionActivityResponse, StudentActivityResponse
+    SessionActivityCreate, SessionActivityUpdate, SessionActivityResponse, StudentActivityResponse,
+    SessionDetailResponse, SessionNotFound
 )
 # import psycopg2  # Commented out - using Supabase now
-from typing import Optional, List
-from datetime import timedelta, date
+from typing import Optional, List, Union
+from datetime import timedelta, date, datetime
+from notes.search import search_notes, NoteSearchResponse
+from notes.autosave import note_autosave, SessionNotePatch, SessionNotePatchResponse, NoteEditConflict
+from sessions.events import stream_session_events
+from users.dashboard import get_parent_dashboard, ParentDashboardResponse
+from sessions.digests import get_weekly_digests, start_digest_worker, stop_digest_worker, WeeklyDigest
+from db import PreconditionFailed, make_etag, parse_if_match, warm_up_supabase_client
+from contextlib import asynccontextmanager
+import asyncio
 import logging
+import math
+import os
+from timing import TimedJSONResponse, start_request_timings, log_request_summary
+from query_debug import QUERY_DEBUG, query_budget, check_request_queries
+from logging_config import configure_logging
+from metrics import HTTP_REQUESTS, HTTP_LATENCY, HTTP_IN_PROGRESS, render_metrics, mark_worker_dead
+import time
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
+# Set up logging (queued JSON output, see logging_config.py)
+configure_logging()
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="ThrivePath API", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Warm up before the worker accepts connections: settle the password hashing
+    cost (calibrated here unless BCRYPT_ROUNDS is set) and open the Supabase
+    connection. Then start the periodic parent digest refresh
+    (PARENT_DIGEST_INTERVAL=0 disables it) and the bookkeeping write-behind.
+    On shutdown, stop background jobs and write buffered note autosaves and
+    bookkeeping before the worker exits
+    """
+    await asyncio.gather(
+        asyncio.to_thread(get_password_rounds),
+        asyncio.to_thread(warm_up_supabase_client)
+    )
+    start_digest_worker()
+    user_bookkeeping.start()
+    try:
+        yield
+    finally:
+        await stop_digest_worker()
+        await note_autosave.flush_all()
+        await user_bookkeeping.stop()
+        mark_worker_dead(os.getpid())
+
+app = FastAPI(title="ThrivePath API", version="1.0.0", default_response_class=TimedJSONResponse, lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -31,8 +81,43 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Server-Timing"],
 )
 
+# Compress larger responses (full note bodies, session lists) on the wire
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
+@app.middleware("http")
+async def server_timing(request: Request, call_next):
+    """Time each request: Server-Timing header plus one structured summary log line"""
+    timings = start_request_timings()
+    response = await call_next(request)
+    
+    response.headers["Server-Timing"] = timings.server_timing_header()
+    route = request.scope.get("route")
+    log_request_summary(request.method, getattr(route, "path", request.url.path), response.status_code, timings)
+    if QUERY_DEBUG:
+        check_request_queries(request.method, route, request.url.path, timings)
+    return response
+
+@app.middleware("http")
+async def http_metrics(request: Request, call_next):
+    """Request count, latency and in-flight gauge for /metrics, labelled by route template"""
+    method = request.method
+    HTTP_IN_PROGRESS.labels(method).inc()
+    start = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        HTTP_IN_PROGRESS.labels(method).dec()
+        # Template, not the raw path, so ids do not explode the label set
+        route = getattr(request.scope.get("route"), "path", "unmatched")
+        HTTP_LATENCY.labels(method, route).observe(time.perf_counter() - start)
+        HTTP_REQUESTS.labels(method, route, str(status_code)).inc()
+
 class UserResponse(BaseModel):
     id: int
     email: str
@@ -50,6 +135,21 @@ class LoginResponse(BaseModel):
     access_token: str
     token_type: str
     user: UserResponse
+    refresh_token: Optional[str] = None
+    expires_in: Optional[int] = None  # Access token lifetime in seconds
+
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
+
+class TokenRefreshResponse(BaseModel):
+    access_token: str
+    token_type: str
+    refresh_token: str
+    expires_in: int
+
+class StreamTicketResponse(BaseModel):
+    ticket: str
+    expires_in: int
 
 class UserRegistration(BaseModel):
     firstName: str
@@ -134,22 +234,51 @@ class StudentEnrollment(BaseModel):
     goals: Optional[List[str]] = []
     therapistId: int
 
+def _set_etag(response: Response, updated_at) -> None:
+    etag = make_etag(updated_at)
+    if etag:
+        response.headers["ETag"] = etag
+
+def _precondition_failed(error: PreconditionFailed) -> HTTPException:
+    return HTTPException(
+        status_code=412,
+        detail=str(error),
+        headers={"ETag": error.etag} if error.etag else None
+    )
+
+def _access_token_for(user: dict) -> str:
+    return create_access_token(
+        data={
+            "sub": str(user["id"]),  # Convert to string for JWT
+            "email": user["email"],
+            "role": user["role"]
+        }
+    )
+
 @app.post("/api/login", response_model=LoginResponse)
-async def login_user(user_credentials: UserLogin):
+@query_budget(4)
+async def login_user(user_credentials: UserLogin, request: Request):
     """
     Login user and return JWT token
     """
     try:
+        # Turn away throttled clients before any user lookup or password hashing
+        client_ip = request.client.host if request.client else "unknown"
+        retry_after = login_throttle.check(client_ip, user_credentials.email)
+        if retry_after:
+            raise HTTPException(
+                status_code=429,
+                detail="Too many login attempts. Please try again later.",
+                headers={"Retry-After": str(math.ceil(retry_after))}
+            )
+        
         # Authenticate user with detailed error messages
-        user, error_message = authenticate_user_detailed(user_credentials.email, user_credentials.password)
+        user, error_message = await run_password_work(authenticate_user_detailed, user_credentials.email, user_credentials.password)
         
         if not user:
-            if error_message == "User not found":
-                raise HTTPException(
-                    status_code=404,
-                    detail="User not found. Please check your email or register for a new account."
-                )
-            elif error_message == "Invalid password":
+            if error_message in ("User not found", "Invalid password"):
+                # Same response for unknown emails and wrong passwords
+                login_throttle.record_failure(client_ip, user_credentials.email)
                 raise HTTPException(
                     status_code=401,
                     detail="Invalid email or password. Please check your credentials."
@@ -165,21 +294,20 @@ async def login_user(user_credentials: UserLogin):
                     detail="Authentication failed"
                 )
         
+        login_throttle.record_success(client_ip, user_credentials.email)
+        
         # Update last login
         update_last_login(user["id"])
         
         # Create access token
-        access_token = create_access_token(
-            data={
-                "sub": str(user["id"]),  # Convert to string for JWT
-                "email": user["email"], 
-                "role": user["role"]
-            }
-        )
+        access_token = _access_token_for(user)
+        refresh_token = issue_refresh_token(user["id"])
         
         return LoginResponse(
             access_token=access_token,
             token_type="bearer",
+            refresh_token=refresh_token,
+            expires_in=ACCESS_TOKEN_EXPIRE_MINUTES * 60,
             user=UserResponse(
                 id=user["id"],
                 email=user["email"],
@@ -193,10 +321,48 @@ async def login_user(user_credentials: UserLogin):
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Login error: {e}")
-        logger.error(f"User data: {user}")
+        logger.error("Login error: %s", e)
+        logger.error("User data: %s", user)
         raise HTTPException(status_code=500, detail=f"Login failed: {str(e)}")
 
+@app.post("/api/token/refresh", response_model=TokenRefreshResponse)
+async def refresh_access_token(request_data: RefreshTokenRequest):
+    """
+    Exchange a refresh token for a new access token and a new refresh token
+    No password check is involved; the presented refresh token is consumed
+    """
+    try:
+        user, refresh_token = rotate_refresh_token(request_data.refresh_token)
+        
+        return TokenRefreshResponse(
+            access_token=_access_token_for(user),
+            token_type="bearer",
+            refresh_token=refresh_token,
+            expires_in=ACCESS_TOKEN_EXPIRE_MINUTES * 60
+        )
+        
+    except RefreshTokenError as e:
+        raise HTTPException(status_code=401, detail=str(e), headers={"WWW-Authenticate": "Bearer"})
+    except Exception as e:
+        logger.error("Token refresh error: %s", e)
+        raise HTTPException(status_code=500, detail="Failed to refresh token")
+
+@app.post("/api/logout", status_code=204)
+async def logout_user(request_data: RefreshTokenRequest, authorization: Optional[str] = Header(None)):
+    """
+    Revoke the refresh token (and its rotation family) so it can no longer be used
+    A Bearer access token sent along is rejected from then on as well
+    """
+    try:
+        revoke_refresh_token(request_data.refresh_token)
+        if authorization and authorization.lower().startswith("bearer "):
+            revoke_access_token(authorization[7:].strip())
+        return Response(status_code=204)
+        
+    except Exception as e:
+        logger.error("Logout error: %s", e)
+        raise HTTPException(status_code=500, detail="Failed to log out")
+
 @app.post("/api/register", response_model=UserResponse)
 async def register_user(user_data: UserRegistration):
     """
@@ -208,7 +374,8 @@ async def register_user(user_data: UserRegistration):
             raise HTTPException(status_code=400, detail="Invalid role. Must be 'therapist' or 'parent'")
         
         # Create user in database with profile data
-        new_user = create_user(
+        new_user = await run_password_work(
+            create_user,
             email=user_data.email,
             password=user_data.password,
             role=user_data.role,
@@ -255,7 +422,7 @@ async def register_user(user_data: UserRegistration):
             raise HTTPException(status_code=400, detail="Email already exists")
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        logger.error(f"Registration error: {e}")
+        logger.error("Registration error: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @app.get("/api/me", response_model=UserResponse)
@@ -289,15 +456,17 @@ async def get_current_user_info(current_user: dict = Depends(get_current_user)):
     )
 
 @app.get("/api/profile")
-async def get_user_profile(current_user: dict = Depends(get_current_user)):
+async def get_user_profile(response: Response, current_user: dict = Depends(get_current_user)):
     """
     Get current user's profile information
+    The ETag header carries the profile version to send back as If-Match on update
     """
     try:
         if current_user["role"] == "therapist":
             profile = get_therapist_profile(current_user["id"])
             if not profile:
                 raise HTTPException(status_code=404, detail="Therapist profile not found")
+            _set_etag(response, profile.get("updated_at"))
             return TherapistProfile(**{
                 **profile,
                 "created_at": str(profile.get("created_at", ""))
@@ -306,51 +475,99 @@ async def get_user_profile(current_user: dict = Depends(get_current_user)):
             profile = get_parent_profile(current_user["id"])
             if not profile:
                 raise HTTPException(status_code=404, detail="Parent profile not found")
+            _set_etag(response, profile.get("updated_at"))
             return ParentProfile(**{
                 **profile,
                 "created_at": str(profile.get("created_at", ""))
             })
         else:
             raise HTTPException(status_code=400, detail="Invalid user role")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail="Failed to get profile")
 
 @app.put("/api/profile")
 async def update_user_profile(
     profile_data: ProfileUpdateRequest,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     current_user: dict = Depends(get_current_user)
 ):
     """
     Update current user's profile information
+    With an If-Match header the update only applies if the profile is unchanged (412 otherwise)
     """
     try:
         update_data = profile_data.dict(exclude_unset=True)
+        expected_version = parse_if_match(if_match)
         
         if current_user["role"] == "therapist":
-            updated_profile = update_therapist_profile(current_user["id"], **update_data)
+            updated_profile = update_therapist_profile(current_user["id"], if_match=expected_version, **update_data)
             if not updated_profile:
                 raise HTTPException(status_code=404, detail="Therapist profile not found")
+            invalidate_cached_user(current_user["email"])
+            _set_etag(response, updated_profile.get("updated_at"))
             return TherapistProfile(**{
                 **updated_profile,
                 "created_at": str(updated_profile.get("created_at", ""))
             })
         elif current_user["role"] == "parent":
-            updated_profile = update_parent_profile(current_user["id"], **update_data)
+            updated_profile = update_parent_profile(current_user["id"], if_match=expected_version, **update_data)
             if not updated_profile:
                 raise HTTPException(status_code=404, detail="Parent profile not found")
+            invalidate_cached_user(current_user["email"])
+            _set_etag(response, updated_profile.get("updated_at"))
             return ParentProfile(**{
                 **updated_profile,
                 "created_at": str(updated_profile.get("created_at", ""))
             })
         else:
             raise HTTPException(status_code=400, detail="Invalid user role")
+    except HTTPException:
+        raise
+    except PreconditionFailed as e:
+        raise _precondition_failed(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail="Failed to update profile")
 
+@app.get("/api/parent/dashboard", response_model=ParentDashboardResponse)
+@query_budget(5)
+async def get_parent_dashboard_route(parent: ParentContext = Depends(get_current_parent)):
+    """
+    Parent details, child profile, recent completed sessions and the number
+    of sessions awaiting feedback in a single response
+    """
+    try:
+        return await get_parent_dashboard(parent.profile)
+        
+    except Exception as e:
+        logger.error("Error getting parent dashboard for user %s: %s", parent.user['id'], e)
+        raise HTTPException(status_code=500, detail="Failed to get parent dashboard")
+
+@app.get("/api/parent/digests", response_model=List[WeeklyDigest])
+@query_budget(3)
+async def get_parent_digests(weeks: int = Query(4, ge=1, le=52), parent: ParentContext = Depends(get_current_parent)):
+    """
+    Precomputed weekly progress digests for the parent's child, newest week first
+    Digests are refreshed in the background from changed sessions
+    """
+    try:
+        if not parent.child_id:
+            raise HTTPException(status_code=404, detail="No child associated with this parent account")
+        
+        return await get_weekly_digests(parent.child_id, weeks)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Error getting weekly digests for user %s: %s", parent.user['id'], e)
+        raise HTTPException(status_code=500, detail="Failed to get progress digests")
+
 @app.get("/api/parent-details/{user_id}")
 async def get_parent_details_by_id(
     user_id: int,
-    current_user: dict = Depends(get_current_user)
+    parent: ParentContext = Depends(get_current_parent)
 ):
     """
     Get parent details by user ID
@@ -358,40 +575,15 @@ async def get_parent_details_by_id(
     """
     try:
         # Ensure the requesting user can only access their own details
-        if current_user["role"] != "parent" or current_user["id"] != user_id:
+        if parent.user["id"] != user_id:
             raise HTTPException(status_code=403, detail="Access denied. You can only access your own details.")
         
-        profile = get_parent_profile(user_id)
-        if not profile:
-            raise HTTPException(status_code=404, detail="Parent profile not found")
-        
-        return {
-            "id": profile.get("id"),
-            "user_id": profile.get("user_id"),
-            "parent_first_name": profile.get("parent_first_name"),
-            "parent_last_name": profile.get("parent_last_name"),
-            "child_first_name": profile.get("child_first_name"),
-            "child_last_name": profile.get("child_last_name"),
-            "child_dob": profile.get("child_dob"),
-            "child_id": profile.get("child_id"),  # Return child_id from parent profile
-            "email": profile.get("email"),
-            "phone": profile.get("phone"),
-            "alternate_phone": profile.get("alternate_phone"),
-            "address_line1": profile.get("address_line1"),
-            "address_line2": profile.get("address_line2"),
-            "city": profile.get("city"),
-            "state": profile.get("state"),
-            "postal_code": profile.get("postal_code"),
-            "country": profile.get("country"),
-            "relation_to_child": profile.get("relation_to_child"),
-            "is_verified": profile.get("is_verified"),
-            "created_at": str(profile.get("created_at", ""))
-        }
+        return parent_details_from_profile(parent.profile)
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error getting parent details for user {user_id}: {e}")
+        logger.error("Error getting parent details for user %s: %s", user_id, e)
         raise HTTPException(status_code=500, detail="Failed to get parent details")
 
 @app.post("/api/verify-child")
@@ -428,7 +620,7 @@ async def verify_child_details(child_data: dict):
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error verifying child: {e}")
+        logger.error("Error verifying child: %s", e)
         raise HTTPException(status_code=500, detail="Failed to verify child details")
 
 @app.get("/api/children/{child_id}")
@@ -451,8 +643,8 @@ async def get_child_by_id(
         
         # If user is parent, verify they have access to this child
         elif current_user["role"] == "parent":
-            # Get parent profile to check child_id
-            parent_profile = get_parent_profile(current_user["id"])
+            # Use the parent profile get_current_user already loaded
+            parent_profile = current_user.get("profile") or get_parent_profile(current_user["id"])
             if not parent_profile:
                 raise HTTPException(status_code=404, detail="Parent profile not found")
             
@@ -477,7 +669,7 @@ async def get_child_by_id(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error fetching child {child_id}: {e}")
+        logger.error("Error fetching child %s: %s", child_id, e)
         raise HTTPException(status_code=500, detail="Failed to fetch child details")
 
 @app.get("/api/test-auth")
@@ -501,7 +693,7 @@ async def get_all_students_route(current_user: dict = Depends(get_current_user))
         return [StudentResponse(**student) for student in students]
         
     except Exception as e:
-        logger.error(f"Error fetching all students: {e}")
+        logger.error("Error fetching all students: %s", e)
         raise HTTPException(status_code=500, detail="Failed to fetch students")
 
 @app.get("/api/students/{student_id}", response_model=StudentResponse)
@@ -530,7 +722,7 @@ async def get_student_route(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error fetching student {student_id}: {e}")
+        logger.error("Error fetching student %s: %s", student_id, e)
         raise HTTPException(status_code=500, detail="Failed to fetch student")
 
 @app.get("/api/my-students", response_model=List[StudentResponse])
@@ -553,7 +745,7 @@ async def get_my_students_route(current_user: dict = Depends(get_current_user)):
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error fetching students for therapist {current_user['id']}: {e}")
+        logger.error("Error fetching students for therapist %s: %s", current_user['id'], e)
         raise HTTPException(status_code=500, detail="Failed to fetch assigned students")
 
 @app.post("/api/enroll-student", response_model=StudentResponse)
@@ -573,22 +765,101 @@ async def enroll_student_route(
         return StudentResponse(**student)
         
     except Exception as e:
-        logger.error(f"Error enrolling student: {e}")
+        logger.error("Error enrolling student: %s", e)
         raise HTTPException(status_code=500, detail="Failed to enroll student")
 
 # ==================== SESSION NOTES ENDPOINTS ====================
 
-@app.get("/api/notes/{session_date}", response_model=List[SessionNoteResponse])
-async def get_notes_by_date(session_date: date, current_user: dict = Depends(get_current_user)):
-    """Get all session notes for the current therapist on a specific date"""
+@app.get("/api/notes", response_model=List[NotesForDate])
+async def get_notes_in_range(
+    date_from: date = Query(..., alias="from"),
+    date_to: date = Query(..., alias="to"),
+    view: str = "summary",
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Get the current therapist's notes between two dates (inclusive), grouped by date
+    Returns summaries by default; ?view=full includes note bodies
+    """
+    if view not in ("full", "summary"):
+        raise HTTPException(status_code=400, detail="view must be 'full' or 'summary'")
+    if date_to < date_from:
+        raise HTTPException(status_code=400, detail="'to' must not be before 'from'")
+    if (date_to - date_from).days >= MAX_NOTES_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail=f"Date range cannot exceed {MAX_NOTES_RANGE_DAYS} days")
+    
+    try:
+        therapist_id = current_user['id']
+        return await get_notes_in_range_grouped(therapist_id, date_from, date_to, include_content=(view == "full"))
+    except Exception as e:
+        logger.error("Error fetching notes from %s to %s: %s", date_from, date_to, e)
+        raise HTTPException(status_code=500, detail="Failed to fetch notes")
+
+@app.get("/api/notes/search", response_model=NoteSearchResponse)
+async def search_notes_route(q: str, limit: int = 20, offset: int = 0, current_user: dict = Depends(get_current_user)):
+    """Full-text search over the current therapist's notes, ranked with highlighted snippets"""
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="Search query must not be empty")
+    if limit < 1 or limit > 100 or offset < 0:
+        raise HTTPException(status_code=400, detail="limit must be 1-100 and offset non-negative")
+    
+    try:
+        therapist_id = current_user['id']
+        return await search_notes(therapist_id, q.strip(), limit, offset)
+    except Exception as e:
+        logger.error("Error searching notes: %s", e)
+        raise HTTPException(status_code=500, detail="Failed to search notes")
+
+@app.get("/api/notes/dates", response_model=List[str])
+async def get_notes_dates_for_month(month: str, current_user: dict = Depends(get_current_user)):
+    """Get the dates in a month (?month=YYYY-MM) that have notes for the current therapist"""
+    try:
+        month_start = datetime.strptime(month, "%Y-%m").date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="month must be in YYYY-MM format")
+    
+    try:
+        therapist_id = current_user['id']
+        dates = await get_note_dates_for_month(therapist_id, month_start.year, month_start.month)
+        return [d.isoformat() for d in dates]
+    except Exception as e:
+        logger.error("Error fetching notes dates for %s: %s", month, e)
+        raise HTTPException(status_code=500, detail="Failed to fetch notes dates")
+
+@app.get("/api/notes/{session_date}", response_model=Union[List[SessionNoteSummary], List[SessionNoteResponse]])
+async def get_notes_by_date(session_date: date, view: str = "full", current_user: dict = Depends(get_current_user)):
+    """
+    Get all session notes for the current therapist on a specific date
+    ?view=summary returns id, title, time, length and a preview only; fetch bodies from /api/notes/{notes_id}/content
+    """
+    if view not in ("full", "summary"):
+        raise HTTPException(status_code=400, detail="view must be 'full' or 'summary'")
+    
     try:
         therapist_id = current_user['id']
+        if view == "summary":
+            return await get_note_summaries_by_date_and_therapist(therapist_id, session_date)
         notes = await get_notes_by_date_and_therapist(therapist_id, session_date)
         return notes
     except Exception as e:
-        logger.error(f"Error fetching notes for date {session_date}: {e}")
+        logger.error("Error fetching notes for date %s: %s", session_date, e)
         raise HTTPException(status_code=500, detail="Failed to fetch notes")
 
+@app.get("/api/notes/{notes_id}/content", response_model=SessionNoteResponse)
+async def get_note_content(notes_id: int, current_user: dict = Depends(get_current_user)):
+    """Get a single session note including its full body"""
+    try:
+        therapist_id = current_user['id']
+        note = await get_note_by_id(therapist_id, notes_id)
+        if not note:
+            raise HTTPException(status_code=404, detail="Note not found")
+        return note
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Error fetching note %s: %s", notes_id, e)
+        raise HTTPException(status_code=500, detail="Failed to fetch note")
+
 @app.post("/api/notes", response_model=SessionNoteResponse)
 async def create_note(note_data: SessionNoteCreate, current_user: dict = Depends(get_current_user)):
     """Create a new session note"""
@@ -597,9 +868,31 @@ async def create_note(note_data: SessionNoteCreate, current_user: dict = Depends
         note = await create_session_note(therapist_id, note_data)
         return note
     except Exception as e:
-        logger.error(f"Error creating note: {e}")
+        logger.error("Error creating note: %s", e)
         raise HTTPException(status_code=500, detail="Failed to create note")
 
+@app.patch("/api/notes/{notes_id}", response_model=SessionNotePatchResponse)
+async def patch_note(notes_id: int, patch: SessionNotePatch, flush: bool = False, current_user: dict = Depends(get_current_user)):
+    """
+    Edit a session note with a full replacement (note_content) or text edits (edits)
+    Rapid autosaves are buffered and written once per interval; pass ?flush=true to write immediately
+    """
+    try:
+        therapist_id = current_user['id']
+        note = await note_autosave.apply(notes_id, therapist_id, patch, flush_now=flush)
+        if not note:
+            raise HTTPException(status_code=404, detail="Note not found")
+        return note
+    except HTTPException:
+        raise
+    except NoteEditConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error("Error updating note %s: %s", notes_id, e)
+        raise HTTPException(status_code=500, detail="Failed to update note")
+
 @app.get("/api/notes/dates/all", response_model=List[str])
 async def get_notes_dates(current_user: dict = Depends(get_current_user)):
     """Get all dates that have notes for the current therapist (for calendar highlighting)"""
@@ -609,12 +902,13 @@ async def get_notes_dates(current_user: dict = Depends(get_current_user)):
         # Convert dates to strings for JSON serialization
         return [d.isoformat() for d in dates]
     except Exception as e:
-        logger.error(f"Error fetching notes dates: {e}")
+        logger.error("Error fetching notes dates: %s", e)
         raise HTTPException(status_code=500, detail="Failed to fetch notes dates")
 
 # ============ SESSIONS ENDPOINTS ============
 
 @app.post("/api/sessions", response_model=SessionResponse)
+@query_budget(5)
 async def create_session_endpoint(session_data: SessionCreate, current_user: dict = Depends(get_current_user)):
     """Create a new therapy session"""
     try:
@@ -622,7 +916,7 @@ async def create_session_endpoint(session_data: SessionCreate, current_user: dic
         session = await create_session(therapist_id, session_data)
         return session
     except Exception as e:
-        logger.error(f"Error creating session: {e}")
+        logger.error("Error creating session: %s", e)
         raise HTTPException(status_code=500, detail="Failed to create session")
 
 @app.get("/api/sessions", response_model=List[SessionResponse])
@@ -633,105 +927,152 @@ async def get_sessions(limit: int = 50, offset: int = 0, current_user: dict = De
         sessions = await get_sessions_by_therapist(therapist_id, limit, offset)
         return sessions
     except Exception as e:
-        logger.error(f"Error fetching sessions: {e}")
+        logger.error("Error fetching sessions: %s", e)
         raise HTTPException(status_code=500, detail="Failed to fetch sessions")
 
+@app.post("/api/sessions/stream-ticket", response_model=StreamTicketResponse)
+async def create_stream_ticket(current_user: dict = Depends(get_current_user)):
+    """Single-use ticket for opening /api/sessions/stream from an EventSource"""
+    if current_user["role"] != "therapist":
+        raise HTTPException(status_code=403, detail="Access denied. Only therapists can subscribe to session events.")
+    return StreamTicketResponse(
+        ticket=issue_stream_ticket(current_user["email"]),
+        expires_in=math.ceil(STREAM_TICKET_TTL_SECONDS)
+    )
+
+@app.get("/api/sessions/stream")
+async def stream_sessions(request: Request, ticket: Optional[str] = None):
+    """
+    Server-sent events feed of the current therapist's session and activity changes
+    EventSource cannot set headers, so browsers pass a single-use ?ticket= from
+    POST /api/sessions/stream-ticket; other clients may send the bearer token
+    """
+    authorization = request.headers.get("Authorization", "")
+    if authorization.lower().startswith("bearer "):
+        email = decode_access_token(authorization[7:])["email"]
+    elif ticket:
+        email = redeem_stream_ticket(ticket)
+        if email is None:
+            raise HTTPException(status_code=401, detail="Invalid or expired stream ticket")
+    else:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    
+    current_user = resolve_active_user(email)
+    if current_user["role"] != "therapist":
+        raise HTTPException(status_code=403, detail="Access denied. Only therapists can subscribe to session events.")
+    
+    async def still_active() -> bool:
+        user = await asyncio.to_thread(get_cached_user_by_email, email)
+        return bool(user and user.get("is_active", True))
+    
+    return StreamingResponse(
+        stream_session_events(current_user["id"], request.is_disconnected, still_active),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.get("/api/parent-sessions")
-async def get_parent_sessions(limit: int = 50, offset: int = 0, current_user: dict = Depends(get_current_user)):
-    """Get completed sessions for parent's child"""
+@query_budget(3)
+async def get_parent_sessions(limit: int = 50, offset: int = 0, include: Optional[str] = None, parent: ParentContext = Depends(get_current_parent)):
+    """
+    Get completed sessions for parent's child
+    ?include=notes embeds each session's linked notes
+    """
     try:
-        # Ensure user is a parent
-        if current_user.get('role') != 'parent':
-            raise HTTPException(status_code=403, detail="Access denied. Only parents can access this endpoint.")
-        
-        # Get parent profile to find child_id
-        parent_profile = get_parent_profile(current_user['id'])
-        if not parent_profile:
-            raise HTTPException(status_code=404, detail="Parent profile not found")
-        
-        child_id = parent_profile.get('child_id')
+        child_id = parent.child_id
         if not child_id:
             raise HTTPException(status_code=404, detail="No child associated with this parent account")
         
         # Fetch completed sessions for the child
-        sessions = await get_completed_sessions_by_child_id(child_id, limit, offset)
+        include_notes = bool(include) and 'notes' in [part.strip() for part in include.split(',')]
+        sessions = await get_completed_sessions_by_child_id(child_id, limit, offset, include_notes=include_notes)
         return sessions
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error fetching parent sessions: {e}")
+        logger.error("Error fetching parent sessions: %s", e)
         raise HTTPException(status_code=500, detail="Failed to fetch sessions")
 
 @app.post("/api/session-feedback")
-async def submit_session_feedback(feedback_data: SessionFeedbackCreate, current_user: dict = Depends(get_current_user)):
+async def submit_session_feedback(feedback_data: SessionFeedbackCreate, parent: ParentContext = Depends(get_current_parent)):
     """Submit or update parent feedback for a session"""
     try:
-        # Ensure user is a parent
-        if current_user.get('role') != 'parent':
-            raise HTTPException(status_code=403, detail="Access denied. Only parents can submit feedback.")
-        
-        # Get parent profile to verify they own the session
-        parent_profile = get_parent_profile(current_user['id'])
-        if not parent_profile:
-            raise HTTPException(status_code=404, detail="Parent profile not found")
-        
-        child_id = parent_profile.get('child_id')
+        child_id = parent.child_id
         if not child_id:
             raise HTTPException(status_code=404, detail="No child associated with this parent account")
         
-        # Verify the session belongs to this parent's child
-        session = await get_session_for_parent_verification(feedback_data.session_id)
-        if not session:
-            raise HTTPException(status_code=404, detail="Session not found")
-            
-        # Check if session belongs to parent's child (using child_id from sessions table)
-        session_child_id = session.get('child_id')
-        if session_child_id != child_id:
-            raise HTTPException(status_code=403, detail="You can only provide feedback for your child's sessions")
-        
-        # Update the session with parent feedback
-        success = await update_session_parent_feedback(feedback_data.session_id, feedback_data.feedback)
+        # One conditional write: only a completed session of this parent's child matches
+        success = await update_session_parent_feedback(feedback_data.session_id, child_id, feedback_data.feedback)
         
         if success:
             return {"message": "Feedback submitted successfully", "session_id": feedback_data.session_id}
         else:
-            raise HTTPException(status_code=500, detail="Failed to submit feedback")
+            raise HTTPException(status_code=404, detail="No completed session found for your child with this ID")
             
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error submitting session feedback: {e}")
+        logger.error("Error submitting session feedback: %s", e)
         raise HTTPException(status_code=500, detail="Failed to submit feedback")
 
-@app.get("/api/sessions/{session_id}", response_model=SessionResponse)
-async def get_session(session_id: int, current_user: dict = Depends(get_current_user)):
-    """Get a specific session by ID"""
+@app.get("/api/sessions/{session_id}", response_model=SessionDetailResponse)
+async def get_session(session_id: int, response: Response, include: Optional[str] = None, current_user: dict = Depends(get_current_user)):
+    """
+    Get a specific session by ID
+    Optional ?include=activities,available_activities,notes embeds the session's planned
+    activities, the student's available activities and the linked notes in the same response
+    """
     try:
         therapist_id = current_user['id']
-        session = await get_session_by_id(session_id, therapist_id)
+        includes = {part.strip() for part in include.split(',') if part.strip()} if include else set()
+        session = await get_session_detail(session_id, therapist_id, includes)
         if not session:
             raise HTTPException(status_code=404, detail="Session not found")
+        _set_etag(response, session.updated_at)
         return session
     except HTTPException:
         raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        logger.error(f"Error fetching session {session_id}: {e}")
+        logger.error("Error fetching session %s: %s", session_id, e)
         raise HTTPException(status_code=500, detail="Failed to fetch session")
 
 @app.put("/api/sessions/{session_id}", response_model=SessionResponse)
-async def update_session_endpoint(session_id: int, session_data: SessionUpdate, current_user: dict = Depends(get_current_user)):
-    """Update a session"""
+async def update_session_endpoint(
+    session_id: int,
+    session_data: SessionUpdate,
+    response: Response,
+    prefer: Optional[str] = Header(None),
+    if_match: Optional[str] = Header(None),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Update a session
+    Send 'Prefer: return=minimal' to get a bare 204 acknowledgment instead of the updated session
+    Send 'If-Match: <ETag>' to only apply the update if the session is unchanged (412 otherwise)
+    """
     try:
         therapist_id = current_user['id']
-        session = await update_session(session_id, therapist_id, session_data)
+        expected_version = parse_if_match(if_match)
+        if prefer and 'return=minimal' in prefer:
+            version = await update_session_minimal(session_id, therapist_id, session_data, if_match=expected_version)
+            if not version:
+                raise HTTPException(status_code=404, detail="Session not found")
+            return Response(status_code=204, headers={"Preference-Applied": "return=minimal", "ETag": make_etag(version)})
+        
+        session = await update_session(session_id, therapist_id, session_data, if_match=expected_version)
         if not session:
             raise HTTPException(status_code=404, detail="Session not found")
+        _set_etag(response, session.updated_at)
         return session
     except HTTPException:
         raise
+    except PreconditionFailed as e:
+        raise _precondition_failed(e)
     except Exception as e:
-        logger.error(f"Error updating session {session_id}: {e}")
+        logger.error("Error updating session %s: %s", session_id, e)
         raise HTTPException(status_code=500, detail="Failed to update session")
 
 @app.delete("/api/sessions/{session_id}")
@@ -746,20 +1087,23 @@ async def delete_session_endpoint(session_id: int, current_user: dict = Depends(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error deleting session {session_id}: {e}")
+        logger.error("Error deleting session %s: %s", session_id, e)
         raise HTTPException(status_code=500, detail="Failed to delete session")
 
 # ============ SESSION ACTIVITIES ENDPOINTS ============
 
 @app.post("/api/sessions/{session_id}/activities", response_model=SessionActivityResponse)
+@query_budget(5)
 async def add_activity_to_session_endpoint(session_id: int, activity_data: SessionActivityCreate, current_user: dict = Depends(get_current_user)):
     """Add an activity to a session"""
     try:
         therapist_id = current_user['id']
         activity = await add_activity_to_session(session_id, therapist_id, activity_data)
         return activity
+    except SessionNotFound:
+        raise HTTPException(status_code=404, detail="Session not found")
     except Exception as e:
-        logger.error(f"Error adding activity to session {session_id}: {e}")
+        logger.error("Error adding activity to session %s: %s", session_id, e)
         raise HTTPException(status_code=500, detail="Failed to add activity to session")
 
 @app.get("/api/sessions/{session_id}/activities", response_model=List[SessionActivityResponse])
@@ -769,8 +1113,10 @@ async def get_session_activities_endpoint(session_id: int, current_user: dict =
         therapist_id = current_user['id']
         activities = await get_session_activities(session_id, therapist_id)
         return activities
+    except SessionNotFound:
+        raise HTTPException(status_code=404, detail="Session not found")
     except Exception as e:
-        logger.error(f"Error fetching activities for session {session_id}: {e}")
+        logger.error("Error fetching activities for session %s: %s", session_id, e)
         raise HTTPException(status_code=500, detail="Failed to fetch session activities")
 
 @app.get("/api/students/{student_id}/activities", response_model=List[StudentActivityResponse])
@@ -780,7 +1126,7 @@ async def get_student_activities_endpoint(student_id: int, current_user: dict =
         activities = await get_available_student_activities(student_id)
         return activities
     except Exception as e:
-        logger.error(f"Error fetching activities for student {student_id}: {e}")
+        logger.error("Error fetching activities for student %s: %s", student_id, e)
         raise HTTPException(status_code=500, detail="Failed to fetch student activities")
 
 @app.delete("/api/sessions/{session_id}/activities/{activity_id}")
@@ -794,12 +1140,20 @@ async def remove_activity_from_session_endpoint(session_id: int, activity_id: in
         return {"message": "Activity removed from session successfully"}
     except HTTPException:
         raise
+    except SessionNotFound:
+        raise HTTPException(status_code=404, detail="Session not found")
     except Exception as e:
-        logger.error(f"Error removing activity {activity_id} from session {session_id}: {e}")
+        logger.error("Error removing activity %s from session %s: %s", activity_id, session_id, e)
         raise HTTPException(status_code=500, detail="Failed to remove activity from session")
 
 # ==================== ROOT ENDPOINTS ====================
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint"""
+    content, media_type = render_metrics()
+    return Response(content=content, media_type=media_type)
+
 @app.get("/")
 async def root():
     return {"message": "ThrivePath API is running", "status": "healthy"}
@@ -845,6 +1199,7 @@ async def test_supabase_client():
         return {"status": "error", "message": f"Supabase client test failed: {str(e)}"}
 
 if __name__ == "__main__":
+    # Development server; production runs through serve.py
     import uvicorn
     print("Starting ThrivePath API server...")
     uvicorn.run(
@@ -53,7 +53,7 @@ def get_user_by_email(email: str) -> Optional[Dict[str, Any]]:
         
         return user
     except Exception as e:
-        logger.error(f"Error getting user by email {email}: {e}")
+        logger.error("Error getting user by email %s: %s", email, e)
         return None
 
 # COMMENTED OUT: Direct PostgreSQL version (keeping for reference)
@@ -165,9 +165,9 @@ def update_last_login(user_id: int):
         }).eq('id', user_id).execute()
         
         handle_supabase_error(response)
-        logger.info(f"Updated last login for user {user_id}")
+        logger.info("Updated last login for user %s", user_id)
     except Exception as e:
-        logger.error(f"Error updating last login for user {user_id}: {e}")
+        logger.error("Error updating last login for user %s: %s", user_id, e)
 
 # COMMENTED OUT: Direct PostgreSQL version (keeping for reference)
 # def update_last_login(user_id: int):
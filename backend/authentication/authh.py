@@ -1,7 +1,11 @@
 import os
-import bcrypt
+import hashlib
+import secrets
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 import jwt
 from jwt import PyJWTError
 from fastapi import HTTPException, status, Depends
@@ -11,6 +15,11 @@ from db import get_supabase_client, format_supabase_response, handle_supabase_er
 # import psycopg2
 from dotenv import load_dotenv
 from users.profiles import get_therapist_profile, get_parent_profile
+from authentication.passwords import verify_password, hash_password, needs_rehash
+from users.bookkeeping import user_bookkeeping
+from timing import timed
+from metrics import record_cache_lookup
+from pydantic import BaseModel
 import logging
 
 logger = logging.getLogger(__name__)
@@ -20,12 +29,70 @@ load_dotenv()
 # JWT Configuration
 SECRET_KEY = os.getenv("JWT_SECRET_KEY")
 ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
-ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("JWT_ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+# Access tokens are short-lived; clients renew them with a refresh token (authentication/tokens.py)
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("JWT_ACCESS_TOKEN_EXPIRE_MINUTES", "15"))
 
 security = HTTPBearer()
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+# Short-lived per-worker cache of users (with profile) resolved for authenticated requests
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "30"))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+_user_cache: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+_user_cache_lock = threading.Lock()
+
+# Per-worker cache of decoded access tokens: sha256(token) -> (exp, identity).
+# Only tokens whose signature verified are stored, and each entry stops being
+# served the second its token expires. TOKEN_CACHE_SIZE=0 disables it.
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+_token_cache: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+# Access tokens revoked before expiry (logout), in this worker: sha256(token) -> exp
+_revoked_tokens: Dict[str, float] = {}
+_token_cache_lock = threading.Lock()
+
+# Single-use tickets for opening the session event stream, which EventSource
+# cannot send an Authorization header to: sha256(ticket) -> (expires, email).
+# Kept in this worker, like the event broker itself
+STREAM_TICKET_TTL_SECONDS = float(os.getenv("STREAM_TICKET_TTL_SECONDS", "30"))
+_stream_tickets: Dict[str, Tuple[float, str]] = {}
+_stream_tickets_lock = threading.Lock()
+
+def _request_user_copy(user: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of a user (and their profile) without the password hash, safe to hand to one request"""
+    copy = {key: value for key, value in user.items() if key != 'password_hash'}
+    if isinstance(copy.get('profile'), dict):
+        copy['profile'] = dict(copy['profile'])
+    return copy
+
+def get_cached_user_by_email(email: str) -> Optional[Dict[str, Any]]:
+    """
+    get_user_by_email behind a short TTL cache, for per-request user resolution
+    Each call gets its own copy, without password_hash; login uses get_user_by_email
+    """
+    now = time.monotonic()
+    with _user_cache_lock:
+        entry = _user_cache.get(email)
+        if entry and entry[0] > now:
+            _user_cache.move_to_end(email)
+            record_cache_lookup("user", True)
+            return _request_user_copy(entry[1])
+    
+    record_cache_lookup("user", False)
+    user = get_user_by_email(email)
+    if user is None:
+        return None
+    user = _request_user_copy(user)
+    if USER_CACHE_TTL_SECONDS > 0:
+        with _user_cache_lock:
+            _user_cache[email] = (now + USER_CACHE_TTL_SECONDS, user)
+            _user_cache.move_to_end(email)
+            while len(_user_cache) > USER_CACHE_SIZE:
+                _user_cache.popitem(last=False)
+    return _request_user_copy(user)
+
+def invalidate_cached_user(email: str) -> None:
+    """Drop a user from the request cache after their user or profile row changes"""
+    with _user_cache_lock:
+        _user_cache.pop(email, None)
 
 def get_user_by_email(email: str) -> Optional[Dict[str, Any]]:
     """Get user from database by email with profile data using Supabase"""
@@ -55,97 +122,15 @@ def get_user_by_email(email: str) -> Optional[Dict[str, Any]]:
         
         return user
     except Exception as e:
-        logger.error(f"Error getting user by email {email}: {e}")
+        logger.error("Error getting user by email %s: %s", email, e)
         return None
 
-def authenticate_user_detailed(email: str, password: str) -> tuple[Optional[Dict[str, Any]], str]:
-    """
-    Authenticate user with detailed error messages
-    Returns: (user_data, error_message)
-    """
-    user = get_user_by_email(email)
-    if not user:
-        return None, "User not found"
-    
-    if not verify_password(password, user["password_hash"]):
-        return None, "Invalid password"
-    
-    if not user["is_active"]:
-        return None, "Account is inactive"
-    
-    return user, ""
-
-def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
-    to_encode = data.copy()
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
-
-def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)) -> Dict[str, Any]:
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    
-    try:
-        print(f"DEBUG: Received token: {credentials.credentials[:20]}...")  # Debug log
-        print(f"DEBUG: SECRET_KEY exists: {SECRET_KEY is not None}")  # Debug log
-        
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id_str: str = payload.get("sub")
-        email: str = payload.get("email")
-        role: str = payload.get("role")
-        
-        print(f"DEBUG: Decoded payload - user_id_str: {user_id_str}, email: {email}, role: {role}")  # Debug log
-        
-        if user_id_str is None or email is None:
-            print("DEBUG: Missing user_id or email in token")  # Debug log
-            raise credentials_exception
-        
-        # Convert user_id from string to int
-        try:
-            user_id = int(user_id_str)
-        except (ValueError, TypeError):
-            print(f"DEBUG: Invalid user_id format: {user_id_str}")  # Debug log
-            raise credentials_exception
-            
-        return {
-            "id": user_id,
-            "email": email,
-            "role": role
-        }
-    except PyJWTError as e:
-        print(f"DEBUG: JWT Error: {e}")  # Debug log
-        raise credentials_exception
-
-def get_current_user(token_data: Dict[str, Any] = Depends(verify_token)) -> Dict[str, Any]:
-    user = get_user_by_email(token_data["email"])
-    if user is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found"
-        )
-    return user
-
 def update_last_login(user_id: int):
-    """Update user's last login timestamp using Supabase"""
+    """Queue the user's last login timestamp; written in the background with other bookkeeping"""
     try:
-        client = get_supabase_client()
-        
-        response = client.table('users').update({
-            'last_login': datetime.utcnow().isoformat()
-        }).eq('id', user_id).execute()
-        
-        handle_supabase_error(response)
-        logger.info(f"Updated last login for user {user_id}")
+        user_bookkeeping.record(user_id, last_login=datetime.utcnow().isoformat())
     except Exception as e:
-        logger.error(f"Error updating last login for user {user_id}: {e}")
+        logger.error("Error updating last login for user %s: %s", user_id, e)
 
 # COMMENTED OUT: Direct PostgreSQL versions (keeping for reference)
 # def get_user_by_email(email: str) -> Optional[Dict[str, Any]]:
@@ -187,6 +172,15 @@ def update_last_login(user_id: int):
 #     finally:
 #         conn.close()
 
+_dummy_hash: Optional[str] = None
+
+def _dummy_password_hash() -> str:
+    """A hash at the current cost to verify against when the email is unknown"""
+    global _dummy_hash
+    if _dummy_hash is None:
+        _dummy_hash = hash_password(os.urandom(16).hex())
+    return _dummy_hash
+
 def authenticate_user_detailed(email: str, password: str) -> tuple[Optional[Dict[str, Any]], str]:
     """
     Authenticate user with detailed error messages
@@ -194,6 +188,8 @@ def authenticate_user_detailed(email: str, password: str) -> tuple[Optional[Dict
     """
     user = get_user_by_email(email)
     if not user:
+        # Spend the same bcrypt time as a real check so timing does not reveal which emails exist
+        verify_password(password, _dummy_password_hash())
         return None, "User not found"
     
     if not verify_password(password, user["password_hash"]):
@@ -202,8 +198,29 @@ def authenticate_user_detailed(email: str, password: str) -> tuple[Optional[Dict
     if not user["is_active"]:
         return None, "Account is inactive"
     
+    # Bring hashes made under an older cost policy up to date while the password is at hand
+    if needs_rehash(user["password_hash"]):
+        upgrade_password_hash(user, password)
+    
     return user, ""
 
+def upgrade_password_hash(user: Dict[str, Any], password: str) -> None:
+    """Re-hash a verified password with the current policy; failures never block the login"""
+    try:
+        new_hash = hash_password(password)
+        client = get_supabase_client()
+        # Only replace the hash that was verified, in case the password changed meanwhile
+        response = client.table('users').update({
+            'password_hash': new_hash
+        }).eq('id', user["id"]).eq('password_hash', user["password_hash"]).execute()
+        
+        handle_supabase_error(response)
+        user["password_hash"] = new_hash
+        invalidate_cached_user(user["email"])
+        logger.info("Upgraded password hash for user %s", user['id'])
+    except Exception as e:
+        logger.error("Error upgrading password hash for user %s: %s", user['id'], e)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     if expires_delta:
@@ -215,53 +232,159 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)) -> Dict[str, Any]:
-    credentials_exception = HTTPException(
+def _token_digest(token: str) -> str:
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def _decode_access_token_uncached(token: str) -> Tuple[Dict[str, Any], Optional[float]]:
+    """Verify the signature and claims; returns the identity and the token's exp"""
+    credentials_exception = _credentials_exception()
     
     try:
-        print(f"DEBUG: Received token: {credentials.credentials[:20]}...")  # Debug log
-        print(f"DEBUG: SECRET_KEY exists: {SECRET_KEY is not None}")  # Debug log
+        logger.debug("Received token: %s...", token[:20])
+        logger.debug("SECRET_KEY exists: %s", SECRET_KEY is not None)
         
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id_str: str = payload.get("sub")
         email: str = payload.get("email")
         role: str = payload.get("role")
         
-        print(f"DEBUG: Decoded payload - user_id_str: {user_id_str}, email: {email}, role: {role}")  # Debug log
+        logger.debug("Decoded payload - user_id_str: %s, email: %s, role: %s", user_id_str, email, role)
         
         if user_id_str is None or email is None:
-            print("DEBUG: Missing user_id or email in token")  # Debug log
+            logger.debug("Missing user_id or email in token")
             raise credentials_exception
         
         # Convert user_id from string to int
         try:
             user_id = int(user_id_str)
         except (ValueError, TypeError):
-            print(f"DEBUG: Invalid user_id format: {user_id_str}")  # Debug log
+            logger.debug("Invalid user_id format: %s", user_id_str)
             raise credentials_exception
             
         return {
             "id": user_id,
             "email": email,
             "role": role
-        }
+        }, payload.get("exp")
     except PyJWTError as e:
-        print(f"DEBUG: JWT Error: {e}")  # Debug log
+        logger.debug("JWT Error: %s", e)
         raise credentials_exception
 
-def get_current_user(token_data: Dict[str, Any] = Depends(verify_token)) -> Dict[str, Any]:
-    user = get_user_by_email(token_data["email"])
+def decode_access_token(token: str) -> Dict[str, Any]:
+    """
+    Decode and validate an access token
+    Returns the token identity (id, email, role) or raises a 401 HTTPException
+    """
+    digest = _token_digest(token)
+    now = time.time()
+    with _token_cache_lock:
+        # Revocation is checked on every request, cached or not
+        if digest in _revoked_tokens:
+            raise _credentials_exception()
+        entry = _token_cache.get(digest)
+        if entry is not None:
+            if now < entry[0]:
+                _token_cache.move_to_end(digest)
+                record_cache_lookup("access_token", True)
+                return dict(entry[1])
+            del _token_cache[digest]
+    
+    record_cache_lookup("access_token", False)
+    identity, exp = _decode_access_token_uncached(token)
+    if exp is not None and TOKEN_CACHE_SIZE > 0:
+        with _token_cache_lock:
+            _token_cache[digest] = (float(exp), identity)
+            while len(_token_cache) > TOKEN_CACHE_SIZE:
+                _token_cache.popitem(last=False)
+    return dict(identity)
+
+def revoke_access_token(token: str) -> None:
+    """Reject an access token in this worker until it expires (logout)"""
+    try:
+        _, exp = _decode_access_token_uncached(token)
+    except HTTPException:
+        return  # Already invalid
+    
+    now = time.time()
+    digest = _token_digest(token)
+    with _token_cache_lock:
+        _token_cache.pop(digest, None)
+        for revoked, revoked_exp in list(_revoked_tokens.items()):
+            if revoked_exp <= now:
+                del _revoked_tokens[revoked]
+        _revoked_tokens[digest] = float(exp) if exp is not None else now + ACCESS_TOKEN_EXPIRE_MINUTES * 60
+
+def issue_stream_ticket(email: str) -> str:
+    """A short-lived ticket that stands in for the access token in the stream URL"""
+    ticket = secrets.token_urlsafe(32)
+    now = time.monotonic()
+    with _stream_tickets_lock:
+        for digest, (expires, _) in list(_stream_tickets.items()):
+            if expires <= now:
+                del _stream_tickets[digest]
+        _stream_tickets[_token_digest(ticket)] = (now + STREAM_TICKET_TTL_SECONDS, email)
+    return ticket
+
+def redeem_stream_ticket(ticket: str) -> Optional[str]:
+    """Email the ticket was issued to, or None if it is unknown, expired or already used"""
+    with _stream_tickets_lock:
+        entry = _stream_tickets.pop(_token_digest(ticket), None)
+    if entry is None or entry[0] <= time.monotonic():
+        return None
+    return entry[1]
+
+def resolve_active_user(email: str) -> Dict[str, Any]:
+    """The user behind a verified identity; 401 if they no longer exist, 403 if deactivated"""
+    user = get_cached_user_by_email(email)
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found"
         )
+    if not user.get("is_active", True):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Your account is inactive. Please contact support."
+        )
     return user
 
+def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)) -> Dict[str, Any]:
+    with timed("auth"):
+        return decode_access_token(credentials.credentials)
+
+def get_current_user(token_data: Dict[str, Any] = Depends(verify_token)) -> Dict[str, Any]:
+    with timed("auth"):
+        return resolve_active_user(token_data["email"])
+
+class ParentContext(BaseModel):
+    user: Dict[str, Any]
+    profile: Dict[str, Any]
+    child_id: Optional[int] = None
+
+def get_current_parent(current_user: Dict[str, Any] = Depends(get_current_user)) -> ParentContext:
+    """
+    Resolve the authenticated parent, their profile and child_id once per request
+    Reuses the profile get_current_user already loaded instead of fetching it again
+    """
+    if current_user.get("role") != "parent":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied. Only parents can access this endpoint."
+        )
+    
+    profile = current_user.get("profile") or get_parent_profile(current_user["id"])
+    if not profile:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Parent profile not found")
+    
+    return ParentContext(user=current_user, profile=profile, child_id=profile.get("child_id"))
+
 # COMMENTED OUT: Direct PostgreSQL version of update_last_login (keeping for reference)
 # def update_last_login(user_id: int):
 #     conn = get_db_connection()
@@ -0,0 +1,114 @@
+"""
+Password hashing policy.
+
+The bcrypt work factor is chosen per machine: at startup one hash is timed and
+the cost is set to the highest value whose hash time stays within
+PASSWORD_HASH_TARGET_MS, but never below BCRYPT_MIN_ROUNDS. BCRYPT_ROUNDS pins
+the cost instead; serve.py calibrates once and sets it for every worker, so
+workers cannot settle on different costs. Each bcrypt hash records its own
+algorithm and cost ($2b$<cost>$...), so stored hashes weaker than the current
+policy are recognised and upgraded on the user's next successful login.
+"""
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+import logging
+import bcrypt
+from metrics import PASSWORD_QUEUE_DEPTH, PASSWORD_IN_PROGRESS
+
+logger = logging.getLogger(__name__)
+
+# Target time for one password hash, and the cost range calibration may pick from
+PASSWORD_HASH_TARGET_MS = float(os.getenv("PASSWORD_HASH_TARGET_MS", "250"))
+BCRYPT_MIN_ROUNDS = int(os.getenv("BCRYPT_MIN_ROUNDS", "12"))
+BCRYPT_MAX_ROUNDS = 16
+# Cost timed during calibration; cheap enough to run at every startup
+CALIBRATION_ROUNDS = 10
+
+# Threads that run password hashing; bcrypt releases the GIL, so they run in parallel
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+_rounds: Optional[int] = None
+_rounds_lock = threading.Lock()
+_password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+
+def calibrate_bcrypt_rounds(target_ms: float = PASSWORD_HASH_TARGET_MS) -> int:
+    """Highest cost whose hash time on this CPU stays within target_ms (each step doubles it)"""
+    salt = bcrypt.gensalt(rounds=CALIBRATION_ROUNDS)
+    start = time.perf_counter()
+    bcrypt.hashpw(b"calibration-password", salt)
+    base_ms = (time.perf_counter() - start) * 1000
+
+    rounds = CALIBRATION_ROUNDS
+    while rounds < BCRYPT_MAX_ROUNDS and base_ms * 2 ** (rounds + 1 - CALIBRATION_ROUNDS) <= target_ms:
+        rounds += 1
+    rounds = max(rounds, BCRYPT_MIN_ROUNDS)
+
+    logger.info(
+        "bcrypt calibration: cost %d took %.1fms, using cost %d (~%.0fms, target %.0fms)",
+        CALIBRATION_ROUNDS, base_ms, rounds, base_ms * 2 ** (rounds - CALIBRATION_ROUNDS), target_ms
+    )
+    return rounds
+
+def _configured_rounds(configured: str) -> int:
+    rounds = int(configured)
+    if rounds < BCRYPT_MIN_ROUNDS:
+        logger.warning("BCRYPT_ROUNDS=%d is below the minimum, using cost %d", rounds, BCRYPT_MIN_ROUNDS)
+        return BCRYPT_MIN_ROUNDS
+    return rounds
+
+def get_password_rounds() -> int:
+    """Current bcrypt cost: BCRYPT_ROUNDS if set, otherwise calibrated once per process"""
+    global _rounds
+    if _rounds is None:
+        with _rounds_lock:
+            if _rounds is None:
+                configured = os.getenv("BCRYPT_ROUNDS")
+                _rounds = _configured_rounds(configured) if configured else calibrate_bcrypt_rounds()
+    return _rounds
+
+def pin_password_rounds() -> int:
+    """Fix the cost in the environment so worker processes started from here all use it"""
+    rounds = get_password_rounds()
+    os.environ["BCRYPT_ROUNDS"] = str(rounds)
+    return rounds
+
+def hash_password(password: str) -> str:
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=get_password_rounds())).decode('utf-8')
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+
+def hash_rounds(hashed_password: str) -> Optional[int]:
+    """Cost recorded in a bcrypt hash, None if it is not one"""
+    parts = hashed_password.split('$')
+    if len(parts) < 4 or not parts[1].startswith('2') or not parts[2].isdigit():
+        return None
+    return int(parts[2])
+
+def needs_rehash(hashed_password: str) -> bool:
+    """True when a stored hash is weaker than the current policy (stronger ones are left alone)"""
+    rounds = hash_rounds(hashed_password)
+    return rounds is None or rounds < get_password_rounds()
+
+async def run_password_work(fn, *args, **kwargs):
+    """
+    Run a call that hashes or verifies passwords on the password pool, so bcrypt
+    never blocks the event loop; queue depth and running jobs are exported as metrics
+    """
+    PASSWORD_QUEUE_DEPTH.inc()
+    context = contextvars.copy_context()
+
+    def job():
+        PASSWORD_QUEUE_DEPTH.dec()
+        PASSWORD_IN_PROGRESS.inc()
+        try:
+            return context.run(fn, *args, **kwargs)
+        finally:
+            PASSWORD_IN_PROGRESS.dec()
+
+    return await asyncio.get_running_loop().run_in_executor(_password_executor, job)
@@ -0,0 +1,149 @@
+"""
+Login throttling with sliding windows.
+
+Every login attempt counts against the client IP. Failed attempts count
+against the (client IP, account) pair and against the account alone. Once any
+of these is over its limit the request is turned away before the user lookup
+or the bcrypt check, so bursts cannot pin the CPU.
+
+The pair limit is the tight one: someone guessing at an account from one
+address locks only that address out, and the owner can still sign in from
+their own. The account limit is higher and catches guesses spread over many
+addresses. A successful login clears only its own pair; the account window is
+left to expire, so one success cannot reset a distributed attack.
+
+Counters live in each worker's memory by default. LOGIN_THROTTLE_BACKEND=postgres
+keeps them in the login_attempts table instead (see others/schema.sql), so all
+workers and instances share one view at the cost of a round trip per check.
+"""
+from collections import OrderedDict, deque
+from typing import Deque
+import logging
+import os
+import threading
+import time
+from db import get_supabase_client
+
+logger = logging.getLogger(__name__)
+
+# Attempts allowed per client IP, and failed attempts per (client IP, account) and
+# per account from any address, within their windows
+LOGIN_IP_LIMIT = int(os.getenv("LOGIN_IP_LIMIT", "20"))
+LOGIN_IP_WINDOW_SECONDS = float(os.getenv("LOGIN_IP_WINDOW_SECONDS", "60"))
+LOGIN_IP_ACCOUNT_LIMIT = int(os.getenv("LOGIN_IP_ACCOUNT_LIMIT", "5"))
+LOGIN_IP_ACCOUNT_WINDOW_SECONDS = float(os.getenv("LOGIN_IP_ACCOUNT_WINDOW_SECONDS", "900"))
+LOGIN_ACCOUNT_LIMIT = int(os.getenv("LOGIN_ACCOUNT_LIMIT", "50"))
+LOGIN_ACCOUNT_WINDOW_SECONDS = float(os.getenv("LOGIN_ACCOUNT_WINDOW_SECONDS", "3600"))
+# Keys tracked per worker before the least recently used are dropped
+THROTTLE_MAX_KEYS = 100000
+
+class InMemorySlidingWindow:
+    """Sliding-window log per key, kept in this worker's memory"""
+
+    def __init__(self, max_keys: int = THROTTLE_MAX_KEYS, clock=time.monotonic):
+        self.max_keys = max_keys
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._hits: "OrderedDict[str, Deque[float]]" = OrderedDict()
+
+    def retry_after(self, key: str, limit: int, window: float) -> float:
+        """Seconds until key may try again, 0 if it is under its limit"""
+        now = self._clock()
+        with self._lock:
+            hits = self._hits.get(key)
+            if not hits:
+                return 0.0
+            while hits and hits[0] <= now - window:
+                hits.popleft()
+            if len(hits) < limit:
+                return 0.0
+            return hits[-limit] + window - now
+
+    def hit(self, key: str, window: float) -> None:
+        with self._lock:
+            hits = self._hits.get(key)
+            if hits is None:
+                hits = self._hits[key] = deque()
+                while len(self._hits) > self.max_keys:
+                    self._hits.popitem(last=False)
+            else:
+                self._hits.move_to_end(key)
+            hits.append(self._clock())
+
+    def reset(self, key: str) -> None:
+        with self._lock:
+            self._hits.pop(key, None)
+
+class PostgresSlidingWindow:
+    """Shared sliding-window log in the login_attempts table"""
+
+    def retry_after(self, key: str, limit: int, window: float) -> float:
+        supabase = get_supabase_client()
+        result = supabase.rpc('login_throttle_retry_after', {
+            'p_key': key,
+            'p_limit': limit,
+            'p_window_seconds': window
+        }).execute()
+        return float(result.data or 0)
+
+    def hit(self, key: str, window: float) -> None:
+        supabase = get_supabase_client()
+        supabase.rpc('login_throttle_hit', {'p_key': key, 'p_window_seconds': window}).execute()
+
+    def reset(self, key: str) -> None:
+        supabase = get_supabase_client()
+        supabase.table('login_attempts').delete().eq('throttle_key', key).execute()
+
+def _ip_account_key(client_ip: str, email: str) -> str:
+    return f"ip-account:{client_ip}:{email.strip().lower()}"
+
+def _account_key(email: str) -> str:
+    return f"account:{email.strip().lower()}"
+
+class LoginThrottle:
+    def __init__(self, backend):
+        self.backend = backend
+
+    def check(self, client_ip: str, email: str) -> float:
+        """
+        Seconds the caller must wait, or 0 to let the attempt through
+        An allowed attempt is counted against the client IP
+        """
+        try:
+            ip_key, account_key = f"ip:{client_ip}", _account_key(email)
+            retry_after = max(
+                self.backend.retry_after(ip_key, LOGIN_IP_LIMIT, LOGIN_IP_WINDOW_SECONDS),
+                self.backend.retry_after(
+                    _ip_account_key(client_ip, email), LOGIN_IP_ACCOUNT_LIMIT, LOGIN_IP_ACCOUNT_WINDOW_SECONDS
+                ),
+                self.backend.retry_after(account_key, LOGIN_ACCOUNT_LIMIT, LOGIN_ACCOUNT_WINDOW_SECONDS)
+            )
+            if retry_after > 0:
+                logger.warning("Login throttled for %s / %s (%.0fs)", ip_key, account_key, retry_after)
+                return retry_after
+            self.backend.hit(ip_key, LOGIN_IP_WINDOW_SECONDS)
+            return 0.0
+        except Exception as e:
+            # A throttle outage must not lock everyone out
+            logger.error("Login throttle check failed: %s", e)
+            return 0.0
+
+    def record_failure(self, client_ip: str, email: str) -> None:
+        try:
+            self.backend.hit(_ip_account_key(client_ip, email), LOGIN_IP_ACCOUNT_WINDOW_SECONDS)
+            self.backend.hit(_account_key(email), LOGIN_ACCOUNT_WINDOW_SECONDS)
+        except Exception as e:
+            logger.error("Error recording failed login: %s", e)
+
+    def record_success(self, client_ip: str, email: str) -> None:
+        try:
+            self.backend.reset(_ip_account_key(client_ip, email))
+        except Exception as e:
+            logger.error("Error resetting login throttle: %s", e)
+
+def _create_backend():
+    if os.getenv("LOGIN_THROTTLE_BACKEND", "memory").lower() == "postgres":
+        return PostgresSlidingWindow()
+    return InMemorySlidingWindow()
+
+login_throttle = LoginThrottle(_create_backend())
@@ -0,0 +1,109 @@
+"""
+Rotating refresh tokens.
+
+Login hands out a short-lived JWT access token plus an opaque refresh token.
+The refresh token is stored only as a SHA-256 digest; it is random and high
+entropy, so a slow password hash would add cost without adding security.
+Every refresh consumes the presented token and issues a new one in the same
+family. Presenting a token that was already consumed means it leaked, so the
+whole family is revoked and the user has to log in again.
+"""
+import hashlib
+import os
+import secrets
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional, Tuple
+import logging
+from db import get_supabase_client, select_on_write
+
+logger = logging.getLogger(__name__)
+
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("JWT_REFRESH_TOKEN_EXPIRE_DAYS", "14"))
+
+class RefreshTokenError(Exception):
+    """Raised when a refresh token is unknown, expired, revoked or reused"""
+    pass
+
+def _hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+def _parse_timestamp(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+def issue_refresh_token(user_id: int, family_id: Optional[str] = None) -> str:
+    """Create and store a refresh token; a new family starts at each login"""
+    try:
+        token = secrets.token_urlsafe(32)
+        now = datetime.now(timezone.utc)
+        supabase = get_supabase_client()
+        supabase.table('refresh_tokens').insert({
+            'user_id': user_id,
+            'token_hash': _hash_token(token),
+            'family_id': family_id or str(uuid.uuid4()),
+            'expires_at': (now + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)).isoformat(),
+            'created_at': now.isoformat()
+        }).execute()
+        return token
+
+    except Exception as e:
+        logger.error("Error issuing refresh token for user %s: %s", user_id, e)
+        raise Exception(f"Database error: {str(e)}")
+
+def revoke_token_family(family_id: str) -> None:
+    supabase = get_supabase_client()
+    supabase.table('refresh_tokens').update({
+        'revoked_at': datetime.now(timezone.utc).isoformat()
+    }).eq('family_id', family_id).is_('revoked_at', 'null').execute()
+
+def rotate_refresh_token(token: str) -> Tuple[Dict[str, Any], str]:
+    """
+    Consume a refresh token and issue its successor
+    Returns (user, new_refresh_token); user carries id, email, role and is_active
+    """
+    supabase = get_supabase_client()
+    result = supabase.table('refresh_tokens').select(
+        'id, user_id, family_id, expires_at, rotated_at, revoked_at, users (id, email, role, is_active)'
+    ).eq('token_hash', _hash_token(token)).execute()
+    if not result.data:
+        raise RefreshTokenError("Invalid refresh token")
+
+    record = result.data[0]
+    if record['revoked_at']:
+        raise RefreshTokenError("Refresh token has been revoked")
+    if record['rotated_at']:
+        revoke_token_family(record['family_id'])
+        logger.warning("Refresh token reuse detected for user %s; revoked token family", record['user_id'])
+        raise RefreshTokenError("Refresh token has already been used")
+    if _parse_timestamp(record['expires_at']) <= datetime.now(timezone.utc):
+        raise RefreshTokenError("Refresh token has expired")
+
+    user = record.get('users')
+    if not user or not user.get('is_active'):
+        revoke_token_family(record['family_id'])
+        raise RefreshTokenError("Account is inactive")
+
+    # Claim the token; a concurrent refresh with the same token finds it already
+    # rotated and is treated as reuse
+    claim = supabase.table('refresh_tokens').update({
+        'rotated_at': datetime.now(timezone.utc).isoformat()
+    }).eq('id', record['id']).is_('rotated_at', 'null').is_('revoked_at', 'null')
+    if not select_on_write(claim, 'id').execute().data:
+        revoke_token_family(record['family_id'])
+        logger.warning("Concurrent refresh token reuse for user %s; revoked token family", record['user_id'])
+        raise RefreshTokenError("Refresh token has already been used")
+
+    return user, issue_refresh_token(record['user_id'], record['family_id'])
+
+def revoke_refresh_token(token: str) -> None:
+    """Log out: revoke the family the token belongs to"""
+    try:
+        supabase = get_supabase_client()
+        result = supabase.table('refresh_tokens').select('family_id').eq('token_hash', _hash_token(token)).execute()
+        if result.data:
+            revoke_token_family(result.data[0]['family_id'])
+
+    except Exception as e:
+        logger.error("Error revoking refresh token: %s", e)
+        raise Exception(f"Database error: {str(e)}")
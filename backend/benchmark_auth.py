@@ -0,0 +1,43 @@
+"""
+Token verification benchmark for ThrivePath
+Measures the per-request cost of decode_access_token (what verify_token runs
+for every authenticated request) with and without the decoded-token cache.
+
+Usage: python benchmark_auth.py [requests] [distinct_tokens]
+"""
+
+import os
+import sys
+import time
+
+os.environ.setdefault("JWT_SECRET_KEY", "benchmark-secret")
+
+from authentication import authh
+
+def run(requests: int, tokens: list, cache_size: int) -> float:
+    """Average microseconds per verification"""
+    authh.TOKEN_CACHE_SIZE = cache_size
+    authh._token_cache.clear()
+    start = time.perf_counter()
+    for i in range(requests):
+        authh.decode_access_token(tokens[i % len(tokens)])
+    elapsed = time.perf_counter() - start
+    return elapsed / requests * 1_000_000
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    distinct = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    tokens = [
+        authh.create_access_token({"sub": str(i), "email": f"user{i}@example.com", "role": "therapist"})
+        for i in range(distinct)
+    ]
+
+    cache_size = authh.TOKEN_CACHE_SIZE or 10000
+    uncached = run(requests, tokens, 0)
+    cached = run(requests, tokens, cache_size)
+    print(f"{requests} verifications across {distinct} tokens")
+    print(f"  without cache: {uncached:8.2f} us/request")
+    print(f"  with cache:    {cached:8.2f} us/request ({uncached / cached:.1f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+HTTP throughput benchmark for serve.py
+Starts the production server with each worker count in turn and drives it
+with keep-alive connections, reporting requests/second and latency.
+
+Usage: python benchmark_server.py [path] [seconds] [connections] [workers ...]
+e.g.   python benchmark_server.py / 10 64 1 2 4
+"""
+
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+
+HOST = "127.0.0.1"
+PORT = int(os.getenv("BENCHMARK_PORT", "8765"))
+
+def start_server(workers: int) -> subprocess.Popen:
+    env = dict(os.environ, HOST=HOST, PORT=str(PORT), WEB_CONCURRENCY=str(workers),
+               LOG_LEVEL="WARNING", PARENT_DIGEST_INTERVAL="0")
+    env.setdefault("JWT_SECRET_KEY", "benchmark-secret")
+    server = subprocess.Popen([sys.executable, "serve.py"], env=env, cwd=os.path.dirname(os.path.abspath(__file__)))
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            socket.create_connection((HOST, PORT), timeout=1).close()
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError("Server did not start within 60s")
+
+async def _client(path: str, until: float, latencies: list) -> None:
+    reader, writer = await asyncio.open_connection(HOST, PORT)
+    request = f"GET {path} HTTP/1.1\r\nHost: {HOST}\r\n\r\n".encode()
+    try:
+        while time.perf_counter() < until:
+            start = time.perf_counter()
+            writer.write(request)
+            headers = await reader.readuntil(b"\r\n\r\n")
+            length = 0
+            for line in headers.split(b"\r\n"):
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":", 1)[1])
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start)
+    finally:
+        writer.close()
+
+async def drive(path: str, seconds: float, connections: int) -> list:
+    latencies: list = []
+    until = time.perf_counter() + seconds
+    await asyncio.gather(*(_client(path, until, latencies) for _ in range(connections)))
+    return latencies
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else "/"
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 10
+    connections = int(sys.argv[3]) if len(sys.argv) > 3 else 64
+    worker_counts = [int(w) for w in sys.argv[4:]] or [1, 2]
+
+    loop_http = f"{os.getenv('UVICORN_LOOP', 'uvloop')}/{os.getenv('UVICORN_HTTP', 'httptools')}"
+    print(f"GET {path}, {connections} connections, {seconds:.0f}s per run")
+    print(f"{'workers':<9}{'loop/http':<20}{'req/s':>8}{'p50 ms':>9}{'p99 ms':>9}")
+    for workers in worker_counts:
+        server = start_server(workers)
+        try:
+            asyncio.run(drive(path, 1, connections))  # let every worker take connections first
+            latencies = sorted(asyncio.run(drive(path, seconds, connections)))
+        finally:
+            server.terminate()
+            server.wait()
+        p50 = latencies[len(latencies) // 2] * 1000
+        p99 = latencies[int(len(latencies) * 0.99)] * 1000
+        print(f"{workers:<9}{loop_http:<20}{len(latencies) / seconds:>8.0f}{p50:>9.1f}{p99:>9.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -3,13 +3,19 @@ import os
 # from psycopg2.extras import RealDictCursor
 from dotenv import load_dotenv
 import logging
+import time
 from datetime import datetime
+from typing import Optional
+from timing import record_db_call
+from metrics import observe_db_query
+from query_debug import QUERY_DEBUG, FILTER_METHODS, query_shape, record_query
+from logging_config import configure_logging
 
 # Force reload environment variables
 load_dotenv(override=True)
 
 # Set up logging for database connections
-logging.basicConfig(level=logging.INFO)
+configure_logging()
 logger = logging.getLogger(__name__)
 
 # Supabase client setup (primary database method)
@@ -30,16 +36,89 @@ def init_supabase_client():
             logger.error("Supabase client not initialized - missing URL or service role key")
             raise Exception("Missing Supabase configuration")
             
-        supabase_client = create_client(url, key)
+        supabase_client = InstrumentedClient(create_client(url, key))
         logger.info("Supabase client initialized successfully")
         return supabase_client
     except ImportError:
         logger.error("Supabase package not installed - install with: pip install supabase")
         raise Exception("Supabase package not installed")
     except Exception as e:
-        logger.error(f"Error initializing Supabase client: {e}")
+        logger.error("Error initializing Supabase client: %s", e)
         raise
 
+# Query builder methods that name the operation of a table query
+QUERY_OPERATIONS = ('select', 'insert', 'update', 'upsert', 'delete')
+
+class _InstrumentedQuery:
+    """
+    Wraps a postgrest query builder so execute() is timed and recorded for the
+    current request as '<table>.<operation>' (or 'rpc.<function>'); with
+    QUERY_DEBUG=1 the filter columns are tracked too, for query_debug.py
+    """
+    __slots__ = ('_query', '_label', '_filters')
+
+    def __init__(self, query, label: str, filters: tuple = ()):
+        object.__setattr__(self, '_query', query)
+        object.__setattr__(self, '_label', label)
+        object.__setattr__(self, '_filters', filters)
+
+    def __getattr__(self, name):
+        attr = getattr(self._query, name)
+        if name == 'execute':
+            return self._timed(attr)
+
+        label, filters = self._label, self._filters
+        if name in QUERY_OPERATIONS and '.' not in label:
+            label = f"{label}.{name}"
+        if not callable(attr):
+            # Properties such as .not_ return builders too
+            return _InstrumentedQuery(attr, label, filters) if hasattr(attr, 'execute') else attr
+
+        def call(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            if not hasattr(result, 'execute'):
+                return result
+            if QUERY_DEBUG and name in FILTER_METHODS:
+                column = args[0] if args and isinstance(args[0], str) else ''
+                return _InstrumentedQuery(result, label, filters + (f"{name}({column})",))
+            return _InstrumentedQuery(result, label, filters)
+        return call
+
+    def __setattr__(self, name, value):
+        # e.g. select_on_write assigns query.params
+        setattr(self._query, name, value)
+
+    def _timed(self, execute):
+        def run(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return execute(*args, **kwargs)
+            finally:
+                end = time.perf_counter()
+                elapsed = end - start
+                record_db_call(self._label, elapsed * 1000)
+                observe_db_query(self._label, elapsed)
+                if QUERY_DEBUG:
+                    record_query(query_shape(self._label, self._filters), start, end)
+        return run
+
+class InstrumentedClient:
+    """Supabase client whose table and rpc queries report their timings"""
+
+    def __init__(self, client):
+        self._client = client
+
+    def table(self, name: str):
+        return _InstrumentedQuery(self._client.table(name), name)
+
+    from_ = table
+
+    def rpc(self, fn: str, params=None, *args, **kwargs):
+        return _InstrumentedQuery(self._client.rpc(fn, params or {}, *args, **kwargs), f"rpc.{fn}")
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
 def get_supabase_client():
     """
     Get Supabase client instance (primary database method)
@@ -49,6 +128,18 @@ def get_supabase_client():
         supabase_client = init_supabase_client()
     return supabase_client
 
+def warm_up_supabase_client() -> None:
+    """
+    Create the client and make one small query, so the first request does not
+    pay for connection setup and TLS; failures are logged, not raised
+    """
+    start = time.perf_counter()
+    try:
+        get_supabase_client().table('users').select('id').limit(1).execute()
+        logger.info("Supabase connection warmed up in %.0fms", (time.perf_counter() - start) * 1000)
+    except Exception as e:
+        logger.warning("Supabase warm-up failed: %s", e)
+
 # COMMENTED OUT: Direct PostgreSQL connection (keeping for reference)
 # def get_db_connection():
 #     """
@@ -106,7 +197,7 @@ def test_connection():
         logger.info("Supabase client connection successful")
         return True, "Supabase connection successful"
     except Exception as e:
-        logger.error(f"Supabase connection test failed: {e}")
+        logger.error("Supabase connection test failed: %s", e)
         return False, str(e)
 
 # COMMENTED OUT: Direct PostgreSQL test (keeping for reference)
@@ -141,11 +232,50 @@ def format_supabase_response(response):
         return response.data
     return None
 
+def select_on_write(query, columns: str):
+    """
+    Attach a PostgREST select list (embeds included) to an insert/update query
+    so the written rows come back in the shape reads use, without a follow-up select
+    """
+    query.params = query.params.add('select', ''.join(columns.split()))
+    return query
+
+# Optimistic concurrency helpers: a row's updated_at doubles as its ETag
+class PreconditionFailed(Exception):
+    """Raised when a conditional (If-Match) write finds the row has changed"""
+    def __init__(self, message: str, etag: Optional[str] = None):
+        super().__init__(message)
+        self.etag = etag
+
+def make_etag(updated_at) -> Optional[str]:
+    """
+    Build an ETag from a row's updated_at value
+    """
+    if not updated_at:
+        return None
+    if isinstance(updated_at, datetime):
+        updated_at = updated_at.isoformat()
+    return f'"{updated_at}"'
+
+def parse_if_match(if_match: Optional[str]) -> Optional[str]:
+    """
+    Extract the expected updated_at value from an If-Match header.
+    Returns None for a missing header or '*', meaning the write is unconditional.
+    """
+    if not if_match:
+        return None
+    value = if_match.split(',')[0].strip()
+    if value == '*':
+        return None
+    if value.startswith('W/'):
+        value = value[2:]
+    return value.strip('"') or None
+
 def handle_supabase_error(response):
     """
     Handle Supabase errors consistently
     """
     if hasattr(response, 'error') and response.error:
-        logger.error(f"Supabase error: {response.error}")
+        logger.error("Supabase error: %s", response.error)
         raise Exception(f"Database error: {response.error}")
     return response
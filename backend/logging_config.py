@@ -0,0 +1,169 @@
+"""
+Logging for ThrivePath: queued, structured and sampled.
+
+Request code only puts log records on an in-memory queue; a listener thread
+formats them and writes them to stderr, so formatting and I/O stay off the
+request path. Messages use %-style arguments, so they are only rendered on
+the listener thread and only for records that are kept.
+
+LOG_FORMAT=json (the default) writes one JSON object per line. Fields passed
+as extra={'fields': {...}} become top-level keys. LOG_FORMAT=text gives the
+plain layout for local runs. LOG_LEVEL sets the root level.
+
+LOG_SAMPLE_RATES keeps only a share of INFO-and-below records from busy
+loggers, e.g. "sessions.sessions=0.1,request_timing=0.25". Warnings and
+errors are always kept. When the queue holds LOG_QUEUE_SIZE records, new
+ones are dropped rather than making the request wait, and the number
+dropped is reported on the next record written.
+"""
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+# Attributes every LogRecord has; anything else was passed through extra=
+# (color_message is uvicorn's ANSI-coloured copy of the message)
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "taskName", "color_message"}
+
+def parse_sample_rates(spec: str) -> Dict[str, float]:
+    rates = {}
+    for item in spec.split(','):
+        name, _, rate = item.strip().partition('=')
+        if name and rate:
+            rates[name.strip()] = min(max(float(rate), 0.0), 1.0)
+    return rates
+
+class SamplingFilter(logging.Filter):
+    """Keep a share of low-severity records per logger name (a logger inherits its parent's rate)"""
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+        self._resolved: Dict[str, float] = {}
+
+    def _rate_for(self, name: str) -> float:
+        rate = self._resolved.get(name)
+        if rate is None:
+            rate, prefix = 1.0, name
+            while prefix:
+                if prefix in self.rates:
+                    rate = self.rates[prefix]
+                    break
+                prefix = prefix.rpartition('.')[0]
+            self._resolved[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self._rate_for(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Hands records to the listener unformatted and drops them when the queue is full"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The queue never leaves the process, so the record can travel as is and
+        # be formatted by the listener instead of the calling thread
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += 1
+
+    def take_dropped(self) -> int:
+        with self._dropped_lock:
+            dropped, self.dropped = self.dropped, 0
+        return dropped
+
+def _extra_fields(record: logging.LogRecord) -> Dict:
+    fields = {k: v for k, v in vars(record).items() if k not in _RECORD_ATTRS and k != 'fields'}
+    fields.update(getattr(record, 'fields', None) or {})
+    return fields
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            **_extra_fields(record)
+        }
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s:%(name)s:%(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        fields = _extra_fields(record)
+        return f"{text} {json.dumps(fields, default=str)}" if fields else text
+
+class _DropReportingHandler(logging.StreamHandler):
+    """Listener-side stream handler that notes how many records the queue dropped"""
+
+    def __init__(self, queue_handler: NonBlockingQueueHandler):
+        super().__init__()
+        self.queue_handler = queue_handler
+
+    def emit(self, record: logging.LogRecord) -> None:
+        dropped = self.queue_handler.take_dropped()
+        if dropped:
+            super().emit(logging.makeLogRecord({
+                'name': __name__, 'levelno': logging.WARNING, 'levelname': 'WARNING',
+                'msg': "Log queue full, dropped %d records", 'args': (dropped,)
+            }))
+        super().emit(record)
+
+_listener: Optional[QueueListener] = None
+
+def configure_logging() -> None:
+    """Route all logging through the queue; safe to call more than once"""
+    global _listener
+    if _listener is not None:
+        return
+
+    queue_handler = NonBlockingQueueHandler(queue.Queue(maxsize=LOG_QUEUE_SIZE))
+    queue_handler.addFilter(SamplingFilter(parse_sample_rates(os.getenv("LOG_SAMPLE_RATES", ""))))
+
+    output = _DropReportingHandler(queue_handler)
+    output.setFormatter(TextFormatter() if LOG_FORMAT == "text" else JSONFormatter())
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(LOG_LEVEL)
+
+    _listener = QueueListener(queue_handler.queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+def shutdown_logging() -> None:
+    """Write out whatever is still queued and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,75 @@
+"""
+Prometheus metrics for ThrivePath, served at /metrics.
+
+With several uvicorn workers, PROMETHEUS_MULTIPROC_DIR must name an empty,
+writable directory before the workers start; serve.py sets one up. Each
+worker then writes its samples there and /metrics aggregates all of them,
+whichever worker answers the scrape. Without it, /metrics reports only the
+worker that served it.
+"""
+import os
+from typing import Tuple
+from prometheus_client import (
+    CollectorRegistry, Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, generate_latest
+)
+from prometheus_client import multiprocess
+
+MULTIPROCESS = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "HTTP requests served", ["method", "route", "status"]
+)
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ["method", "route"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+HTTP_IN_PROGRESS = Gauge(
+    "http_requests_in_progress", "HTTP requests being served", ["method"],
+    multiprocess_mode="livesum"
+)
+DB_QUERIES = Counter(
+    "db_queries_total", "Supabase queries executed", ["table", "operation"]
+)
+DB_LATENCY = Histogram(
+    "db_query_duration_seconds", "Supabase query latency", ["table", "operation"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+PASSWORD_QUEUE_DEPTH = Gauge(
+    "password_hash_queue_depth", "Password hash jobs waiting for a worker thread",
+    multiprocess_mode="livesum"
+)
+PASSWORD_IN_PROGRESS = Gauge(
+    "password_hash_in_progress", "Password hash jobs running",
+    multiprocess_mode="livesum"
+)
+CACHE_LOOKUPS = Counter(
+    "cache_lookups_total", "In-process cache lookups; hit ratio = hit / (hit + miss)", ["cache", "result"]
+)
+
+def _split_query_label(label: str) -> Tuple[str, str]:
+    # '<table>.<operation>' or 'rpc.<function>' as recorded by db.InstrumentedClient
+    head, _, tail = label.partition('.')
+    if head == 'rpc':
+        return tail, 'rpc'
+    return head, tail or 'unknown'
+
+def observe_db_query(label: str, seconds: float) -> None:
+    table, operation = _split_query_label(label)
+    DB_QUERIES.labels(table, operation).inc()
+    DB_LATENCY.labels(table, operation).observe(seconds)
+
+def record_cache_lookup(cache: str, hit: bool) -> None:
+    CACHE_LOOKUPS.labels(cache, "hit" if hit else "miss").inc()
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Exposition text for a scrape, aggregated across workers in multiprocess mode"""
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+def mark_worker_dead(pid: int) -> None:
+    """Drop a worker's live gauges; each worker calls this for itself as it shuts down"""
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(pid)
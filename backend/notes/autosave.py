@@ -0,0 +1,182 @@
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional
+from datetime import datetime, timezone
+from pydantic import BaseModel, validator
+import asyncio
+import logging
+import os
+from db import get_supabase_client
+from notes.search import get_note_search
+
+logger = logging.getLogger(__name__)
+
+# Seconds a note may stay dirty in memory before its autosave burst is written
+NOTES_AUTOSAVE_INTERVAL = float(os.getenv("NOTES_AUTOSAVE_INTERVAL", "2.0"))
+
+class NoteTextEdit(BaseModel):
+    # Replace content[start:end] with text; offsets refer to the content as
+    # left by the previous edit in the same request
+    start: int
+    end: int
+    text: str = ''
+
+class SessionNotePatch(BaseModel):
+    note_title: Optional[str] = None
+    note_content: Optional[str] = None  # Full replacement
+    edits: Optional[List[NoteTextEdit]] = None  # Or incremental edits
+    base_length: Optional[int] = None  # Content length the edits were computed against
+
+    @validator('edits')
+    def validate_edits(cls, v, values):
+        if v is not None and values.get('note_content') is not None:
+            raise ValueError('Send either note_content or edits, not both')
+        return v
+
+class SessionNotePatchResponse(BaseModel):
+    notes_id: int
+    note_title: Optional[str]
+    note_length: int
+    last_edited_at: datetime
+    pending: bool  # True while the change is buffered and not yet written
+
+class NoteEditConflict(Exception):
+    """Raised when edits were computed against a different version of the note"""
+    def __init__(self, current_length: int):
+        super().__init__(f"Note content has changed (current length {current_length}); resend the full content")
+        self.current_length = current_length
+
+def apply_text_edits(content: str, edits: List[NoteTextEdit]) -> str:
+    for edit in edits:
+        if not 0 <= edit.start <= edit.end <= len(content):
+            raise ValueError(f"Edit range {edit.start}-{edit.end} is outside the note (length {len(content)})")
+        content = content[:edit.start] + edit.text + content[edit.end:]
+    return content
+
+class NoteAutosaveCoalescer:
+    """
+    Buffers rapid note edits in memory and writes each note at most once per
+    interval. The first patch of a burst loads the note (and checks ownership);
+    later patches in the burst only touch memory. Buffers live in the worker
+    that received them, which is why clients send base_length with diffs.
+
+    Database calls run in worker threads. Patches and writes of the same note
+    take that note's lock, so a burst never starts from a load that races an
+    in-flight write; other notes are not held up.
+    """
+
+    def __init__(self, interval: float = NOTES_AUTOSAVE_INTERVAL):
+        self.interval = interval
+        self._pending: Dict[int, Dict] = {}
+        self._timers: Dict[int, asyncio.Task] = {}
+        # notes_id -> [lock, holders and waiters]; dropped when nobody uses it
+        self._note_locks: Dict[int, List] = {}
+
+    @asynccontextmanager
+    async def _note_lock(self, notes_id: int):
+        entry = self._note_locks.get(notes_id)
+        if entry is None:
+            entry = self._note_locks[notes_id] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._note_locks[notes_id]
+
+    def _load_note(self, notes_id: int, therapist_id: int) -> Optional[Dict]:
+        supabase = get_supabase_client()
+        result = supabase.table('session_notes').select(
+            'notes_id, therapist_id, session_date, session_time, note_title, note_content, last_edited_at'
+        ).eq('notes_id', notes_id).eq('therapist_id', therapist_id).execute()
+        return result.data[0] if result.data else None
+
+    def _write_note(self, notes_id: int, state: Dict) -> None:
+        supabase = get_supabase_client()
+        supabase.table('session_notes').update({
+            'note_content': state['note_content'],
+            'note_title': state['note_title'],
+            'last_edited_at': state['last_edited_at']
+        }).eq('notes_id', notes_id).eq('therapist_id', state['therapist_id']).execute()
+
+    def _schedule(self, notes_id: int) -> None:
+        if notes_id not in self._timers:
+            self._timers[notes_id] = asyncio.create_task(self._flush_later(notes_id))
+
+    async def apply(self, notes_id: int, therapist_id: int, patch: SessionNotePatch, flush_now: bool = False) -> Optional[SessionNotePatchResponse]:
+        """Apply a patch to the buffered note; returns None if the note is not the therapist's"""
+        async with self._note_lock(notes_id):
+            state = self._pending.get(notes_id)
+            if state is None:
+                row = await asyncio.to_thread(self._load_note, notes_id, therapist_id)
+                if not row:
+                    return None
+                state = self._pending[notes_id] = row
+            elif state['therapist_id'] != therapist_id:
+                return None
+
+            content = state['note_content'] or ''
+            if patch.base_length is not None and patch.base_length != len(content):
+                raise NoteEditConflict(len(content))
+
+            if patch.note_content is not None:
+                content = patch.note_content
+            elif patch.edits:
+                content = apply_text_edits(content, patch.edits)
+            if patch.note_title is not None:
+                state['note_title'] = patch.note_title
+
+            state['note_content'] = content
+            state['last_edited_at'] = datetime.now(timezone.utc).isoformat()
+            snapshot = dict(state)
+
+        if flush_now:
+            await self.flush(notes_id)
+        else:
+            self._schedule(notes_id)
+
+        return SessionNotePatchResponse(
+            notes_id=notes_id,
+            note_title=snapshot['note_title'],
+            note_length=len(snapshot['note_content']),
+            last_edited_at=snapshot['last_edited_at'],
+            pending=not flush_now
+        )
+
+    async def _flush_later(self, notes_id: int) -> None:
+        try:
+            await asyncio.sleep(self.interval)
+            self._timers.pop(notes_id, None)
+            await self.flush(notes_id)
+        except asyncio.CancelledError:
+            pass
+
+    async def flush(self, notes_id: int) -> None:
+        """Write a buffered note now"""
+        timer = self._timers.pop(notes_id, None)
+        if timer and timer is not asyncio.current_task():
+            timer.cancel()
+
+        async with self._note_lock(notes_id):
+            state = self._pending.pop(notes_id, None)
+            if not state:
+                return
+            try:
+                await asyncio.to_thread(self._write_note, notes_id, state)
+            except Exception as e:
+                logger.error("Error flushing autosaved note %s: %s", notes_id, e)
+                # Keep the edits and try again after another interval
+                self._pending[notes_id] = state
+                self._schedule(notes_id)
+                return
+
+        get_note_search().index_note(state)
+        logger.info("Flushed autosaved note %s", notes_id)
+
+    async def flush_all(self) -> None:
+        """Write every buffered note, e.g. at shutdown"""
+        for notes_id in list(self._pending):
+            await self.flush(notes_id)
+
+note_autosave = NoteAutosaveCoalescer()
@@ -1,16 +1,42 @@
-from typing import List, Optional
+from typing import List, Optional, Tuple, Union
 from datetime import date, datetime, time
+from collections import OrderedDict
+from calendar import monthrange
 from pydantic import BaseModel
 import logging
+import os
+import threading
+import time as time_module
 from db import get_supabase_client
+from metrics import record_cache_lookup
+from notes.search import get_note_search
 
 logger = logging.getLogger(__name__)
 
+# Per-worker cache of which days in a month have notes, keyed by
+# (therapist_id, 'YYYY-MM'). Bit n-1 of the value is set when day n has notes,
+# so a month costs one int no matter how many notes it holds. Writes only
+# invalidate the worker that handled them, so entries also expire after
+# NOTE_DATES_CACHE_TTL seconds to bound staleness in the other workers.
+NOTE_DATES_CACHE_SIZE = int(os.getenv("NOTE_DATES_CACHE_SIZE", "5000"))
+NOTE_DATES_CACHE_TTL = float(os.getenv("NOTE_DATES_CACHE_TTL", "30"))
+_note_day_bitmaps: "OrderedDict[Tuple[int, str], Tuple[int, float]]" = OrderedDict()
+_note_day_bitmaps_lock = threading.Lock()
+
+def _month_key(therapist_id: int, day: date) -> Tuple[int, str]:
+    return (therapist_id, f"{day.year:04d}-{day.month:02d}")
+
+def invalidate_note_dates(therapist_id: int, session_date: date) -> None:
+    """Forget the cached note-day bitmap for the month containing session_date"""
+    with _note_day_bitmaps_lock:
+        _note_day_bitmaps.pop(_month_key(therapist_id, session_date), None)
+
 class SessionNoteCreate(BaseModel):
     session_date: date
     note_content: str
     note_title: Optional[str] = None
     session_time: Optional[time] = None
+    session_id: Optional[int] = None  # Linked automatically from date/time when omitted
 
 class SessionNoteResponse(BaseModel):
     notes_id: int
@@ -21,6 +47,137 @@ class SessionNoteResponse(BaseModel):
     session_time: Optional[time]
     created_at: datetime
     last_edited_at: datetime
+    session_id: Optional[int] = None
+
+class SessionNoteSummary(BaseModel):
+    # List view of a note; the body is fetched separately
+    notes_id: int
+    therapist_id: int
+    session_date: date
+    note_title: Optional[str]
+    session_time: Optional[time]
+    note_length: int
+    note_preview: str
+    created_at: datetime
+    last_edited_at: datetime
+    session_id: Optional[int] = None
+
+# note_length and note_preview are generated columns (others/schema.sql),
+# so list queries never read the note body
+NOTE_SUMMARY_COLUMNS = '''
+            notes_id,
+            therapist_id,
+            session_date,
+            note_title,
+            session_time,
+            note_length,
+            note_preview,
+            created_at,
+            last_edited_at,
+            session_id
+        '''
+
+def note_summary_from_row(note_data: dict) -> SessionNoteSummary:
+    return SessionNoteSummary(
+        notes_id=note_data['notes_id'],
+        therapist_id=note_data['therapist_id'],
+        session_date=note_data['session_date'],
+        note_title=note_data.get('note_title'),
+        session_time=note_data.get('session_time'),
+        note_length=note_data.get('note_length') or 0,
+        note_preview=note_data.get('note_preview') or '',
+        created_at=note_data['created_at'],
+        last_edited_at=note_data['last_edited_at'],
+        session_id=note_data.get('session_id')
+    )
+
+class NotesForDate(BaseModel):
+    session_date: date
+    notes: Union[List[SessionNoteSummary], List[SessionNoteResponse]]
+
+# Longest date range a single notes query may span
+MAX_NOTES_RANGE_DAYS = 92
+
+async def get_notes_in_range_grouped(therapist_id: int, date_from: date, date_to: date, include_content: bool = False) -> List[NotesForDate]:
+    """
+    Get a therapist's notes between two dates (inclusive), grouped by day.
+    One range query on (therapist_id, session_date), served by idx_session_notes_therapist_date.
+    """
+    try:
+        supabase = get_supabase_client()
+        
+        columns = NOTE_SUMMARY_COLUMNS
+        if include_content:
+            columns = 'notes_id, therapist_id, session_date, note_content, note_title, session_time, created_at, last_edited_at, session_id'
+        
+        result = supabase.table('session_notes').select(columns).eq('therapist_id', therapist_id).gte('session_date', date_from.isoformat()).lte('session_date', date_to.isoformat()).order('session_date').order('created_at', desc=True).execute()
+        
+        groups: List[NotesForDate] = []
+        for note_data in result.data or []:
+            note = SessionNoteResponse(**note_data) if include_content else note_summary_from_row(note_data)
+            if not groups or groups[-1].session_date != note.session_date:
+                groups.append(NotesForDate(session_date=note.session_date, notes=[]))
+            groups[-1].notes.append(note)
+        
+        logger.info("Retrieved notes on %s dates for therapist %s between %s and %s", len(groups), therapist_id, date_from, date_to)
+        return groups
+        
+    except Exception as e:
+        logger.error("Error getting notes in range for therapist: %s", e)
+        raise Exception(f"Database error: {str(e)}")
+
+async def get_note_summaries_by_date_and_therapist(therapist_id: int, session_date: date) -> List[SessionNoteSummary]:
+    """Get note summaries (no bodies) for a specific therapist on a specific date"""
+    try:
+        supabase = get_supabase_client()
+        
+        result = supabase.table('session_notes').select(NOTE_SUMMARY_COLUMNS).eq('therapist_id', therapist_id).eq('session_date', session_date.isoformat()).order('created_at', desc=True).execute()
+        
+        notes = [note_summary_from_row(note_data) for note_data in (result.data or [])]
+        
+        logger.info("Retrieved %s note summaries for therapist %s on date %s", len(notes), therapist_id, session_date)
+        return notes
+        
+    except Exception as e:
+        logger.error("Error getting note summaries by date and therapist: %s", e)
+        raise Exception(f"Database error: {str(e)}")
+
+async def get_note_by_id(therapist_id: int, notes_id: int) -> Optional[SessionNoteResponse]:
+    """Get a single note, body included"""
+    try:
+        supabase = get_supabase_client()
+        
+        result = supabase.table('session_notes').select('''
+            notes_id,
+            therapist_id,
+            session_date,
+            note_content,
+            note_title,
+            session_time,
+            created_at,
+            last_edited_at,
+            session_id
+        ''').eq('notes_id', notes_id).eq('therapist_id', therapist_id).execute()
+        
+        if not result.data:
+            return None
+        
+        note_data = result.data[0]
+        return SessionNoteResponse(
+            notes_id=note_data['notes_id'],
+            therapist_id=note_data['therapist_id'],
+            session_date=note_data['session_date'],
+            note_content=note_data['note_content'],
+            note_title=note_data.get('note_title'),
+            session_time=note_data.get('session_time'),
+            created_at=note_data['created_at'],
+            last_edited_at=note_data['last_edited_at'],
+            session_id=note_data.get('session_id')
+        )
+        
+    except Exception as e:
+        logger.error("Error getting note %s: %s", notes_id, e)
+        raise Exception(f"Database error: {str(e)}")
 
 async def get_notes_by_date_and_therapist(therapist_id: int, session_date: date) -> List[SessionNoteResponse]:
     """Get all notes for a specific therapist on a specific date"""
@@ -36,13 +193,14 @@ async def get_notes_by_date_and_therapist(therapist_id: int, session_date: date)
             note_title,
             session_time,
             created_at,
-            last_edited_at
+            last_edited_at,
+            session_id
         ''').eq('therapist_id', therapist_id).eq('session_date', session_date.isoformat()).order('created_at', desc=True)
         
         result = query.execute()
         
         if not result.data:
-            logger.info(f"No notes found for therapist {therapist_id} on date {session_date}")
+            logger.info("No notes found for therapist %s on date %s", therapist_id, session_date)
             return []
         
         notes = []
@@ -55,15 +213,16 @@ async def get_notes_by_date_and_therapist(therapist_id: int, session_date: date)
                 note_title=note_data.get('note_title'),
                 session_time=note_data.get('session_time'),
                 created_at=note_data['created_at'],
-                last_edited_at=note_data['last_edited_at']
+                last_edited_at=note_data['last_edited_at'],
+                session_id=note_data.get('session_id')
             )
             notes.append(note)
         
-        logger.info(f"Retrieved {len(notes)} notes for therapist {therapist_id} on date {session_date}")
+        logger.info("Retrieved %s notes for therapist %s on date %s", len(notes), therapist_id, session_date)
         return notes
         
     except Exception as e:
-        logger.error(f"Error getting notes by date and therapist: {str(e)}")
+        logger.error("Error getting notes by date and therapist: %s", e)
         raise Exception(f"Database error: {str(e)}")
 
 async def create_session_note(therapist_id: int, note_data: SessionNoteCreate) -> SessionNoteResponse:
@@ -78,6 +237,7 @@ async def create_session_note(therapist_id: int, note_data: SessionNoteCreate) -
             'note_content': note_data.note_content,
             'note_title': note_data.note_title,
             'session_time': note_data.session_time.isoformat() if note_data.session_time else None,
+            'session_id': note_data.session_id,
             'created_at': datetime.now().isoformat(),
             'last_edited_at': datetime.now().isoformat()
         }
@@ -88,6 +248,7 @@ async def create_session_note(therapist_id: int, note_data: SessionNoteCreate) -
             raise Exception("Failed to create session note")
         
         note_data = result.data[0]
+        get_note_search().index_note(note_data)
         
         created_note = SessionNoteResponse(
             notes_id=note_data['notes_id'],
@@ -97,14 +258,16 @@ async def create_session_note(therapist_id: int, note_data: SessionNoteCreate) -
             note_title=note_data.get('note_title'),
             session_time=note_data.get('session_time'),
             created_at=note_data['created_at'],
-            last_edited_at=note_data['last_edited_at']
+            last_edited_at=note_data['last_edited_at'],
+            session_id=note_data.get('session_id')
         )
         
-        logger.info(f"Created new session note with ID: {created_note.notes_id}")
+        invalidate_note_dates(therapist_id, created_note.session_date)
+        logger.info("Created new session note with ID: %s", created_note.notes_id)
         return created_note
         
     except Exception as e:
-        logger.error(f"Error creating session note: {str(e)}")
+        logger.error("Error creating session note: %s", e)
         raise Exception(f"Database error: {str(e)}")
 
 async def get_notes_with_dates_for_therapist(therapist_id: int) -> List[date]:
@@ -121,9 +284,50 @@ async def get_notes_with_dates_for_therapist(therapist_id: int) -> List[date]:
         dates = list(set([datetime.fromisoformat(note['session_date']).date() for note in result.data]))
         dates.sort()
         
-        logger.info(f"Found notes on {len(dates)} different dates for therapist {therapist_id}")
+        logger.info("Found notes on %s different dates for therapist %s", len(dates), therapist_id)
         return dates
         
     except Exception as e:
-        logger.error(f"Error getting notes dates for therapist: {str(e)}")
+        logger.error("Error getting notes dates for therapist: %s", e)
+        raise Exception(f"Database error: {str(e)}")
+
+async def get_note_dates_for_month(therapist_id: int, year: int, month: int) -> List[date]:
+    """
+    Get the distinct dates in one month that have notes for a therapist.
+    The days are computed in the database (note_day_bitmap in others/schema.sql)
+    and cached per (therapist, month) as a day bitmap for NOTE_DATES_CACHE_TTL seconds.
+    """
+    try:
+        month_start = date(year, month, 1)
+        key = _month_key(therapist_id, month_start)
+        
+        bitmap = None
+        with _note_day_bitmaps_lock:
+            entry = _note_day_bitmaps.get(key)
+            if entry is not None:
+                if entry[1] > time_module.monotonic():
+                    bitmap = entry[0]
+                    _note_day_bitmaps.move_to_end(key)
+                else:
+                    del _note_day_bitmaps[key]
+        record_cache_lookup("note_dates", bitmap is not None)
+        
+        if bitmap is None:
+            supabase = get_supabase_client()
+            result = supabase.rpc('note_day_bitmap', {
+                'p_therapist_id': therapist_id,
+                'p_month': month_start.isoformat()
+            }).execute()
+            bitmap = int(result.data or 0)
+            
+            with _note_day_bitmaps_lock:
+                _note_day_bitmaps[key] = (bitmap, time_module.monotonic() + NOTE_DATES_CACHE_TTL)
+                while len(_note_day_bitmaps) > NOTE_DATES_CACHE_SIZE:
+                    _note_day_bitmaps.popitem(last=False)
+        
+        days_in_month = monthrange(year, month)[1]
+        return [date(year, month, day) for day in range(1, days_in_month + 1) if bitmap & (1 << (day - 1))]
+        
+    except Exception as e:
+        logger.error("Error getting note dates for therapist %s in %s-%02d: %s", therapist_id, year, month, e)
         raise Exception(f"Database error: {str(e)}")
@@ -0,0 +1,202 @@
+from typing import Dict, List, Optional, Set, Tuple
+from datetime import date, time
+from collections import Counter
+from pydantic import BaseModel
+import logging
+import math
+import os
+import re
+import threading
+from db import get_supabase_client
+
+logger = logging.getLogger(__name__)
+
+class NoteSearchHit(BaseModel):
+    notes_id: int
+    session_date: date
+    session_time: Optional[time]
+    note_title: Optional[str]
+    rank: float
+    snippet: str
+
+class NoteSearchResponse(BaseModel):
+    query: str
+    results: List[NoteSearchHit]
+    limit: int
+    offset: int
+    has_more: bool
+
+class PostgresNoteSearch:
+    """
+    Full-text search backed by the session_notes.search_vector GIN index and the
+    search_session_notes() function in others/schema.sql. Ranking and snippet
+    highlighting happen in the database, so note bodies never leave it.
+    """
+
+    def index_note(self, note: Dict) -> None:
+        # search_vector is a generated column, nothing to do
+        pass
+
+    def search(self, therapist_id: int, query: str, limit: int, offset: int) -> List[NoteSearchHit]:
+        supabase = get_supabase_client()
+        result = supabase.rpc('search_session_notes', {
+            'p_therapist_id': therapist_id,
+            'p_query': query,
+            'p_limit': limit,
+            'p_offset': offset
+        }).execute()
+        return [NoteSearchHit(**row) for row in (result.data or [])]
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+TITLE_WEIGHT = 2.0
+SNIPPET_WORDS = 20
+
+def _tokenize(text: Optional[str]) -> List[str]:
+    return _TOKEN_RE.findall(text.lower()) if text else []
+
+class InMemoryNoteSearch:
+    """
+    Local stand-in for PostgresNoteSearch using an in-process inverted index.
+    A therapist's notes are loaded on their first search and kept current via
+    index_note; meant for tests and local development.
+    """
+
+    def __init__(self, loader=None):
+        self._loader = loader or self._load_from_database
+        self._lock = threading.Lock()
+        self._notes: Dict[int, Dict] = {}
+        self._postings: Dict[int, Dict[str, Dict[int, float]]] = {}
+        # Indexed notes per therapist, the N in each term's idf
+        self._note_counts: Dict[int, int] = {}
+        self._loaded: Set[int] = set()
+
+    def _load_from_database(self, therapist_id: int) -> List[Dict]:
+        supabase = get_supabase_client()
+        result = supabase.table('session_notes').select(
+            'notes_id, therapist_id, session_date, session_time, note_title, note_content'
+        ).eq('therapist_id', therapist_id).execute()
+        return result.data or []
+
+    def _ensure_loaded(self, therapist_id: int) -> None:
+        if therapist_id in self._loaded:
+            return
+        notes = self._loader(therapist_id)
+        with self._lock:
+            if therapist_id in self._loaded:
+                return
+            for note in notes:
+                self._add(note)
+            self._loaded.add(therapist_id)
+
+    def _add(self, note: Dict) -> None:
+        therapist_id = note['therapist_id']
+        notes_id = note['notes_id']
+        self._remove(notes_id)
+
+        weights: Counter = Counter()
+        for term in _tokenize(note.get('note_title')):
+            weights[term] += TITLE_WEIGHT
+        for term in _tokenize(note.get('note_content')):
+            weights[term] += 1.0
+
+        postings = self._postings.setdefault(therapist_id, {})
+        for term, weight in weights.items():
+            postings.setdefault(term, {})[notes_id] = weight
+        self._notes[notes_id] = note
+        self._note_counts[therapist_id] = self._note_counts.get(therapist_id, 0) + 1
+
+    def _remove(self, notes_id: int) -> None:
+        old = self._notes.pop(notes_id, None)
+        if not old:
+            return
+        self._note_counts[old['therapist_id']] -= 1
+        postings = self._postings.get(old['therapist_id'], {})
+        for term in set(_tokenize(old.get('note_title')) + _tokenize(old.get('note_content'))):
+            docs = postings.get(term)
+            if docs:
+                docs.pop(notes_id, None)
+                if not docs:
+                    del postings[term]
+
+    def index_note(self, note: Dict) -> None:
+        with self._lock:
+            # Notes for therapists not loaded yet are picked up by their first search
+            if note['therapist_id'] in self._loaded:
+                self._add(note)
+
+    def _snippet(self, content: str, terms: Set[str]) -> str:
+        words = content.split()
+        first = next((i for i, word in enumerate(words) if set(_tokenize(word)) & terms), 0)
+        start = max(0, first - SNIPPET_WORDS // 4)
+        window = words[start:start + SNIPPET_WORDS]
+        highlighted = [f"<mark>{word}</mark>" if set(_tokenize(word)) & terms else word for word in window]
+        return ' '.join(highlighted)
+
+    def search(self, therapist_id: int, query: str, limit: int, offset: int) -> List[NoteSearchHit]:
+        self._ensure_loaded(therapist_id)
+        terms = set(_tokenize(query))
+        if not terms:
+            return []
+
+        with self._lock:
+            postings = self._postings.get(therapist_id, {})
+            matches = [postings.get(term, {}) for term in terms]
+            if not all(matches):
+                return []
+
+            # Every query term must match; rank by summed tf-idf
+            total_notes = self._note_counts.get(therapist_id, 0)
+            candidates = set.intersection(*(set(docs) for docs in matches))
+            scored: List[Tuple[float, Dict]] = []
+            for notes_id in candidates:
+                score = sum(docs[notes_id] * math.log(1 + total_notes / len(docs)) for docs in matches)
+                scored.append((score, self._notes[notes_id]))
+
+        # Best rank first, most recent session first among ties
+        scored.sort(key=lambda item: str(item[1]['session_date']), reverse=True)
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return [
+            NoteSearchHit(
+                notes_id=note['notes_id'],
+                session_date=note['session_date'],
+                session_time=note.get('session_time'),
+                note_title=note.get('note_title'),
+                rank=round(score, 6),
+                snippet=self._snippet(note.get('note_content') or '', terms)
+            )
+            for score, note in scored[offset:offset + limit]
+        ]
+
+_note_search = None
+
+def get_note_search():
+    """
+    Get the configured note search backend
+    NOTES_SEARCH_BACKEND=memory selects the in-process index, anything else Postgres
+    """
+    global _note_search
+    if _note_search is None:
+        if os.getenv("NOTES_SEARCH_BACKEND", "postgres").lower() == "memory":
+            _note_search = InMemoryNoteSearch()
+        else:
+            _note_search = PostgresNoteSearch()
+    return _note_search
+
+async def search_notes(therapist_id: int, query: str, limit: int = 20, offset: int = 0) -> NoteSearchResponse:
+    """Search a therapist's notes, returning ranked hits with highlighted snippets"""
+    try:
+        # Fetch one extra row to know whether another page exists
+        hits = get_note_search().search(therapist_id, query, limit + 1, offset)
+
+        logger.info("Note search for therapist %s returned %s results", therapist_id, min(len(hits), limit))
+        return NoteSearchResponse(
+            query=query,
+            results=hits[:limit],
+            limit=limit,
+            offset=offset,
+            has_more=len(hits) > limit
+        )
+
+    except Exception as e:
+        logger.error("Error searching notes for therapist %s: %s", therapist_id, e)
+        raise Exception(f"Database error: {str(e)}")
@@ -73,3 +73,233 @@ CREATE TABLE session_notes (
 CREATE INDEX idx_session_notes_therapist_id ON session_notes(therapist_id);
 CREATE INDEX idx_session_notes_session_date ON session_notes(session_date);
 CREATE INDEX idx_session_notes_therapist_date ON session_notes(therapist_id, session_date);
+
+-- Distinct days in a month that have notes for a therapist, packed into a
+-- day bitmap (bit n-1 set = notes on day n). Served by idx_session_notes_therapist_date.
+CREATE OR REPLACE FUNCTION note_day_bitmap(p_therapist_id BIGINT, p_month DATE)
+RETURNS INTEGER
+LANGUAGE sql STABLE
+AS $$
+  SELECT COALESCE(bit_or(1 << (EXTRACT(DAY FROM session_date)::INT - 1)), 0)
+  FROM session_notes
+  WHERE therapist_id = p_therapist_id
+    AND session_date >= date_trunc('month', p_month)::DATE
+    AND session_date < (date_trunc('month', p_month) + INTERVAL '1 month')::DATE;
+$$;
+
+-- Full-text search over session notes (title weighted above body)
+ALTER TABLE session_notes ADD COLUMN IF NOT EXISTS search_vector TSVECTOR
+  GENERATED ALWAYS AS (
+    setweight(to_tsvector('english', COALESCE(note_title, '')), 'A') ||
+    setweight(to_tsvector('english', COALESCE(note_content, '')), 'B')
+  ) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_session_notes_search ON session_notes USING GIN (search_vector);
+
+-- Ranked, paginated search; snippets are built only for the returned page
+CREATE OR REPLACE FUNCTION search_session_notes(p_therapist_id BIGINT, p_query TEXT, p_limit INT, p_offset INT)
+RETURNS TABLE (notes_id BIGINT, session_date DATE, session_time TIME, note_title VARCHAR, rank REAL, snippet TEXT)
+LANGUAGE sql STABLE
+AS $$
+  WITH q AS (
+    SELECT websearch_to_tsquery('english', p_query) AS query
+  ), hits AS (
+    SELECT n.notes_id, n.session_date, n.session_time, n.note_title, n.note_content,
+           ts_rank_cd(n.search_vector, q.query) AS rank, q.query
+    FROM session_notes n, q
+    WHERE n.therapist_id = p_therapist_id
+      AND n.search_vector @@ q.query
+    ORDER BY rank DESC, n.session_date DESC
+    LIMIT p_limit OFFSET p_offset
+  )
+  SELECT notes_id, session_date, session_time, note_title, rank,
+         ts_headline('english', note_content, query,
+                     'StartSel=<mark>, StopSel=</mark>, MaxFragments=2, MaxWords=20, MinWords=5')
+  FROM hits
+  ORDER BY rank DESC, session_date DESC;
+$$;
+
+-- Lean note lists: length and preview live beside the body so list queries
+-- never touch note_content
+ALTER TABLE session_notes ADD COLUMN IF NOT EXISTS note_length INT
+  GENERATED ALWAYS AS (char_length(note_content)) STORED;
+ALTER TABLE session_notes ADD COLUMN IF NOT EXISTS note_preview VARCHAR(160)
+  GENERATED ALWAYS AS (left(note_content, 160)) STORED;
+
+-- Bodies above ~1 KB are compressed (lz4, PostgreSQL 14+) and moved out of
+-- line by TOAST; full-text search and ts_headline keep working on them
+ALTER TABLE session_notes ALTER COLUMN note_content SET COMPRESSION lz4;
+ALTER TABLE session_notes SET (toast_tuple_target = 1024);
+
+-- Link notes to the session they were written for
+ALTER TABLE session_notes ADD COLUMN IF NOT EXISTS session_id BIGINT
+  REFERENCES sessions(id) ON DELETE SET NULL;
+CREATE INDEX IF NOT EXISTS idx_session_notes_session_id ON session_notes(session_id);
+
+-- Resolve a note's session from therapist, date and time: the session whose
+-- time window contains session_time, or the only session that day when the
+-- note has no time
+CREATE OR REPLACE FUNCTION match_note_session(p_therapist_id BIGINT, p_session_date DATE, p_session_time TIME)
+RETURNS BIGINT
+LANGUAGE sql STABLE
+AS $$
+  SELECT CASE
+    WHEN p_session_time IS NOT NULL THEN (
+      SELECT s.id FROM sessions s
+      WHERE s.therapist_id = p_therapist_id
+        AND s.session_date = p_session_date
+        AND p_session_time >= s.start_time AND p_session_time < s.end_time
+      ORDER BY s.start_time
+      LIMIT 1
+    )
+    ELSE (
+      SELECT MIN(s.id) FROM sessions s
+      WHERE s.therapist_id = p_therapist_id
+        AND s.session_date = p_session_date
+      HAVING COUNT(*) = 1
+    )
+  END;
+$$;
+
+-- Fill in session_id on insert when the client did not send one, and reject
+-- links to another therapist's session
+CREATE OR REPLACE FUNCTION link_note_session()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  IF NEW.session_id IS NULL THEN
+    NEW.session_id := match_note_session(NEW.therapist_id, NEW.session_date, NEW.session_time);
+  ELSIF NOT EXISTS (SELECT 1 FROM sessions WHERE id = NEW.session_id AND therapist_id = NEW.therapist_id) THEN
+    RAISE EXCEPTION 'session % does not belong to therapist %', NEW.session_id, NEW.therapist_id;
+  END IF;
+  RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_link_note_session ON session_notes;
+CREATE TRIGGER trg_link_note_session
+  BEFORE INSERT ON session_notes
+  FOR EACH ROW EXECUTE FUNCTION link_note_session();
+
+-- One-off backfill for notes written before the link existed
+UPDATE session_notes
+SET session_id = match_note_session(therapist_id, session_date, session_time)
+WHERE session_id IS NULL;
+
+-- Weekly progress digests for parents, one document per child and week,
+-- written by the background job in sessions/digests.py
+CREATE TABLE IF NOT EXISTS parent_weekly_digests (
+  child_id BIGINT NOT NULL REFERENCES children(id) ON DELETE CASCADE,
+  week_start DATE NOT NULL,  -- Monday of the week
+  digest JSONB NOT NULL,
+  generated_at TIMESTAMPTZ DEFAULT NOW(),
+  PRIMARY KEY (child_id, week_start)
+);
+
+-- Progress markers for incremental background jobs
+CREATE TABLE IF NOT EXISTS digest_job_state (
+  job_name TEXT PRIMARY KEY,
+  watermark TIMESTAMPTZ,  -- updated_at of the last source row processed
+  updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- The digest job reads changed sessions in (updated_at, id) order
+CREATE INDEX IF NOT EXISTS idx_sessions_updated_at ON sessions(updated_at);
+
+-- ...and edited notes in last_edited_at order, with their own watermark.
+-- lease_owner/lease_until make sure only one worker runs a job at a time
+ALTER TABLE digest_job_state ADD COLUMN IF NOT EXISTS notes_watermark TIMESTAMPTZ;
+-- id of the last session processed at watermark: changed sessions are paged on
+-- (updated_at, id), so rows sharing one updated_at are never skipped
+ALTER TABLE digest_job_state ADD COLUMN IF NOT EXISTS watermark_id BIGINT;
+ALTER TABLE digest_job_state ADD COLUMN IF NOT EXISTS lease_owner TEXT;
+ALTER TABLE digest_job_state ADD COLUMN IF NOT EXISTS lease_until TIMESTAMPTZ;
+CREATE INDEX IF NOT EXISTS idx_session_notes_last_edited_at ON session_notes(last_edited_at);
+
+-- Take or renew a job's lease; true when p_owner now holds it
+CREATE OR REPLACE FUNCTION claim_job_lease(p_job_name TEXT, p_owner TEXT, p_seconds INT)
+RETURNS BOOLEAN
+LANGUAGE sql
+AS $$
+  INSERT INTO digest_job_state (job_name, lease_owner, lease_until)
+  VALUES (p_job_name, p_owner, NOW() + make_interval(secs => p_seconds))
+  ON CONFLICT (job_name) DO UPDATE
+    SET lease_owner = EXCLUDED.lease_owner, lease_until = EXCLUDED.lease_until
+    WHERE digest_job_state.lease_owner = p_owner
+       OR digest_job_state.lease_owner IS NULL
+       OR digest_job_state.lease_until < NOW()
+  RETURNING TRUE;
+$$;
+
+-- Rotating refresh tokens (authentication/tokens.py). Only a SHA-256 digest
+-- of each token is stored; tokens issued from one login share a family_id
+CREATE TABLE IF NOT EXISTS refresh_tokens (
+  id BIGSERIAL PRIMARY KEY,
+  user_id BIGINT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+  token_hash CHAR(64) NOT NULL UNIQUE,
+  family_id UUID NOT NULL,
+  expires_at TIMESTAMPTZ NOT NULL,
+  rotated_at TIMESTAMPTZ,  -- Set when exchanged for its successor
+  revoked_at TIMESTAMPTZ,  -- Set on logout or when reuse revokes the family
+  created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_refresh_tokens_family_id ON refresh_tokens(family_id);
+CREATE INDEX IF NOT EXISTS idx_refresh_tokens_user_id ON refresh_tokens(user_id);
+
+-- Shared login throttle counters, used when LOGIN_THROTTLE_BACKEND=postgres
+-- (authentication/throttle.py). Keys are 'ip:<address>', 'ip-account:<address>:<email>'
+-- or 'account:<email>'
+CREATE TABLE IF NOT EXISTS login_attempts (
+  throttle_key TEXT NOT NULL,
+  attempted_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_login_attempts_key_time ON login_attempts(throttle_key, attempted_at DESC);
+
+-- Seconds until a key drops back under p_limit attempts in the window, 0 if it already is
+CREATE OR REPLACE FUNCTION login_throttle_retry_after(p_key TEXT, p_limit INT, p_window_seconds DOUBLE PRECISION)
+RETURNS DOUBLE PRECISION
+LANGUAGE sql STABLE
+AS $$
+  SELECT COALESCE((
+    SELECT GREATEST(EXTRACT(EPOCH FROM (attempted_at + make_interval(secs => p_window_seconds) - NOW())), 0)
+    FROM login_attempts
+    WHERE throttle_key = p_key
+      AND attempted_at > NOW() - make_interval(secs => p_window_seconds)
+    ORDER BY attempted_at DESC
+    OFFSET p_limit - 1
+    LIMIT 1
+  ), 0);
+$$;
+
+-- Record an attempt and drop the key's attempts that have left the window
+CREATE OR REPLACE FUNCTION login_throttle_hit(p_key TEXT, p_window_seconds DOUBLE PRECISION)
+RETURNS VOID
+LANGUAGE sql
+AS $$
+  DELETE FROM login_attempts
+  WHERE throttle_key = p_key
+    AND attempted_at <= NOW() - make_interval(secs => p_window_seconds);
+  INSERT INTO login_attempts (throttle_key) VALUES (p_key);
+$$;
+
+-- Batched write-behind of user bookkeeping columns (users/bookkeeping.py).
+-- p_rows is a JSON array of {"id": ..., "last_login": ...}; a timestamp never
+-- moves backwards. Returns the number of users updated
+CREATE OR REPLACE FUNCTION apply_user_bookkeeping(p_rows JSONB)
+RETURNS INT
+LANGUAGE sql
+AS $$
+  WITH changes AS (
+    SELECT * FROM jsonb_to_recordset(p_rows) AS x(id BIGINT, last_login TIMESTAMPTZ)
+  ), updated AS (
+    UPDATE users u
+    SET last_login = GREATEST(u.last_login, c.last_login)
+    FROM changes c
+    WHERE u.id = c.id
+    RETURNING 1
+  )
+  SELECT COUNT(*)::INT FROM updated;
+$$;
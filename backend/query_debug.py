@@ -0,0 +1,101 @@
+"""
+N+1 and round-trip detection for development and test runs.
+
+With QUERY_DEBUG=1 the instrumented Supabase client (see db.py) records every
+query a request issues together with its shape: the table and operation plus
+the filter columns, without their values, so `users.select eq(email)` run for
+two different emails counts as the same query twice. After each request the
+queries are grouped by shape and a warning is logged when one shape repeats
+QUERY_REPEAT_THRESHOLD times or more (the N+1 pattern), or when
+QUERY_SEQUENTIAL_THRESHOLD or more queries ran back to back, each waiting for
+the previous one.
+
+Routes declare how many queries they are expected to issue with
+@query_budget(n). Going over the budget is logged in debug mode. With
+QUERY_BUDGET_STRICT=1 it raises QueryBudgetExceeded, so test runs fail (the
+TestClient re-raises server errors; see tests/test_query_budget.py).
+expect_queries() applies the same check to a block of code outside a request.
+"""
+from collections import Counter
+from contextlib import contextmanager
+from typing import Callable, List, NamedTuple, Optional, Tuple
+import logging
+import os
+from timing import RequestTimings, current_timings, timings_scope
+
+logger = logging.getLogger("query_debug")
+
+QUERY_DEBUG = os.getenv("QUERY_DEBUG", "0") == "1"
+QUERY_BUDGET_STRICT = os.getenv("QUERY_BUDGET_STRICT", "0") == "1"
+QUERY_REPEAT_THRESHOLD = int(os.getenv("QUERY_REPEAT_THRESHOLD", "2"))
+QUERY_SEQUENTIAL_THRESHOLD = int(os.getenv("QUERY_SEQUENTIAL_THRESHOLD", "3"))
+
+# Builder calls whose first argument is a column; they make up a query's shape
+FILTER_METHODS = frozenset({
+    'eq', 'neq', 'gt', 'gte', 'lt', 'lte', 'like', 'ilike', 'is_', 'in_',
+    'contains', 'contained_by', 'match', 'filter', 'or_', 'order', 'on_conflict'
+})
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+class QueryRecord(NamedTuple):
+    shape: str
+    started: float
+    ended: float
+
+def query_shape(label: str, filters: Tuple[str, ...]) -> str:
+    return f"{label} {' '.join(sorted(set(filters)))}".rstrip()
+
+def record_query(shape: str, started: float, ended: float) -> None:
+    timings = current_timings()
+    if timings is not None:
+        timings.queries.append(QueryRecord(shape, started, ended))
+
+def query_budget(max_queries: int) -> Callable:
+    """Declare the most DB round trips a route may make; put it below the @app route decorator"""
+    def decorate(endpoint):
+        endpoint.__query_budget__ = max_queries
+        return endpoint
+    return decorate
+
+def repeated_shapes(queries: List[QueryRecord]) -> List[Tuple[str, int]]:
+    counts = Counter(query.shape for query in queries)
+    return [(shape, count) for shape, count in counts.most_common() if count >= QUERY_REPEAT_THRESHOLD]
+
+def longest_sequential_run(queries: List[QueryRecord]) -> int:
+    """Most queries in a row that each started only after the previous one finished"""
+    longest = run = 0
+    previous_end = None
+    for query in sorted(queries, key=lambda q: q.started):
+        run = run + 1 if previous_end is not None and query.started >= previous_end else 1
+        previous_end = query.ended if previous_end is None else max(previous_end, query.ended)
+        longest = max(longest, run)
+    return longest
+
+def check_queries(where: str, timings: RequestTimings, budget: Optional[int] = None) -> None:
+    """Log N+1 and sequential round-trip findings, and enforce the query budget if one is declared"""
+    queries = timings.queries
+    for shape, count in repeated_shapes(queries):
+        logger.warning("%s: '%s' ran %s times in one request (possible N+1)", where, shape, count)
+    sequential = longest_sequential_run(queries)
+    if sequential >= QUERY_SEQUENTIAL_THRESHOLD:
+        logger.warning("%s: %s sequential DB round trips (%s)", where, sequential, ', '.join(q.shape for q in queries))
+
+    if budget is not None and len(timings.db_calls) > budget:
+        message = f"{where} made {len(timings.db_calls)} queries, budget is {budget}"
+        if QUERY_BUDGET_STRICT:
+            raise QueryBudgetExceeded(message)
+        logger.error(message)
+
+def check_request_queries(method: str, route, path: str, timings: RequestTimings) -> None:
+    """Called by the HTTP middleware after each request when QUERY_DEBUG is on"""
+    budget = getattr(getattr(route, "endpoint", None), "__query_budget__", None)
+    check_queries(f"{method} {getattr(route, 'path', path)}", timings, budget)
+
+@contextmanager
+def expect_queries(max_queries: int, where: str = "block"):
+    """Fail (strict mode) or log if the block issues more than max_queries queries"""
+    with timings_scope() as timings:
+        yield timings
+    check_queries(where, timings, max_queries)
@@ -0,0 +1,127 @@
+"""
+Production entrypoint for the ThrivePath API: python serve.py
+
+`python app.py` remains the development server (one process, auto-reload).
+This runs uvicorn with the uvloop event loop and the httptools HTTP parser,
+all configured through the environment (or .env):
+
+    HOST                    bind address (0.0.0.0)
+    PORT                    bind port (8000)
+    WEB_CONCURRENCY         worker processes (1, see below before raising it)
+    UVICORN_LOOP            uvloop | asyncio | auto (uvloop)
+    UVICORN_HTTP            httptools | h11 | auto (httptools)
+    KEEPALIVE_TIMEOUT       seconds an idle keep-alive connection stays open (5)
+    BACKLOG                 pending-connection queue per listening socket (2048)
+    GRACEFUL_TIMEOUT        seconds in-flight requests get to finish on shutdown (30)
+    LIMIT_CONCURRENCY       per-worker connection cap, answered with 503 beyond it (unset)
+    FORWARDED_ALLOW_IPS     proxies whose X-Forwarded-* headers are trusted (127.0.0.1)
+    ACCESS_LOG              1 to add uvicorn's access log; request_timing already logs each request (0)
+
+The bcrypt cost is calibrated once here, before the workers start, and handed
+to all of them through BCRYPT_ROUNDS (unless already set), so every worker
+hashes at the same cost. Each worker opens the Supabase connection with one
+small query in the app's lifespan hook before it accepts connections. Uvicorn's
+own logging goes through the queued pipeline in logging_config.py. With more
+than one worker, PROMETHEUS_MULTIPROC_DIR is pointed at a fresh directory
+(unless already set) so /metrics reports every worker.
+
+Throughput (benchmark_server.py, 64 keep-alive connections, 10s per run; the
+load generator shares the machine). GET / does no database work, so these
+numbers are the ceiling of the HTTP stack and middleware. Routes that query
+Supabase are bound by its round trips instead.
+
+    1 vCPU container, Python 3.11, uvicorn 0.54, GET /
+    workers  loop/http           req/s   p50 ms   p99 ms
+    1        asyncio/h11           529    109.7    221.5
+    1        uvloop/httptools      781     72.9    164.9
+    2        uvloop/httptools      596     92.0    269.8
+
+On one CPU a second worker only adds contention.
+
+Some state still lives in each worker's memory, which is why the default is a
+single worker. With WEB_CONCURRENCY above 1:
+
+    - live session events (sessions/events.py) reach only the streams held by
+      the worker that made the change, and a stream ticket can only be
+      redeemed in the worker that issued it
+    - logging out revokes the access token only in the worker that handled
+      the logout; others accept it until it expires
+    - login throttling counts per worker unless LOGIN_THROTTLE_BACKEND=postgres
+
+The session owner and note-date caches are per worker too, but they expire
+after SESSION_OWNER_CACHE_TTL and NOTE_DATES_CACHE_TTL, so other workers are
+stale for at most that long. The digest refresh takes a database lease, so
+only one worker runs it at a time. Move the state above to a shared backend before giving
+WEB_CONCURRENCY one worker per core, and rerun benchmark_server.py on the
+target machine when you do.
+"""
+import glob
+import os
+import tempfile
+import logging
+from dotenv import load_dotenv
+from logging_config import configure_logging
+
+load_dotenv(override=True)
+configure_logging()
+logger = logging.getLogger("serve")
+
+def _int_env(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+def server_config() -> dict:
+    """uvicorn.run() keyword arguments from the environment"""
+    limit_concurrency = os.getenv("LIMIT_CONCURRENCY")
+    return {
+        'host': os.getenv("HOST", "0.0.0.0"),
+        'port': _int_env("PORT", 8000),
+        'workers': _int_env("WEB_CONCURRENCY", 1),
+        'loop': os.getenv("UVICORN_LOOP", "uvloop"),
+        'http': os.getenv("UVICORN_HTTP", "httptools"),
+        'timeout_keep_alive': _int_env("KEEPALIVE_TIMEOUT", 5),
+        'backlog': _int_env("BACKLOG", 2048),
+        'timeout_graceful_shutdown': _int_env("GRACEFUL_TIMEOUT", 30),
+        'limit_concurrency': int(limit_concurrency) if limit_concurrency else None,
+        'proxy_headers': True,
+        'forwarded_allow_ips': os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1"),
+        'access_log': os.getenv("ACCESS_LOG", "0") == "1",
+        # Keep the queued JSON logging instead of uvicorn's default handlers
+        'log_config': None,
+    }
+
+def prepare_metrics_dir(workers: int) -> None:
+    """Give multi-worker runs an empty directory for prometheus_client's per-process files"""
+    if workers <= 1:
+        return
+    directory = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if directory:
+        # Sample files left by a previous run would be summed into this one
+        os.makedirs(directory, exist_ok=True)
+        for stale in glob.glob(os.path.join(directory, "*.db")):
+            os.remove(stale)
+    else:
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="thrivepath-metrics-")
+
+def main():
+    import uvicorn
+
+    config = server_config()
+    if config['workers'] > 1:
+        logger.warning(
+            "Running %d workers: session events, logout and in-memory login throttling "
+            "only apply within one worker (see serve.py)", config['workers']
+        )
+    prepare_metrics_dir(config['workers'])
+    # Imported after the metrics directory is chosen, since it registers metrics
+    from authentication.passwords import pin_password_rounds
+    pin_password_rounds()
+    logger.info(
+        "Starting ThrivePath API on %s:%s with %d workers (%s/%s, keep-alive %ss, backlog %s, graceful timeout %ss)",
+        config['host'], config['port'], config['workers'], config['loop'], config['http'],
+        config['timeout_keep_alive'], config['backlog'], config['timeout_graceful_shutdown']
+    )
+    uvicorn.run("app:app", **config)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+"""
+Precomputed weekly progress digests for parents.
+
+A background task periodically picks up sessions and linked notes changed
+since its last run, recomputes the weekly digest of every (child, week) they
+touch and stores it in parent_weekly_digests. Parents read the stored
+documents, so opening the progress report never pages through raw session
+history. Every worker starts the task, but each run first claims a lease in
+digest_job_state, so only one process refreshes at a time.
+"""
+from typing import Any, Dict, List, Optional, Set, Tuple
+from datetime import date, datetime, timedelta
+from pydantic import BaseModel
+import asyncio
+import json
+import logging
+import os
+import socket
+from db import get_supabase_client
+
+logger = logging.getLogger(__name__)
+
+# Seconds between digest refresh runs; 0 disables the background task
+PARENT_DIGEST_INTERVAL = float(os.getenv("PARENT_DIGEST_INTERVAL", "900"))
+# Changed sessions read per batch while catching up
+DIGEST_BATCH_SIZE = 500
+# Children whose weeks are loaded together in one sessions and one digests query
+DIGEST_CHILD_BATCH = 100
+# Note edits are stamped when made but written up to an autosave interval later,
+# so changed notes are re-read this far behind their watermark
+DIGEST_NOTE_LOOKBACK = timedelta(minutes=5)
+# A run holds the job lease this long past the interval; a crashed holder's
+# lease lapses after it and another worker takes over
+DIGEST_LEASE_GRACE = 120
+# Therapist note excerpts kept per weekly digest
+DIGEST_NOTE_EXCERPTS = 3
+DIGEST_JOB_NAME = 'parent_weekly_digests'
+
+# Position in a change feed: (stamp, key) of the last row processed
+Cursor = Tuple[str, Optional[int]]
+
+DIGEST_SESSION_COLUMNS = (
+    'id, session_date, start_time, total_planned_activities, completed_activities, '
+    'actual_duration_minutes, estimated_duration_minutes, therapist_notes, '
+    'session_notes (note_title, note_preview)'
+)
+
+class NoteExcerpt(BaseModel):
+    session_id: int
+    session_date: date
+    note_title: Optional[str] = None
+    excerpt: str
+
+class WeeklyDigest(BaseModel):
+    child_id: int
+    week_start: date
+    week_end: date
+    sessions_attended: int
+    activities_planned: int
+    activities_completed: int
+    completion_rate: Optional[float] = None
+    total_minutes: int
+    note_excerpts: List[NoteExcerpt] = []
+    # Change against the previous week; None when there is nothing to compare with
+    trends: Dict[str, Optional[float]] = {}
+    generated_at: datetime
+
+def week_start_for(day: date) -> date:
+    """Monday of the week containing day"""
+    return day - timedelta(days=day.weekday())
+
+def _as_date(value: Any) -> date:
+    return value if isinstance(value, date) else date.fromisoformat(str(value)[:10])
+
+def _delta(current: Optional[float], previous: Optional[float]) -> Optional[float]:
+    if current is None or previous is None:
+        return None
+    return round(current - previous, 4)
+
+def compute_weekly_digest(child_id: int, week_start: date, sessions: List[Dict[str, Any]],
+                          previous: Optional[Dict[str, Any]] = None) -> WeeklyDigest:
+    """Summarize one week of a child's completed sessions; previous is last week's stored digest"""
+    planned = sum(session.get('total_planned_activities') or 0 for session in sessions)
+    completed = sum(session.get('completed_activities') or 0 for session in sessions)
+    minutes = sum(
+        session.get('actual_duration_minutes') or session.get('estimated_duration_minutes') or 0
+        for session in sessions
+    )
+    completion_rate = round(completed / planned, 4) if planned else None
+
+    # Most recent sessions first; linked notes take precedence over the session's own notes field
+    excerpts: List[NoteExcerpt] = []
+    for session in sorted(sessions, key=lambda s: (str(s['session_date']), str(s.get('start_time') or '')), reverse=True):
+        candidates = [(note.get('note_title'), note.get('note_preview')) for note in session.get('session_notes') or []]
+        candidates.append((None, session.get('therapist_notes')))
+        for title, text in candidates:
+            text = (text or '').strip()
+            if text and len(excerpts) < DIGEST_NOTE_EXCERPTS:
+                excerpts.append(NoteExcerpt(
+                    session_id=session['id'],
+                    session_date=session['session_date'],
+                    note_title=title,
+                    excerpt=text
+                ))
+
+    trends: Dict[str, Optional[float]] = {}
+    if previous:
+        trends = {
+            'sessions_attended': _delta(len(sessions), previous.get('sessions_attended')),
+            'activities_completed': _delta(completed, previous.get('activities_completed')),
+            'completion_rate': _delta(completion_rate, previous.get('completion_rate')),
+            'total_minutes': _delta(minutes, previous.get('total_minutes'))
+        }
+
+    return WeeklyDigest(
+        child_id=child_id,
+        week_start=week_start,
+        week_end=week_start + timedelta(days=6),
+        sessions_attended=len(sessions),
+        activities_planned=planned,
+        activities_completed=completed,
+        completion_rate=completion_rate,
+        total_minutes=minutes,
+        note_excerpts=excerpts,
+        trends=trends,
+        generated_at=datetime.now()
+    )
+
+def _lease_owner() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def claim_digest_lease(interval: float = PARENT_DIGEST_INTERVAL) -> bool:
+    """Take or renew the job lease (claim_job_lease in others/schema.sql); False if another process holds it"""
+    supabase = get_supabase_client()
+    result = supabase.rpc('claim_job_lease', {
+        'p_job_name': DIGEST_JOB_NAME,
+        'p_owner': _lease_owner(),
+        'p_seconds': int(interval) + DIGEST_LEASE_GRACE
+    }).execute()
+    return bool(result.data)
+
+def _load_watermarks(supabase) -> Tuple[Optional[Cursor], Optional[str]]:
+    """The sessions cursor (updated_at, id) and the notes watermark saved by the last run"""
+    result = supabase.table('digest_job_state').select(
+        'watermark, watermark_id, notes_watermark'
+    ).eq('job_name', DIGEST_JOB_NAME).execute()
+    if not result.data:
+        return None, None
+    state = result.data[0]
+    cursor = (state['watermark'], state.get('watermark_id')) if state['watermark'] else None
+    return cursor, state['notes_watermark']
+
+def _save_watermarks(supabase, cursor: Optional[Cursor], notes_watermark: Optional[str]) -> None:
+    supabase.table('digest_job_state').upsert({
+        'job_name': DIGEST_JOB_NAME,
+        'watermark': cursor[0] if cursor else None,
+        'watermark_id': cursor[1] if cursor else None,
+        'notes_watermark': notes_watermark,
+        'updated_at': datetime.now().isoformat()
+    }, on_conflict='job_name').execute()
+
+def _changed_rows(supabase, table: str, columns: str, stamp: str, key: str, cursor: Optional[Cursor]):
+    """
+    Rows of table changed after cursor, in batches ordered by (stamp, key)
+    cursor is the (stamp, key) of the last row already processed; with a key of
+    None it starts at the stamp itself, inclusive
+    """
+    while True:
+        query = supabase.table(table).select(columns).not_.is_(stamp, 'null')
+        if cursor:
+            after, last_key = cursor
+            if last_key is None:
+                query = query.gte(stamp, after)
+            else:
+                # Keyset paging: rows sharing a stamp are split between batches by key, never skipped
+                query = query.or_(f'{stamp}.gt."{after}",and({stamp}.eq."{after}",{key}.gt.{last_key})')
+        rows = query.order(stamp).order(key).limit(DIGEST_BATCH_SIZE).execute().data or []
+        yield rows
+        if len(rows) < DIGEST_BATCH_SIZE:
+            return
+        cursor = (rows[-1][stamp], rows[-1][key])
+
+def _changed_weeks(supabase, cursor: Optional[Cursor]) -> Tuple[Set[Tuple[int, date]], Optional[Cursor]]:
+    """(child_id, week_start) pairs touched by sessions updated after cursor, and the new cursor"""
+    weeks: Set[Tuple[int, date]] = set()
+    columns = 'id, child_id, session_date, updated_at'
+    for rows in _changed_rows(supabase, 'sessions', columns, 'updated_at', 'id', cursor):
+        for row in rows:
+            if row.get('child_id'):
+                weeks.add((row['child_id'], week_start_for(_as_date(row['session_date']))))
+        if rows:
+            cursor = (rows[-1]['updated_at'], rows[-1]['id'])
+    return weeks, cursor
+
+def _note_changed_weeks(supabase, watermark: Optional[str]) -> Tuple[Set[Tuple[int, date]], Optional[str]]:
+    """
+    (child_id, week_start) pairs whose linked notes were edited since watermark, and the new watermark
+    Each run starts DIGEST_NOTE_LOOKBACK before the watermark, so only the stamp is kept
+    """
+    since = None
+    if watermark:
+        since = ((datetime.fromisoformat(watermark) - DIGEST_NOTE_LOOKBACK).isoformat(), None)
+    weeks: Set[Tuple[int, date]] = set()
+    columns = 'notes_id, last_edited_at, sessions (child_id, session_date)'
+    for rows in _changed_rows(supabase, 'session_notes', columns, 'last_edited_at', 'notes_id', since):
+        for row in rows:
+            session = row.get('sessions')
+            if session and session.get('child_id'):
+                weeks.add((session['child_id'], week_start_for(_as_date(session['session_date']))))
+        if rows and (watermark is None or rows[-1]['last_edited_at'] > watermark):
+            watermark = rows[-1]['last_edited_at']
+    return weeks, watermark
+
+def _load_sessions_for_weeks(supabase, child_ids: List[int], first: date, last: date) -> Dict[Tuple[int, date], List[Dict[str, Any]]]:
+    """Completed sessions of several children between two week starts, grouped by (child, week)"""
+    grouped: Dict[Tuple[int, date], List[Dict[str, Any]]] = {}
+    offset = 0
+    while True:
+        rows = supabase.table('sessions').select(f"child_id, {DIGEST_SESSION_COLUMNS}").in_(
+            'child_id', child_ids
+        ).eq('status', 'completed').gte(
+            'session_date', first.isoformat()
+        ).lte('session_date', (last + timedelta(days=6)).isoformat()).order('id').range(
+            offset, offset + DIGEST_BATCH_SIZE - 1
+        ).execute().data or []
+        for row in rows:
+            grouped.setdefault((row['child_id'], week_start_for(_as_date(row['session_date']))), []).append(row)
+        if len(rows) < DIGEST_BATCH_SIZE:
+            return grouped
+        offset += DIGEST_BATCH_SIZE
+
+def _load_stored_digests(supabase, child_ids: List[int], week_starts: Set[date]) -> Dict[Tuple[int, date], Dict[str, Any]]:
+    result = supabase.table('parent_weekly_digests').select('child_id, week_start, digest').in_(
+        'child_id', child_ids
+    ).in_('week_start', sorted(week.isoformat() for week in week_starts)).execute()
+    return {(row['child_id'], _as_date(row['week_start'])): row['digest'] for row in result.data or []}
+
+def refresh_parent_digests() -> int:
+    """
+    Recompute digests for every week touched by sessions or linked notes changed
+    since the last run. Blocking; returns the number of digests written
+    """
+    try:
+        supabase = get_supabase_client()
+        session_cursor, notes_watermark = _load_watermarks(supabase)
+        weeks, session_cursor = _changed_weeks(supabase, session_cursor)
+        note_weeks, notes_watermark = _note_changed_weeks(supabase, notes_watermark)
+        weeks |= note_weeks
+        if not weeks:
+            return 0
+
+        # The week after a changed week compares against it, so its trends are stale too
+        weeks |= {(child_id, week + timedelta(days=7)) for child_id, week in weeks}
+
+        weeks_by_child: Dict[int, List[date]] = {}
+        for child_id, week in weeks:
+            weeks_by_child.setdefault(child_id, []).append(week)
+        child_ids = sorted(weeks_by_child)
+
+        rows = []
+        for start in range(0, len(child_ids), DIGEST_CHILD_BATCH):
+            batch = child_ids[start:start + DIGEST_CHILD_BATCH]
+            batch_weeks = {week for child_id in batch for week in weeks_by_child[child_id]}
+            sessions = _load_sessions_for_weeks(supabase, batch, min(batch_weeks), max(batch_weeks))
+            stored = _load_stored_digests(
+                supabase, batch, batch_weeks | {week - timedelta(days=7) for week in batch_weeks}
+            )
+
+            # Chronological order lets each week's trends use the digest just computed before it
+            for child_id in batch:
+                for week in sorted(weeks_by_child[child_id]):
+                    week_sessions = sessions.get((child_id, week), [])
+                    if not week_sessions and (child_id, week) not in stored:
+                        continue
+
+                    previous = stored.get((child_id, week - timedelta(days=7)))
+                    digest = json.loads(compute_weekly_digest(child_id, week, week_sessions, previous).json())
+                    stored[(child_id, week)] = digest
+                    rows.append({
+                        'child_id': child_id,
+                        'week_start': week.isoformat(),
+                        'digest': digest,
+                        'generated_at': digest['generated_at']
+                    })
+
+        if rows:
+            supabase.table('parent_weekly_digests').upsert(rows, on_conflict='child_id,week_start').execute()
+        _save_watermarks(supabase, session_cursor, notes_watermark)
+
+        logger.info("Refreshed %s parent weekly digests", len(rows))
+        return len(rows)
+
+    except Exception as e:
+        logger.error("Error refreshing parent weekly digests: %s", e)
+        raise Exception(f"Database error: {str(e)}")
+
+async def get_weekly_digests(child_id: int, weeks: int = 4) -> List[WeeklyDigest]:
+    """Latest stored weekly digests for a child, newest week first"""
+    try:
+        supabase = get_supabase_client()
+        result = supabase.table('parent_weekly_digests').select('digest').eq(
+            'child_id', child_id
+        ).order('week_start', desc=True).limit(weeks).execute()
+
+        return [WeeklyDigest(**row['digest']) for row in result.data or []]
+
+    except Exception as e:
+        logger.error("Error fetching weekly digests for child_id %s: %s", child_id, e)
+        raise Exception(f"Database error: {str(e)}")
+
+_digest_task: Optional[asyncio.Task] = None
+
+async def _run_digest_worker(interval: float) -> None:
+    while True:
+        try:
+            if await asyncio.to_thread(claim_digest_lease, interval):
+                await asyncio.to_thread(refresh_parent_digests)
+        except Exception as e:
+            # The next run picks up from the same watermark
+            logger.error("Parent digest run failed: %s", e)
+        await asyncio.sleep(interval)
+
+def start_digest_worker(interval: float = PARENT_DIGEST_INTERVAL) -> None:
+    """Start the periodic digest refresh in the running event loop"""
+    global _digest_task
+    if interval <= 0 or _digest_task is not None:
+        return
+    _digest_task = asyncio.create_task(_run_digest_worker(interval))
+    logger.info("Parent digest worker started (every %.0fs)", interval)
+
+async def stop_digest_worker() -> None:
+    global _digest_task
+    if _digest_task is None:
+        return
+    _digest_task.cancel()
+    try:
+        await _digest_task
+    except asyncio.CancelledError:
+        pass
+    _digest_task = None
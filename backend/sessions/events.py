@@ -0,0 +1,102 @@
+"""
+In-process change feed for therapist sessions.
+
+Session and activity writes publish small change events here, and the
+/api/sessions/stream endpoint relays them to each therapist's open
+connections as server-sent events. The broker lives in the worker's memory,
+so it only reaches clients connected to the same process. It therefore needs
+a single worker process (serve.py's default, WEB_CONCURRENCY=1); with more
+workers, a change made in one worker is not pushed to streams held by another
+until the broker is moved onto a shared channel such as Postgres LISTEN/NOTIFY.
+"""
+import asyncio
+import json
+import logging
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Events buffered per connection before it is told to resync instead
+SUBSCRIBER_QUEUE_SIZE = 100
+# Seconds between keep-alive comments on an idle stream
+HEARTBEAT_INTERVAL = 15.0
+
+class SessionEventBroker:
+    """Fan-out of session change events to per-therapist subscriber queues"""
+
+    def __init__(self, queue_size: int = SUBSCRIBER_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers: Dict[int, Set[asyncio.Queue]] = {}
+
+    def subscribe(self, therapist_id: int) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.setdefault(therapist_id, set()).add(queue)
+        logger.info("Therapist %s subscribed to session events", therapist_id)
+        return queue
+
+    def unsubscribe(self, therapist_id: int, queue: asyncio.Queue) -> None:
+        queues = self._subscribers.get(therapist_id)
+        if not queues:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._subscribers[therapist_id]
+
+    def subscriber_count(self, therapist_id: Optional[int] = None) -> int:
+        if therapist_id is not None:
+            return len(self._subscribers.get(therapist_id, ()))
+        return sum(len(queues) for queues in self._subscribers.values())
+
+    def publish(self, therapist_id: int, event_type: str, data: Dict[str, Any]) -> None:
+        """
+        Queue an event for every open connection of a therapist.
+        Never blocks: a connection that falls too far behind has its backlog
+        replaced by a single 'resync' event telling the client to refetch.
+        """
+        queues = self._subscribers.get(therapist_id)
+        if not queues:
+            return
+
+        event = {'type': event_type, 'data': data, 'published_at': datetime.utcnow().isoformat()}
+        for queue in queues:
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait({'type': 'resync', 'data': {}, 'published_at': event['published_at']})
+
+broker = SessionEventBroker()
+
+def publish_session_event(therapist_id: int, event_type: str, data: Dict[str, Any]) -> None:
+    """Publish a change event; failures are logged and never affect the write path"""
+    try:
+        broker.publish(therapist_id, event_type, data)
+    except Exception as e:
+        logger.error("Error publishing %s event for therapist %s: %s", event_type, therapist_id, e)
+
+def format_sse(event: Dict[str, Any]) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+async def stream_session_events(therapist_id: int, is_disconnected, is_allowed=None) -> AsyncIterator[str]:
+    """
+    Yield server-sent events for a therapist until the client disconnects.
+    is_disconnected is an async callable, normally Request.is_disconnected;
+    the optional async is_allowed is checked at each heartbeat and ends the
+    stream once it returns False (e.g. the account was deactivated).
+    """
+    queue = broker.subscribe(therapist_id)
+    try:
+        yield format_sse({'type': 'ready', 'data': {'therapist_id': therapist_id}})
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=HEARTBEAT_INTERVAL)
+                yield format_sse(event)
+            except asyncio.TimeoutError:
+                if await is_disconnected() or (is_allowed is not None and not await is_allowed()):
+                    break
+                yield ": keep-alive\n\n"
+    finally:
+        broker.unsubscribe(therapist_id, queue)
+        logger.info("Therapist %s unsubscribed from session events", therapist_id)
@@ -1,11 +1,71 @@
 from typing import List, Optional, Dict, Any
 from datetime import date, datetime, time
+from collections import OrderedDict
 from pydantic import BaseModel, validator
 import logging
-from db import get_supabase_client
+import os
+import threading
+import time as time_module
+from db import get_supabase_client, select_on_write, PreconditionFailed, make_etag
+from sessions.events import publish_session_event
+from metrics import record_cache_lookup
+from notes.notes import SessionNoteSummary, NOTE_SUMMARY_COLUMNS, note_summary_from_row
 
 logger = logging.getLogger(__name__)
 
+# Per-worker session -> therapist ownership cache used by the activity routes.
+# A session's therapist never changes after creation, so entries only need
+# to be dropped when the session is deleted. Deletes handled by another worker
+# are not seen here, so entries also expire after SESSION_OWNER_CACHE_TTL seconds.
+SESSION_OWNER_CACHE_SIZE = int(os.getenv("SESSION_OWNER_CACHE_SIZE", "10000"))
+SESSION_OWNER_CACHE_TTL = float(os.getenv("SESSION_OWNER_CACHE_TTL", "60"))
+_session_owner_cache: "OrderedDict[int, tuple]" = OrderedDict()
+_session_owner_lock = threading.Lock()
+
+class SessionNotFound(Exception):
+    pass
+
+def remember_session_owner(session_id: int, therapist_id: int) -> None:
+    """Record which therapist owns a session (bounded LRU with expiry)"""
+    with _session_owner_lock:
+        _session_owner_cache[session_id] = (therapist_id, time_module.monotonic() + SESSION_OWNER_CACHE_TTL)
+        _session_owner_cache.move_to_end(session_id)
+        while len(_session_owner_cache) > SESSION_OWNER_CACHE_SIZE:
+            _session_owner_cache.popitem(last=False)
+
+def forget_session_owner(session_id: int) -> None:
+    """Drop a session from the ownership cache"""
+    with _session_owner_lock:
+        _session_owner_cache.pop(session_id, None)
+
+def verify_session_owner(session_id: int, therapist_id: int) -> bool:
+    """
+    Check that a session belongs to a therapist.
+    Answers from the ownership cache when possible and only queries the
+    sessions table on a miss.
+    """
+    owner = None
+    with _session_owner_lock:
+        entry = _session_owner_cache.get(session_id)
+        if entry is not None:
+            if entry[1] > time_module.monotonic():
+                owner = entry[0]
+                _session_owner_cache.move_to_end(session_id)
+            else:
+                del _session_owner_cache[session_id]
+    record_cache_lookup("session_owner", owner is not None)
+    if owner is not None:
+        return owner == therapist_id
+
+    supabase = get_supabase_client()
+    result = supabase.table('sessions').select('id, therapist_id').eq('id', session_id).execute()
+    if not result.data:
+        return False
+
+    owner = result.data[0]['therapist_id']
+    remember_session_owner(session_id, owner)
+    return owner == therapist_id
+
 # Pydantic Models
 class SessionCreate(BaseModel):
     student_id: int
@@ -100,6 +160,92 @@ class StudentActivityResponse(BaseModel):
     created_at: datetime
     updated_at: datetime
 
+class SessionDetailResponse(SessionResponse):
+    # Optional embeds, only populated when requested via ?include=
+    activities: Optional[List[SessionActivityResponse]] = None
+    available_activities: Optional[List[StudentActivityResponse]] = None
+    notes: Optional[List[SessionNoteSummary]] = None
+
+SESSION_DETAIL_INCLUDES = {'activities', 'available_activities', 'notes'}
+
+SESSION_COLUMNS = '''
+            id, therapist_id, student_id, session_date, start_time, end_time,
+            session_type, status, total_planned_activities, completed_activities,
+            estimated_duration_minutes, actual_duration_minutes, 
+            prerequisite_completion_required, therapist_notes, created_at, updated_at'''
+
+SESSION_SELECT = SESSION_COLUMNS + ''',
+            children!student_id (first_name, last_name)'''
+
+SESSION_ACTIVITY_COLUMNS = '''
+            id, session_id, student_activity_id, estimated_duration, actual_duration,
+            prerequisites, completed_prerequisites, skipped_prerequisites, status,
+            created_at, updated_at,
+            student_activities!student_activity_id (activity_name, activity_description, difficulty_level)'''
+
+# Row mapping helpers
+def _student_name(session_data: Dict[str, Any]) -> Optional[str]:
+    student = session_data.get('children')
+    if not student:
+        return None
+    return f"{student['first_name']} {student['last_name']}"
+
+def _session_from_row(session_data: Dict[str, Any], model=SessionResponse):
+    return model(
+        id=session_data['id'],
+        therapist_id=session_data['therapist_id'],
+        student_id=session_data['student_id'],
+        session_date=session_data['session_date'],
+        start_time=session_data['start_time'],
+        end_time=session_data['end_time'],
+        session_type=session_data['session_type'],
+        status=session_data['status'],
+        total_planned_activities=session_data['total_planned_activities'],
+        completed_activities=session_data['completed_activities'],
+        estimated_duration_minutes=session_data['estimated_duration_minutes'],
+        actual_duration_minutes=session_data['actual_duration_minutes'],
+        prerequisite_completion_required=session_data['prerequisite_completion_required'],
+        therapist_notes=session_data['therapist_notes'],
+        created_at=session_data['created_at'],
+        updated_at=session_data['updated_at'],
+        student_name=_student_name(session_data)
+    )
+
+def _session_activity_from_row(activity_data: Dict[str, Any]) -> SessionActivityResponse:
+    activity_info = activity_data.get('student_activities')
+    return SessionActivityResponse(
+        id=activity_data['id'],
+        session_id=activity_data['session_id'],
+        student_activity_id=activity_data['student_activity_id'],
+        estimated_duration=activity_data['estimated_duration'],
+        actual_duration=activity_data['actual_duration'],
+        prerequisites=activity_data['prerequisites'] or [],
+        completed_prerequisites=activity_data['completed_prerequisites'] or [],
+        skipped_prerequisites=activity_data['skipped_prerequisites'] or [],
+        status=activity_data['status'],
+        created_at=activity_data['created_at'],
+        updated_at=activity_data['updated_at'],
+        activity_name=activity_info['activity_name'] if activity_info else None,
+        activity_description=activity_info['activity_description'] if activity_info else None,
+        difficulty_level=activity_info['difficulty_level'] if activity_info else None
+    )
+
+def _student_activity_from_row(activity_data: Dict[str, Any]) -> StudentActivityResponse:
+    return StudentActivityResponse(
+        id=activity_data['id'],
+        student_id=activity_data['student_id'],
+        activity_name=activity_data['activity_name'],
+        activity_description=activity_data['activity_description'],
+        difficulty_level=activity_data['difficulty_level'],
+        estimated_duration=activity_data['estimated_duration'],
+        current_status=activity_data['current_status'],
+        total_attempts=activity_data['total_attempts'],
+        successful_attempts=activity_data['successful_attempts'],
+        last_attempted=activity_data['last_attempted'],
+        created_at=activity_data['created_at'],
+        updated_at=activity_data['updated_at']
+    )
+
 # Database Functions
 async def create_session(therapist_id: int, session_data: SessionCreate) -> SessionResponse:
     """Create a new therapy session"""
@@ -136,6 +282,7 @@ async def create_session(therapist_id: int, session_data: SessionCreate) -> Sess
             raise Exception("Failed to create session")
         
         session_data = result.data[0]
+        remember_session_owner(session_data['id'], therapist_id)
         
         # Fetch related data
         student_result = supabase.table('children').select('first_name, last_name').eq('id', session_data['student_id']).execute()
@@ -173,11 +320,12 @@ async def create_session(therapist_id: int, session_data: SessionCreate) -> Sess
             therapist_name=therapist_name
         )
         
-        logger.info(f"Created session {session_response.id} for therapist {therapist_id}")
+        logger.info("Created session %s for therapist %s", session_response.id, therapist_id)
+        publish_session_event(therapist_id, 'session.created', session_response.dict())
         return session_response
         
     except Exception as e:
-        logger.error(f"Error creating session: {str(e)}")
+        logger.error("Error creating session: %s", e)
         raise Exception(f"Database error: {str(e)}")
 
 async def get_sessions_by_therapist(therapist_id: int, limit: int = 50, offset: int = 0) -> List[SessionResponse]:
@@ -185,50 +333,21 @@ async def get_sessions_by_therapist(therapist_id: int, limit: int = 50, offset:
     try:
         supabase = get_supabase_client()
         
-        result = supabase.table('sessions').select('''
-            id, therapist_id, student_id, session_date, start_time, end_time,
-            session_type, status, total_planned_activities, completed_activities,
-            estimated_duration_minutes, actual_duration_minutes, 
-            prerequisite_completion_required, therapist_notes, created_at, updated_at,
-            children!student_id (first_name, last_name)
-        ''').eq('therapist_id', therapist_id).order('session_date', desc=True).range(offset, offset + limit - 1).execute()
+        result = supabase.table('sessions').select(SESSION_SELECT).eq('therapist_id', therapist_id).order('session_date', desc=True).range(offset, offset + limit - 1).execute()
         
         if not result.data:
             return []
         
         sessions = []
         for session_data in result.data:
-            student_name = None
-            if session_data.get('children'):
-                student = session_data['children']
-                student_name = f"{student['first_name']} {student['last_name']}"
-            
-            session = SessionResponse(
-                id=session_data['id'],
-                therapist_id=session_data['therapist_id'],
-                student_id=session_data['student_id'],
-                session_date=session_data['session_date'],
-                start_time=session_data['start_time'],
-                end_time=session_data['end_time'],
-                session_type=session_data['session_type'],
-                status=session_data['status'],
-                total_planned_activities=session_data['total_planned_activities'],
-                completed_activities=session_data['completed_activities'],
-                estimated_duration_minutes=session_data['estimated_duration_minutes'],
-                actual_duration_minutes=session_data['actual_duration_minutes'],
-                prerequisite_completion_required=session_data['prerequisite_completion_required'],
-                therapist_notes=session_data['therapist_notes'],
-                created_at=session_data['created_at'],
-                updated_at=session_data['updated_at'],
-                student_name=student_name
-            )
-            sessions.append(session)
-        
-        logger.info(f"Retrieved {len(sessions)} sessions for therapist {therapist_id}")
+            remember_session_owner(session_data['id'], therapist_id)
+            sessions.append(_session_from_row(session_data))
+        
+        logger.info("Retrieved %s sessions for therapist %s", len(sessions), therapist_id)
         return sessions
         
     except Exception as e:
-        logger.error(f"Error getting sessions for therapist: {str(e)}")
+        logger.error("Error getting sessions for therapist: %s", e)
         raise Exception(f"Database error: {str(e)}")
 
 async def get_session_by_id(session_id: int, therapist_id: int) -> Optional[SessionResponse]:
@@ -236,88 +355,156 @@ async def get_session_by_id(session_id: int, therapist_id: int) -> Optional[Sess
     try:
         supabase = get_supabase_client()
         
-        result = supabase.table('sessions').select('''
-            id, therapist_id, student_id, session_date, start_time, end_time,
-            session_type, status, total_planned_activities, completed_activities,
-            estimated_duration_minutes, actual_duration_minutes, 
-            prerequisite_completion_required, therapist_notes, created_at, updated_at,
-            children!student_id (first_name, last_name)
-        ''').eq('id', session_id).eq('therapist_id', therapist_id).execute()
+        result = supabase.table('sessions').select(SESSION_SELECT).eq('id', session_id).eq('therapist_id', therapist_id).execute()
         
         if not result.data:
             return None
         
         session_data = result.data[0]
+        remember_session_owner(session_id, therapist_id)
+        session = _session_from_row(session_data)
         
-        student_name = None
-        if session_data.get('children'):
-            student = session_data['children']
-            student_name = f"{student['first_name']} {student['last_name']}"
+        logger.info("Retrieved session %s", session_id)
+        return session
+
+    except Exception as e:
+        logger.error("Error getting session %s: %s", session_id, e)
+        raise Exception(f"Database error: {str(e)}")
+
+async def get_session_detail(session_id: int, therapist_id: int, include: Optional[set] = None) -> Optional[SessionDetailResponse]:
+    """
+    Get a session with optional embeds in a single ownership-checked query.
+    include may contain 'activities' (planned session activities),
+    'available_activities' (the student's activity catalogue) and/or
+    'notes' (summaries of the session notes linked to it).
+    """
+    try:
+        include = set(include or ())
+        unknown = include - SESSION_DETAIL_INCLUDES
+        if unknown:
+            raise ValueError(f"Unsupported include value(s): {', '.join(sorted(unknown))}")
+
+        supabase = get_supabase_client()
+
+        # Student activities hang off the child, so nest them inside the children embed
+        children_embed = 'children!student_id (first_name, last_name'
+        if 'available_activities' in include:
+            children_embed += ', student_activities (*)'
+        children_embed += ')'
+
+        columns = f"{SESSION_COLUMNS},\n            {children_embed}"
+        if 'activities' in include:
+            columns += f",\n            session_activities ({SESSION_ACTIVITY_COLUMNS})"
+        if 'notes' in include:
+            columns += f",\n            session_notes ({NOTE_SUMMARY_COLUMNS})"
+
+        result = supabase.table('sessions').select(columns).eq('id', session_id).eq('therapist_id', therapist_id).execute()
+
+        if not result.data:
+            return None
+
+        session_data = result.data[0]
+        remember_session_owner(session_id, therapist_id)
+
+        session = _session_from_row(session_data, SessionDetailResponse)
+
+        if 'activities' in include:
+            rows = sorted(session_data.get('session_activities') or [], key=lambda row: row['created_at'])
+            session.activities = [_session_activity_from_row(row) for row in rows]
+
+        if 'available_activities' in include:
+            child = session_data.get('children') or {}
+            rows = sorted(child.get('student_activities') or [], key=lambda row: row['activity_name'])
+            session.available_activities = [_student_activity_from_row(row) for row in rows]
+
+        if 'notes' in include:
+            rows = sorted(session_data.get('session_notes') or [], key=lambda row: row['created_at'])
+            session.notes = [note_summary_from_row(row) for row in rows]
+
+        logger.info("Retrieved session %s with includes %s", session_id, sorted(include))
+        return session
+
+    except ValueError:
+        raise
+    except Exception as e:
+        logger.error("Error getting session detail %s: %s", session_id, e)
+        raise Exception(f"Database error: {str(e)}")
+
+def _session_update_data(session_data: SessionUpdate) -> Dict[str, Any]:
+    """Build the column changes for a session update, skipping unset fields"""
+    update_data = {'updated_at': datetime.now().isoformat()}
+    for field, value in session_data.dict(exclude_none=True).items():
+        update_data[field] = value.isoformat() if isinstance(value, (date, time)) else value
+    return update_data
+
+async def _raise_if_session_changed(session_id: int, therapist_id: int) -> None:
+    """
+    After a conditional update matched nothing, tell a stale version (412)
+    apart from a missing session. Only runs on the conflict path.
+    """
+    current = await get_session_by_id(session_id, therapist_id)
+    if current:
+        raise PreconditionFailed("Session was modified by another request", etag=make_etag(current.updated_at))
+
+async def update_session(session_id: int, therapist_id: int, session_data: SessionUpdate, if_match: Optional[str] = None) -> Optional[SessionResponse]:
+    """
+    Update a session and return it, student embed included, from the same request.
+    When if_match (the updated_at the client last saw) is given, the update only
+    applies if the row is unchanged, otherwise PreconditionFailed is raised.
+    """
+    try:
+        supabase = get_supabase_client()
         
-        session = SessionResponse(
-            id=session_data['id'],
-            therapist_id=session_data['therapist_id'],
-            student_id=session_data['student_id'],
-            session_date=session_data['session_date'],
-            start_time=session_data['start_time'],
-            end_time=session_data['end_time'],
-            session_type=session_data['session_type'],
-            status=session_data['status'],
-            total_planned_activities=session_data['total_planned_activities'],
-            completed_activities=session_data['completed_activities'],
-            estimated_duration_minutes=session_data['estimated_duration_minutes'],
-            actual_duration_minutes=session_data['actual_duration_minutes'],
-            prerequisite_completion_required=session_data['prerequisite_completion_required'],
-            therapist_notes=session_data['therapist_notes'],
-            created_at=session_data['created_at'],
-            updated_at=session_data['updated_at'],
-            student_name=student_name
-        )
+        query = supabase.table('sessions').update(_session_update_data(session_data)).eq('id', session_id).eq('therapist_id', therapist_id)
+        if if_match:
+            query = query.eq('updated_at', if_match)
+        result = select_on_write(query, SESSION_SELECT).execute()
         
-        logger.info(f"Retrieved session {session_id}")
+        if not result.data:
+            if if_match:
+                await _raise_if_session_changed(session_id, therapist_id)
+            return None
+        remember_session_owner(session_id, therapist_id)
+        
+        session = _session_from_row(result.data[0])
+        publish_session_event(therapist_id, 'session.updated', session.dict())
         return session
         
+    except PreconditionFailed:
+        raise
     except Exception as e:
-        logger.error(f"Error getting session {session_id}: {str(e)}")
+        logger.error("Error updating session %s: %s", session_id, e)
         raise Exception(f"Database error: {str(e)}")
 
-async def update_session(session_id: int, therapist_id: int, session_data: SessionUpdate) -> Optional[SessionResponse]:
-    """Update a session"""
+async def update_session_minimal(session_id: int, therapist_id: int, session_data: SessionUpdate, if_match: Optional[str] = None) -> Optional[str]:
+    """
+    Update a session without returning a representation (Prefer: return=minimal).
+    Only the stored updated_at comes back, as the new version, so the next
+    If-Match compares against exactly what the database holds.
+    Returns None if no row matched; if_match behaves as in update_session.
+    """
     try:
         supabase = get_supabase_client()
         
-        # Build update data
-        update_data = {'updated_at': datetime.now().isoformat()}
-        
-        if session_data.session_date is not None:
-            update_data['session_date'] = session_data.session_date.isoformat()
-        if session_data.start_time is not None:
-            update_data['start_time'] = session_data.start_time.isoformat()
-        if session_data.end_time is not None:
-            update_data['end_time'] = session_data.end_time.isoformat()
-        if session_data.session_type is not None:
-            update_data['session_type'] = session_data.session_type
-        if session_data.status is not None:
-            update_data['status'] = session_data.status
-        if session_data.estimated_duration_minutes is not None:
-            update_data['estimated_duration_minutes'] = session_data.estimated_duration_minutes
-        if session_data.actual_duration_minutes is not None:
-            update_data['actual_duration_minutes'] = session_data.actual_duration_minutes
-        if session_data.prerequisite_completion_required is not None:
-            update_data['prerequisite_completion_required'] = session_data.prerequisite_completion_required
-        if session_data.therapist_notes is not None:
-            update_data['therapist_notes'] = session_data.therapist_notes
-        
-        result = supabase.table('sessions').update(update_data).eq('id', session_id).eq('therapist_id', therapist_id).execute()
+        update_data = _session_update_data(session_data)
+        query = supabase.table('sessions').update(update_data).eq('id', session_id).eq('therapist_id', therapist_id)
+        if if_match:
+            query = query.eq('updated_at', if_match)
+        result = select_on_write(query, 'updated_at').execute()
         
         if not result.data:
+            if if_match:
+                await _raise_if_session_changed(session_id, therapist_id)
             return None
+        version = result.data[0]['updated_at']
+        remember_session_owner(session_id, therapist_id)
+        publish_session_event(therapist_id, 'session.updated', {'id': session_id, **update_data, 'updated_at': version})
+        return version
         
-        # Return updated session
-        return await get_session_by_id(session_id, therapist_id)
-        
+    except PreconditionFailed:
+        raise
     except Exception as e:
-        logger.error(f"Error updating session {session_id}: {str(e)}")
+        logger.error("Error updating session %s: %s", session_id, e)
         raise Exception(f"Database error: {str(e)}")
 
 async def delete_session(session_id: int, therapist_id: int) -> bool:
@@ -327,10 +514,13 @@ async def delete_session(session_id: int, therapist_id: int) -> bool:
         
         result = supabase.table('sessions').delete().eq('id', session_id).eq('therapist_id', therapist_id).execute()
         
+        if result.data:
+            forget_session_owner(session_id)
+            publish_session_event(therapist_id, 'session.deleted', {'id': session_id})
         return len(result.data) > 0
         
     except Exception as e:
-        logger.error(f"Error deleting session {session_id}: {str(e)}")
+        logger.error("Error deleting session %s: %s", session_id, e)
         raise Exception(f"Database error: {str(e)}")
 
 # Session Activities Functions
@@ -340,9 +530,8 @@ async def add_activity_to_session(session_id: int, therapist_id: int, activity_d
         supabase = get_supabase_client()
         
         # Verify session belongs to therapist
-        session_check = supabase.table('sessions').select('id').eq('id', session_id).eq('therapist_id', therapist_id).execute()
-        if not session_check.data:
-            raise Exception("Session not found or access denied")
+        if not verify_session_owner(session_id, therapist_id):
+            raise SessionNotFound("Session not found or access denied")
         
         insert_data = {
             'session_id': session_id,
@@ -356,7 +545,14 @@ async def add_activity_to_session(session_id: int, therapist_id: int, activity_d
             'updated_at': datetime.now().isoformat()
         }
         
-        result = supabase.table('session_activities').insert(insert_data).execute()
+        try:
+            result = supabase.table('session_activities').insert(insert_data).execute()
+        except Exception as e:
+            # The session was deleted since its owner was cached (e.g. by another worker)
+            if 'foreign key' in str(e).lower() or '23503' in str(e):
+                forget_session_owner(session_id)
+                raise SessionNotFound("Session not found or access denied")
+            raise
         
         if not result.data:
             raise Exception("Failed to add activity to session")
@@ -399,11 +595,14 @@ async def add_activity_to_session(session_id: int, therapist_id: int, activity_d
             difficulty_level=difficulty_level
         )
         
-        logger.info(f"Added activity {activity_data['student_activity_id']} to session {session_id}")
+        logger.info("Added activity %s to session %s", activity_data['student_activity_id'], session_id)
+        publish_session_event(therapist_id, 'activity.added', session_activity.dict())
         return session_activity
         
+    except SessionNotFound:
+        raise
     except Exception as e:
-        logger.error(f"Error adding activity to session: {str(e)}")
+        logger.error("Error adding activity to session: %s", e)
         raise Exception(f"Database error: {str(e)}")
 
 async def get_session_activities(session_id: int, therapist_id: int) -> List[SessionActivityResponse]:
@@ -412,47 +611,23 @@ async def get_session_activities(session_id: int, therapist_id: int) -> List[Ses
         supabase = get_supabase_client()
         
         # Verify session belongs to therapist
-        session_check = supabase.table('sessions').select('id').eq('id', session_id).eq('therapist_id', therapist_id).execute()
-        if not session_check.data:
-            raise Exception("Session not found or access denied")
+        if not verify_session_owner(session_id, therapist_id):
+            raise SessionNotFound("Session not found or access denied")
         
-        result = supabase.table('session_activities').select('''
-            id, session_id, student_activity_id, estimated_duration, actual_duration,
-            prerequisites, completed_prerequisites, skipped_prerequisites, status,
-            created_at, updated_at,
-            student_activities!student_activity_id (activity_name, activity_description, difficulty_level)
-        ''').eq('session_id', session_id).order('created_at').execute()
+        result = supabase.table('session_activities').select(SESSION_ACTIVITY_COLUMNS).eq('session_id', session_id).order('created_at').execute()
         
         if not result.data:
             return []
         
-        activities = []
-        for activity_data in result.data:
-            activity_info = activity_data.get('student_activities')
-            
-            activity = SessionActivityResponse(
-                id=activity_data['id'],
-                session_id=activity_data['session_id'],
-                student_activity_id=activity_data['student_activity_id'],
-                estimated_duration=activity_data['estimated_duration'],
-                actual_duration=activity_data['actual_duration'],
-                prerequisites=activity_data['prerequisites'] or [],
-                completed_prerequisites=activity_data['completed_prerequisites'] or [],
-                skipped_prerequisites=activity_data['skipped_prerequisites'] or [],
-                status=activity_data['status'],
-                created_at=activity_data['created_at'],
-                updated_at=activity_data['updated_at'],
-                activity_name=activity_info['activity_name'] if activity_info else None,
-                activity_description=activity_info['activity_description'] if activity_info else None,
-                difficulty_level=activity_info['difficulty_level'] if activity_info else None
-            )
-            activities.append(activity)
-        
-        logger.info(f"Retrieved {len(activities)} activities for session {session_id}")
+        activities = [_session_activity_from_row(activity_data) for activity_data in result.data]
+        
+        logger.info("Retrieved %s activities for session %s", len(activities), session_id)
         return activities
         
+    except SessionNotFound:
+        raise
     except Exception as e:
-        logger.error(f"Error getting session activities: {str(e)}")
+        logger.error("Error getting session activities: %s", e)
         raise Exception(f"Database error: {str(e)}")
 
 async def get_available_student_activities(student_id: int) -> List[StudentActivityResponse]:
@@ -465,29 +640,13 @@ async def get_available_student_activities(student_id: int) -> List[StudentActiv
         if not result.data:
             return []
         
-        activities = []
-        for activity_data in result.data:
-            activity = StudentActivityResponse(
-                id=activity_data['id'],
-                student_id=activity_data['student_id'],
-                activity_name=activity_data['activity_name'],
-                activity_description=activity_data['activity_description'],
-                difficulty_level=activity_data['difficulty_level'],
-                estimated_duration=activity_data['estimated_duration'],
-                current_status=activity_data['current_status'],
-                total_attempts=activity_data['total_attempts'],
-                successful_attempts=activity_data['successful_attempts'],
-                last_attempted=activity_data['last_attempted'],
-                created_at=activity_data['created_at'],
-                updated_at=activity_data['updated_at']
-            )
-            activities.append(activity)
-        
-        logger.info(f"Retrieved {len(activities)} available activities for student {student_id}")
+        activities = [_student_activity_from_row(activity_data) for activity_data in result.data]
+        
+        logger.info("Retrieved %s available activities for student %s", len(activities), student_id)
         return activities
         
     except Exception as e:
-        logger.error(f"Error getting student activities: {str(e)}")
+        logger.error("Error getting student activities: %s", e)
         raise Exception(f"Database error: {str(e)}")
 
 async def remove_activity_from_session(session_activity_id: int, session_id: int, therapist_id: int) -> bool:
@@ -496,9 +655,8 @@ async def remove_activity_from_session(session_activity_id: int, session_id: int
         supabase = get_supabase_client()
         
         # Verify session belongs to therapist
-        session_check = supabase.table('sessions').select('id').eq('id', session_id).eq('therapist_id', therapist_id).execute()
-        if not session_check.data:
-            raise Exception("Session not found or access denied")
+        if not verify_session_owner(session_id, therapist_id):
+            raise SessionNotFound("Session not found or access denied")
         
         result = supabase.table('session_activities').delete().eq('id', session_activity_id).eq('session_id', session_id).execute()
         
@@ -511,24 +669,36 @@ async def remove_activity_from_session(session_activity_id: int, session_id: int
                     'total_planned_activities': new_count,
                     'updated_at': datetime.now().isoformat()
                 }).eq('id', session_id).execute()
+            publish_session_event(therapist_id, 'activity.removed', {'id': session_activity_id, 'session_id': session_id})
         
         return len(result.data) > 0
         
+    except SessionNotFound:
+        raise
     except Exception as e:
-        logger.error(f"Error removing activity from session: {str(e)}")
+        logger.error("Error removing activity from session: %s", e)
         raise Exception(f"Database error: {str(e)}")
 
-async def get_completed_sessions_by_child_id(child_id: int, limit: int = 50, offset: int = 0) -> List[Dict[str, Any]]:
+# Note fields shared with parents alongside their child's session history
+PARENT_NOTE_COLUMNS = 'notes_id, note_title, note_content, session_time, created_at, last_edited_at'
+
+async def get_completed_sessions_by_child_id(child_id: int, limit: int = 50, offset: int = 0, include_notes: bool = False) -> List[Dict[str, Any]]:
     """
     Get all completed sessions for a specific child
+    include_notes embeds each session's linked notes in the same query
     """
+    return list_completed_sessions_by_child_id(child_id, limit, offset, include_notes)
+
+def list_completed_sessions_by_child_id(child_id: int, limit: int = 50, offset: int = 0, include_notes: bool = False) -> List[Dict[str, Any]]:
+    """Blocking body of get_completed_sessions_by_child_id, for callers that run it in a worker thread"""
     try:
-        logger.info(f"Fetching completed sessions for child_id: {child_id}, limit: {limit}, offset: {offset}")
+        logger.info("Fetching completed sessions for child_id: %s, limit: %s, offset: %s", child_id, limit, offset)
         supabase = get_supabase_client()
         
         # Query sessions where child_id matches child_id and status is 'completed'
+        columns = f"*, session_notes ({PARENT_NOTE_COLUMNS})" if include_notes else '*'
         result = supabase.table('sessions').select(
-            '*'
+            columns
         ).eq('child_id', child_id).eq('status', 'completed').order('session_date', desc=True).limit(limit).range(offset, offset + limit - 1).execute()
         
         # Return the raw data with some field mapping for frontend compatibility
@@ -557,17 +727,33 @@ async def get_completed_sessions_by_child_id(child_id: int, limit: int = 50, off
                     'student_name': None,
                     'therapist_name': None
                 }
+                if include_notes:
+                    mapped_session['notes'] = sorted(session_data.get('session_notes') or [], key=lambda note: note['created_at'])
                 
                 sessions.append(mapped_session)
             except Exception as parse_error:
-                logger.error(f"Error parsing session data: {parse_error}")
+                logger.error("Error parsing session data: %s", parse_error)
                 continue
         
-        logger.info(f"Found {len(sessions)} completed sessions for child_id: {child_id}")
+        logger.info("Found %s completed sessions for child_id: %s", len(sessions), child_id)
         return sessions
         
     except Exception as e:
-        logger.error(f"Error fetching completed sessions by child_id: {str(e)}")
+        logger.error("Error fetching completed sessions by child_id: %s", e)
+        raise Exception(f"Database error: {str(e)}")
+
+def count_sessions_awaiting_feedback(child_id: int) -> int:
+    """Count a child's completed sessions the parent has not left feedback on yet"""
+    try:
+        supabase = get_supabase_client()
+        result = supabase.table('sessions').select(
+            'id', count='exact'
+        ).eq('child_id', child_id).eq('status', 'completed').is_('parent_feedback', 'null').limit(1).execute()
+        
+        return result.count or 0
+        
+    except Exception as e:
+        logger.error("Error counting sessions awaiting feedback for child_id %s: %s", child_id, e)
         raise Exception(f"Database error: {str(e)}")
 
 # Feedback-related models and functions
@@ -575,42 +761,32 @@ class SessionFeedbackCreate(BaseModel):
     session_id: int
     feedback: str
 
-async def update_session_parent_feedback(session_id: int, parent_feedback: str) -> bool:
-    """Update parent feedback for a specific session"""
+async def update_session_parent_feedback(session_id: int, child_id: int, parent_feedback: str) -> bool:
+    """
+    Update parent feedback for a completed session of the parent's child
+    The ownership and status checks are part of the UPDATE itself, so a single
+    round trip both authorizes and writes; returns False if nothing matched
+    """
     try:
         supabase = get_supabase_client()
         
-        # Update the session with parent feedback
-        result = supabase.table('sessions').update({
+        updated_at = datetime.now().isoformat()
+        query = supabase.table('sessions').update({
             'parent_feedback': parent_feedback,
-            'updated_at': datetime.now().isoformat()
-        }).eq('id', session_id).execute()
+            'updated_at': updated_at
+        }).eq('id', session_id).eq('child_id', child_id).eq('status', 'completed')
+        result = select_on_write(query, 'id, therapist_id').execute()
         
         if result.data:
-            logger.info(f"Successfully updated parent feedback for session {session_id}")
+            logger.info("Successfully updated parent feedback for session %s", session_id)
+            publish_session_event(result.data[0]['therapist_id'], 'session.updated', {
+                'id': session_id, 'parent_feedback': parent_feedback, 'updated_at': updated_at
+            })
             return True
         else:
-            logger.error(f"No session found with ID {session_id}")
+            logger.info("No completed session %s found for child_id %s", session_id, child_id)
             return False
             
     except Exception as e:
-        logger.error(f"Error updating parent feedback for session {session_id}: {str(e)}")
-        raise Exception(f"Database error: {str(e)}")
-
-async def get_session_for_parent_verification(session_id: int) -> Optional[Dict[str, Any]]:
-    """Get session data for parent verification (without therapist restriction)"""
-    try:
-        supabase = get_supabase_client()
-        
-        result = supabase.table('sessions').select(
-            'id, child_id, session_date, status'
-        ).eq('id', session_id).execute()
-        
-        if not result.data:
-            return None
-            
-        return result.data[0]
-        
-    except Exception as e:
-        logger.error(f"Error fetching session for parent verification {session_id}: {str(e)}")
+        logger.error("Error updating parent feedback for session %s: %s", session_id, e)
         raise Exception(f"Database error: {str(e)}")
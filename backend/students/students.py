@@ -28,7 +28,7 @@ def verify_child_in_database(child_first_name: str, child_last_name: str, child_
         return None
         
     except Exception as e:
-        logger.error(f"Error verifying child in database: {e}")
+        logger.error("Error verifying child in database: %s", e)
         return None
 
 def get_student_by_id(child_id: int) -> Optional[Dict[str, Any]]:
@@ -101,7 +101,7 @@ def get_student_by_id(child_id: int) -> Optional[Dict[str, Any]]:
         }
         
     except Exception as e:
-        logger.error(f"Error getting student by ID {child_id}: {e}")
+        logger.error("Error getting student by ID %s: %s", child_id, e)
         return None
 
 def get_all_students() -> List[Dict[str, Any]]:
@@ -184,11 +184,11 @@ def get_all_students() -> List[Dict[str, Any]]:
             
             transformed_students.append(transformed_student)
         
-        logger.info(f"Successfully fetched {len(transformed_students)} students")
+        logger.info("Successfully fetched %s students", len(transformed_students))
         return transformed_students
         
     except Exception as e:
-        logger.error(f"Error fetching students: {e}")
+        logger.error("Error fetching students: %s", e)
         raise Exception(f"Failed to fetch students: {str(e)}")
 
 def get_student_by_id(student_id: int) -> Optional[Dict[str, Any]]:
@@ -267,11 +267,11 @@ def get_student_by_id(student_id: int) -> Optional[Dict[str, Any]]:
             ])
         }
         
-        logger.info(f"Successfully fetched student {student_id}")
+        logger.info("Successfully fetched student %s", student_id)
         return transformed_student
         
     except Exception as e:
-        logger.error(f"Error fetching student {student_id}: {e}")
+        logger.error("Error fetching student %s: %s", student_id, e)
         raise Exception(f"Failed to fetch student: {str(e)}")
 
 def get_students_by_therapist(therapist_id: int) -> List[Dict[str, Any]]:
@@ -338,11 +338,11 @@ def get_students_by_therapist(therapist_id: int) -> List[Dict[str, Any]]:
             
             transformed_students.append(transformed_student)
         
-        logger.info(f"Successfully fetched {len(transformed_students)} students for therapist {therapist_id}")
+        logger.info("Successfully fetched %s students for therapist %s", len(transformed_students), therapist_id)
         return transformed_students
         
     except Exception as e:
-        logger.error(f"Error fetching students for therapist {therapist_id}: {e}")
+        logger.error("Error fetching students for therapist %s: %s", therapist_id, e)
         raise Exception(f"Failed to fetch students for therapist: {str(e)}")
 
 def enroll_student(student_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -401,9 +401,9 @@ def enroll_student(student_data: Dict[str, Any]) -> Dict[str, Any]:
             'goals': student_data.get('goals', [])
         }
         
-        logger.info(f"Successfully enrolled student {student['id']}")
+        logger.info("Successfully enrolled student %s", student['id'])
         return transformed_student
         
     except Exception as e:
-        logger.error(f"Error enrolling student: {e}")
+        logger.error("Error enrolling student: %s", e)
         raise Exception(f"Failed to enroll student: {str(e)}")
@@ -84,7 +84,7 @@ def create_tables_with_rls():
             return True
             
     except Exception as e:
-        logger.error(f"Error creating tables: {e}")
+        logger.error("Error creating tables: %s", e)
         conn.rollback()
         return False
     finally:
@@ -141,7 +141,7 @@ def create_rls_policies():
             return True
             
     except Exception as e:
-        logger.error(f"Error creating RLS policies: {e}")
+        logger.error("Error creating RLS policies: %s", e)
         conn.rollback()
         return False
     finally:
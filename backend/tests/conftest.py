@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Modules import each other from the backend directory (e.g. `from db import ...`)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("JWT_SECRET_KEY", "test-secret-for-the-backend-test-suite")
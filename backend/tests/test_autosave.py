@@ -0,0 +1,132 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app as app_module
+from authentication.authh import get_current_user
+from notes import autosave
+from notes.autosave import NoteAutosaveCoalescer, NoteEditConflict, NoteTextEdit, SessionNotePatch, apply_text_edits
+from notes.search import InMemoryNoteSearch
+
+def edit(start, end, text=''):
+    return NoteTextEdit(start=start, end=end, text=text)
+
+def test_no_edits_leaves_content_unchanged():
+    assert apply_text_edits('hello', []) == 'hello'
+
+def test_insert_replace_and_delete():
+    assert apply_text_edits('hello', [edit(5, 5, ' world')]) == 'hello world'
+    assert apply_text_edits('hello', [edit(0, 1, 'J')]) == 'Jello'
+    assert apply_text_edits('hello', [edit(1, 4)]) == 'ho'
+
+def test_edits_apply_to_the_result_of_the_previous_edit():
+    # The second range refers to 'hello world', not to the original 'hello'
+    assert apply_text_edits('hello', [edit(5, 5, ' world'), edit(6, 11, 'there')]) == 'hello there'
+
+def test_edits_on_empty_content():
+    assert apply_text_edits('', [edit(0, 0, 'first words')]) == 'first words'
+
+@pytest.mark.parametrize('start, end', [(-1, 0), (0, 6), (6, 6), (3, 2)])
+def test_out_of_range_edits_are_rejected(start, end):
+    with pytest.raises(ValueError):
+        apply_text_edits('hello', [edit(start, end, 'x')])
+
+def test_a_bad_later_edit_rejects_the_whole_batch():
+    with pytest.raises(ValueError):
+        apply_text_edits('hello', [edit(0, 5), edit(0, 1)])
+
+class FakeNoteStore(NoteAutosaveCoalescer):
+    """Coalescer backed by a dict instead of Supabase; fail_writes makes the next writes raise"""
+
+    def __init__(self, interval=0.01):
+        super().__init__(interval=interval)
+        self.rows = {1: {'notes_id': 1, 'therapist_id': 7, 'session_date': '2026-03-02', 'session_time': None,
+                         'note_title': 'Speech', 'note_content': 'hello', 'last_edited_at': None}}
+        self.loads = 0
+        self.writes = []
+        self.fail_writes = 0
+
+    def _load_note(self, notes_id, therapist_id):
+        self.loads += 1
+        row = self.rows.get(notes_id)
+        return dict(row) if row and row['therapist_id'] == therapist_id else None
+
+    def _write_note(self, notes_id, state):
+        if self.fail_writes:
+            self.fail_writes -= 1
+            raise RuntimeError('database unavailable')
+        self.writes.append(state['note_content'])
+        self.rows[notes_id].update(note_content=state['note_content'], note_title=state['note_title'])
+
+@pytest.fixture
+def memory_search(monkeypatch):
+    monkeypatch.setattr(autosave, 'get_note_search', lambda: InMemoryNoteSearch(loader=lambda therapist_id: []))
+
+def test_burst_of_patches_is_written_once(memory_search):
+    store = FakeNoteStore()
+
+    async def burst():
+        for word in (' there', ' my', ' friend'):
+            length = len(store._pending[1]['note_content']) if 1 in store._pending else 5
+            await store.apply(1, 7, SessionNotePatch(edits=[edit(length, length, word)], base_length=length))
+        await asyncio.sleep(0.05)
+
+    asyncio.run(burst())
+    assert store.loads == 1
+    assert store.writes == ['hello there my friend']
+
+def test_flush_now_writes_before_returning(memory_search):
+    store = FakeNoteStore()
+    response = asyncio.run(store.apply(1, 7, SessionNotePatch(note_content='rewritten'), flush_now=True))
+    assert store.writes == ['rewritten']
+    assert response.pending is False
+    assert response.last_edited_at.tzinfo is not None
+
+def test_other_therapists_note_is_not_found():
+    store = FakeNoteStore()
+    assert asyncio.run(store.apply(1, 8, SessionNotePatch(note_content='x'))) is None
+
+def test_base_length_mismatch_raises_conflict():
+    store = FakeNoteStore()
+    with pytest.raises(NoteEditConflict):
+        asyncio.run(store.apply(1, 7, SessionNotePatch(edits=[edit(0, 0, 'x')], base_length=3)))
+
+def test_failed_write_is_requeued_and_retried(memory_search):
+    store = FakeNoteStore()
+    store.fail_writes = 1
+
+    async def run():
+        await store.apply(1, 7, SessionNotePatch(note_content='kept'), flush_now=True)
+        assert store.writes == [] and store._pending[1]['note_content'] == 'kept'
+        await asyncio.sleep(0.05)
+
+    asyncio.run(run())
+    assert store.writes == ['kept']
+    assert not store._pending
+
+@pytest.fixture
+def client(monkeypatch, memory_search):
+    store = FakeNoteStore()
+    monkeypatch.setattr(app_module, 'note_autosave', store)
+    app_module.app.dependency_overrides[get_current_user] = lambda: {'id': 7}
+    yield TestClient(app_module.app), store
+    app_module.app.dependency_overrides.clear()
+
+def test_patch_route_with_flush_writes_immediately(client):
+    http, store = client
+    response = http.patch('/api/notes/1?flush=true', json={'edits': [{'start': 5, 'end': 5, 'text': '!'}], 'base_length': 5})
+    assert response.status_code == 200
+    assert response.json()['pending'] is False
+    assert store.writes == ['hello!']
+
+def test_patch_route_reports_base_length_conflict(client):
+    http, store = client
+    response = http.patch('/api/notes/1', json={'edits': [{'start': 0, 'end': 0, 'text': 'x'}], 'base_length': 9})
+    assert response.status_code == 409
+    assert store.writes == []
+
+def test_patch_route_hides_other_therapists_notes(client):
+    http, store = client
+    store.rows[1]['therapist_id'] = 8
+    assert http.patch('/api/notes/1', json={'note_content': 'x'}).status_code == 404
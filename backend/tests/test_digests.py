@@ -0,0 +1,147 @@
+import re
+from datetime import date
+from types import SimpleNamespace
+
+from sessions import digests
+from sessions.digests import DIGEST_NOTE_EXCERPTS, compute_weekly_digest, week_start_for
+
+WEEK = date(2026, 3, 2)  # a Monday
+
+def session(session_id, day, planned=0, completed=0, actual=None, estimated=None, notes=None, therapist_notes=None, start='10:00:00'):
+    return {
+        'id': session_id, 'session_date': day, 'start_time': start,
+        'total_planned_activities': planned, 'completed_activities': completed,
+        'actual_duration_minutes': actual, 'estimated_duration_minutes': estimated,
+        'session_notes': notes or [], 'therapist_notes': therapist_notes
+    }
+
+def test_week_start_is_monday():
+    assert week_start_for(date(2026, 3, 2)) == WEEK
+    assert week_start_for(date(2026, 3, 8)) == WEEK
+    assert week_start_for(date(2026, 3, 9)) == date(2026, 3, 9)
+
+def test_empty_week():
+    digest = compute_weekly_digest(7, WEEK, [])
+    assert digest.sessions_attended == 0
+    assert digest.completion_rate is None
+    assert digest.total_minutes == 0
+    assert digest.note_excerpts == []
+    assert digest.trends == {}
+    assert digest.week_end == date(2026, 3, 8)
+
+def test_totals_and_completion_rate():
+    digest = compute_weekly_digest(7, WEEK, [
+        session(1, date(2026, 3, 2), planned=4, completed=3, actual=45),
+        session(2, date(2026, 3, 4), planned=2, completed=0, estimated=30),
+        session(3, date(2026, 3, 5), planned=None, completed=None),
+    ])
+    assert digest.sessions_attended == 3
+    assert digest.activities_planned == 6
+    assert digest.activities_completed == 3
+    assert digest.completion_rate == 0.5
+    # Actual duration wins, estimated fills in, missing counts as zero
+    assert digest.total_minutes == 75
+
+def test_note_excerpts_prefer_recent_sessions_and_linked_notes():
+    digest = compute_weekly_digest(7, WEEK, [
+        session(1, date(2026, 3, 2), therapist_notes='oldest'),
+        session(2, date(2026, 3, 4), notes=[{'note_title': 'Linked', 'note_preview': '  linked note  '}],
+                therapist_notes='session field'),
+        session(3, date(2026, 3, 4), start='09:00:00', therapist_notes='   '),
+        session(4, date(2026, 3, 6)),
+    ])
+    assert [(e.session_id, e.note_title, e.excerpt) for e in digest.note_excerpts] == [
+        (2, 'Linked', 'linked note'),
+        (2, None, 'session field'),
+        (1, None, 'oldest'),
+    ]
+
+def test_note_excerpts_are_capped():
+    sessions = [session(i, date(2026, 3, 2 + i % 5), therapist_notes=f'note {i}') for i in range(10)]
+    assert len(compute_weekly_digest(7, WEEK, sessions).note_excerpts) == DIGEST_NOTE_EXCERPTS
+
+def test_trends_against_previous_week():
+    previous = {'sessions_attended': 1, 'activities_completed': 5, 'completion_rate': None, 'total_minutes': 30}
+    digest = compute_weekly_digest(7, WEEK, [session(1, WEEK, planned=4, completed=2, actual=60)], previous)
+    assert digest.trends == {
+        'sessions_attended': 0,
+        'activities_completed': -3,
+        'completion_rate': None,
+        'total_minutes': 30,
+    }
+
+class FakeQuery:
+    """The PostgREST filters _changed_rows uses, applied to a list of dict rows"""
+
+    def __init__(self, rows):
+        self.rows, self.filters, self.ordering, self.count, self.negate = rows, [], [], None, False
+
+    def select(self, columns):
+        return self
+
+    @property
+    def not_(self):
+        self.negate = True
+        return self
+
+    def is_(self, column, value):
+        assert self.negate and value == 'null'
+        self.filters.append(lambda row: row[column] is not None)
+        return self
+
+    def gte(self, column, value):
+        self.filters.append(lambda row: row[column] >= value)
+        return self
+
+    def or_(self, expression):
+        stamp, after, key, last_key = re.fullmatch(
+            r'(\w+)\.gt\."([^"]+)",and\(\1\.eq\."\2",(\w+)\.gt\.(\d+)\)', expression
+        ).groups()
+        self.filters.append(lambda row: row[stamp] > after or (row[stamp] == after and row[key] > int(last_key)))
+        return self
+
+    def order(self, column):
+        self.ordering.append(column)
+        return self
+
+    def limit(self, count):
+        self.count = count
+        return self
+
+    def execute(self):
+        rows = [row for row in self.rows if all(keep(row) for keep in self.filters)]
+        rows.sort(key=lambda row: tuple(row[column] for column in self.ordering))
+        return SimpleNamespace(data=[dict(row) for row in rows[:self.count]])
+
+class FakeSupabase:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def table(self, name):
+        assert name == 'sessions'
+        return FakeQuery(self.rows)
+
+def changed(session_id, child_id, updated_at):
+    return {'id': session_id, 'child_id': child_id, 'session_date': '2026-03-02', 'updated_at': updated_at}
+
+def test_changed_sessions_sharing_a_stamp_are_not_skipped(monkeypatch):
+    monkeypatch.setattr(digests, 'DIGEST_BATCH_SIZE', 3)
+    stamp = '2026-03-02T10:00:00+00:00'
+    rows = [changed(session_id, 100 + session_id, stamp) for session_id in range(1, 8)]
+    supabase = FakeSupabase(rows)
+
+    weeks, cursor = digests._changed_weeks(supabase, None)
+    assert {child_id for child_id, _ in weeks} == set(range(101, 108))
+    assert cursor == (stamp, 7)
+
+    # A row committed late with the same stamp, and a later one
+    rows += [changed(8, 108, stamp), changed(9, 109, '2026-03-02T10:00:01+00:00')]
+    weeks, cursor = digests._changed_weeks(supabase, cursor)
+    assert {child_id for child_id, _ in weeks} == {108, 109}
+    assert cursor == ('2026-03-02T10:00:01+00:00', 9)
+
+def test_cursor_without_an_id_starts_at_the_stamp(monkeypatch):
+    monkeypatch.setattr(digests, 'DIGEST_BATCH_SIZE', 3)
+    supabase = FakeSupabase([changed(1, 101, '2026-03-02T09:00:00+00:00'), changed(2, 102, '2026-03-02T10:00:00+00:00')])
+    weeks, _ = digests._changed_weeks(supabase, ('2026-03-02T10:00:00+00:00', None))
+    assert {child_id for child_id, _ in weeks} == {102}
@@ -0,0 +1,29 @@
+from datetime import datetime
+
+from db import make_etag, parse_if_match
+
+def test_make_etag_quotes_the_stored_value():
+    assert make_etag('2026-03-02T10:00:00.123456+00:00') == '"2026-03-02T10:00:00.123456+00:00"'
+
+def test_make_etag_accepts_datetimes():
+    assert make_etag(datetime(2026, 3, 2, 10, 0)) == '"2026-03-02T10:00:00"'
+
+def test_make_etag_without_a_version():
+    assert make_etag(None) is None
+    assert make_etag('') is None
+
+def test_parse_if_match_round_trips_make_etag():
+    version = '2026-03-02T10:00:00.123456+00:00'
+    assert parse_if_match(make_etag(version)) == version
+
+def test_parse_if_match_missing_or_wildcard_is_unconditional():
+    assert parse_if_match(None) is None
+    assert parse_if_match('') is None
+    assert parse_if_match('*') is None
+    assert parse_if_match('""') is None
+
+def test_parse_if_match_strips_weak_prefix_and_whitespace():
+    assert parse_if_match(' W/"2026-03-02" ') == '2026-03-02'
+
+def test_parse_if_match_uses_the_first_of_several_tags():
+    assert parse_if_match('"a", "b"') == 'a'
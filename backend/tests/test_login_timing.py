@@ -0,0 +1,16 @@
+from authentication import authh
+
+def test_unknown_email_still_verifies_a_password(monkeypatch):
+    checked = []
+    monkeypatch.setattr(authh, 'get_user_by_email', lambda email: None)
+    monkeypatch.setattr(authh, '_dummy_hash', '$2b$04$' + 'a' * 53)
+    monkeypatch.setattr(authh, 'verify_password', lambda password, hashed: checked.append(hashed) or False)
+
+    assert authh.authenticate_user_detailed('nobody@example.com', 'secret') == (None, "User not found")
+    assert checked == ['$2b$04$' + 'a' * 53]
+
+def test_dummy_hash_is_made_once(monkeypatch):
+    monkeypatch.setattr(authh, '_dummy_hash', None)
+    monkeypatch.setattr(authh, 'hash_password', lambda password: '$2b$04$' + password)
+    first = authh._dummy_password_hash()
+    assert authh._dummy_password_hash() == first
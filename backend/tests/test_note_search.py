@@ -0,0 +1,85 @@
+from datetime import date
+
+from notes.search import InMemoryNoteSearch
+
+NOTES = {
+    1: [
+        {'notes_id': 10, 'therapist_id': 1, 'session_date': date(2026, 3, 2), 'session_time': None,
+         'note_title': 'Speech practice', 'note_content': 'Worked on speech sounds and turn taking.'},
+        {'notes_id': 11, 'therapist_id': 1, 'session_date': date(2026, 3, 9), 'session_time': None,
+         'note_title': 'Motor skills', 'note_content': 'Fine motor work; some speech during play.'},
+        {'notes_id': 12, 'therapist_id': 1, 'session_date': date(2026, 3, 16), 'session_time': None,
+         'note_title': 'Motor skills', 'note_content': 'Balance beam and ball games.'},
+    ],
+    2: [
+        {'notes_id': 20, 'therapist_id': 2, 'session_date': date(2026, 3, 3), 'session_time': None,
+         'note_title': 'Speech speech speech', 'note_content': 'Speech only.'},
+    ],
+}
+
+def make_index():
+    loaded = []
+
+    def loader(therapist_id):
+        loaded.append(therapist_id)
+        return [dict(note) for note in NOTES.get(therapist_id, [])]
+
+    return InMemoryNoteSearch(loader=loader), loaded
+
+def ids(hits):
+    return [hit.notes_id for hit in hits]
+
+def test_title_matches_rank_above_body_matches():
+    index, _ = make_index()
+    assert ids(index.search(1, 'speech', 10, 0)) == [10, 11]
+
+def test_every_query_term_must_match():
+    index, _ = make_index()
+    assert ids(index.search(1, 'speech motor', 10, 0)) == [11]
+    assert index.search(1, 'speech unicorn', 10, 0) == []
+
+def test_ties_are_ordered_by_most_recent_session():
+    index, _ = make_index()
+    assert ids(index.search(1, 'skills', 10, 0)) == [12, 11]
+
+def test_results_are_paged():
+    index, _ = make_index()
+    assert ids(index.search(1, 'speech', 1, 0)) == [10]
+    assert ids(index.search(1, 'speech', 1, 1)) == [11]
+
+def test_search_is_scoped_to_the_therapist():
+    index, loaded = make_index()
+    assert ids(index.search(2, 'speech', 10, 0)) == [20]
+    assert ids(index.search(1, 'speech', 10, 0)) == [10, 11]
+    assert index.search(3, 'speech', 10, 0) == []
+    assert loaded == [2, 1, 3]
+
+def test_other_therapists_notes_do_not_change_ranking():
+    index, _ = make_index()
+    alone = index.search(1, 'speech', 10, 0)
+    index.search(2, 'speech', 10, 0)
+    assert [hit.rank for hit in index.search(1, 'speech', 10, 0)] == [hit.rank for hit in alone]
+
+def test_index_note_updates_loaded_therapists_only():
+    index, _ = make_index()
+    index.search(1, 'speech', 10, 0)
+    index.index_note({'notes_id': 12, 'therapist_id': 1, 'session_date': date(2026, 3, 16), 'session_time': None,
+                      'note_title': 'Motor skills', 'note_content': 'Speech came up too.'})
+    assert 12 in ids(index.search(1, 'speech', 10, 0))
+
+    index.index_note({'notes_id': 30, 'therapist_id': 3, 'session_date': date(2026, 3, 1), 'session_time': None,
+                      'note_title': 'Speech', 'note_content': ''})
+    assert index.search(3, 'speech', 10, 0) == []
+
+def test_reindexing_a_note_keeps_the_note_count():
+    index, _ = make_index()
+    index.search(1, 'speech', 10, 0)
+    note = dict(NOTES[1][0], note_content='Worked on speech again.')
+    index.index_note(note)
+    index.index_note(note)
+    assert index._note_counts[1] == 3
+
+def test_snippet_highlights_matches():
+    index, _ = make_index()
+    hit = index.search(1, 'sounds', 10, 0)[0]
+    assert '<mark>sounds</mark>' in hit.snippet
@@ -0,0 +1,39 @@
+import pytest
+
+from authentication import passwords
+
+@pytest.fixture
+def rounds(monkeypatch):
+    def set_rounds(value):
+        monkeypatch.setattr(passwords, '_rounds', value)
+    return set_rounds
+
+def test_weaker_hash_needs_rehash(rounds):
+    rounds(12)
+    assert passwords.needs_rehash('$2b$10$' + 'a' * 53)
+
+def test_current_or_stronger_hash_is_kept(rounds):
+    rounds(12)
+    assert not passwords.needs_rehash('$2b$12$' + 'a' * 53)
+    assert not passwords.needs_rehash('$2b$14$' + 'a' * 53)
+
+def test_non_bcrypt_hash_needs_rehash(rounds):
+    rounds(12)
+    assert passwords.needs_rehash('plaintext')
+
+def test_configured_rounds_below_the_floor_are_raised(monkeypatch, rounds):
+    rounds(None)
+    monkeypatch.setattr(passwords, 'BCRYPT_MIN_ROUNDS', 12)
+    monkeypatch.setenv('BCRYPT_ROUNDS', '8')
+    assert passwords.get_password_rounds() == 12
+
+def test_calibration_never_goes_below_the_floor(monkeypatch):
+    monkeypatch.setattr(passwords, 'BCRYPT_MIN_ROUNDS', 12)
+    # A target no hash can meet leaves calibration at its starting cost
+    assert passwords.calibrate_bcrypt_rounds(target_ms=0) == 12
+
+def test_pinned_rounds_are_exported_for_workers(monkeypatch, rounds):
+    rounds(13)
+    monkeypatch.delenv('BCRYPT_ROUNDS', raising=False)
+    assert passwords.pin_password_rounds() == 13
+    assert passwords.os.environ['BCRYPT_ROUNDS'] == '13'
@@ -0,0 +1,66 @@
+from types import SimpleNamespace
+
+import bcrypt
+import pytest
+from fastapi.testclient import TestClient
+
+import app as app_module
+import db
+import query_debug
+from authentication import authh
+from query_debug import QueryBudgetExceeded, expect_queries
+
+class FakeQuery:
+    """Query builder stand-in: every builder call chains, execute() finds no rows"""
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self
+
+    def execute(self):
+        return SimpleNamespace(data=[], error=None, count=0)
+
+class FakeClient:
+    def table(self, name):
+        return FakeQuery()
+
+    def rpc(self, fn, params=None):
+        return FakeQuery()
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(db, 'supabase_client', db.InstrumentedClient(FakeClient()))
+    monkeypatch.setattr(app_module, 'QUERY_DEBUG', True)
+    monkeypatch.setattr(query_debug, 'QUERY_BUDGET_STRICT', True)
+    # Keep the unknown-email path's dummy bcrypt check cheap
+    monkeypatch.setattr(authh, '_dummy_hash', bcrypt.hashpw(b'dummy', bcrypt.gensalt(rounds=4)).decode())
+    return TestClient(app_module.app)
+
+def login(client):
+    return client.post('/api/login', json={'email': 'nobody@example.com', 'password': 'secret'})
+
+def test_route_within_its_budget_passes(client):
+    # An unknown email costs one users lookup, well inside the login budget
+    assert login(client).status_code == 401
+
+def test_route_over_its_budget_fails_in_strict_mode(client, monkeypatch):
+    monkeypatch.setattr(app_module.login_user, '__query_budget__', 0)
+    with pytest.raises(QueryBudgetExceeded, match='made 1 queries, budget is 0'):
+        login(client)
+
+def test_over_budget_only_logs_without_strict_mode(client, monkeypatch):
+    monkeypatch.setattr(app_module.login_user, '__query_budget__', 0)
+    monkeypatch.setattr(query_debug, 'QUERY_BUDGET_STRICT', False)
+    assert login(client).status_code == 401
+
+def test_expect_queries(monkeypatch):
+    monkeypatch.setattr(query_debug, 'QUERY_BUDGET_STRICT', True)
+    client = db.InstrumentedClient(FakeClient())
+    with expect_queries(2, 'two lookups') as timings:
+        client.table('users').select('*').eq('id', 1).execute()
+        client.table('users').select('*').eq('id', 2).execute()
+    assert [label for label, _ in timings.db_calls] == ['users.select', 'users.select']
+
+    with pytest.raises(QueryBudgetExceeded, match='three lookups made 3 queries, budget is 2'):
+        with expect_queries(2, 'three lookups'):
+            for user_id in range(3):
+                client.table('users').select('*').eq('id', user_id).execute()
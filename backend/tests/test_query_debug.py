@@ -0,0 +1,28 @@
+from query_debug import QueryRecord, longest_sequential_run, query_shape
+
+def q(started, ended, shape='users.select eq(id)'):
+    return QueryRecord(shape, started, ended)
+
+def test_no_queries():
+    assert longest_sequential_run([]) == 0
+
+def test_single_query():
+    assert longest_sequential_run([q(0, 1)]) == 1
+
+def test_back_to_back_queries_form_one_run():
+    assert longest_sequential_run([q(0, 1), q(1, 2), q(2.5, 3)]) == 3
+
+def test_overlapping_queries_break_the_run():
+    # Two queries gathered in parallel, then one that waited for both
+    assert longest_sequential_run([q(0, 2), q(0.1, 1), q(2, 3)]) == 2
+
+def test_run_waits_for_the_slowest_overlapping_query():
+    # The third query starts before the long first one finishes, so it is concurrent with it
+    assert longest_sequential_run([q(0, 5), q(1, 2), q(3, 4)]) == 1
+
+def test_order_of_records_does_not_matter():
+    assert longest_sequential_run([q(2, 3), q(0, 1), q(1, 2)]) == 3
+
+def test_query_shape_ignores_filter_order_and_repeats():
+    assert query_shape('sessions.select', ('eq(id)', 'eq(child_id)', 'eq(id)')) == 'sessions.select eq(child_id) eq(id)'
+    assert query_shape('rpc.note_day_bitmap', ()) == 'rpc.note_day_bitmap'
@@ -0,0 +1,62 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+import app as app_module
+from authentication import authh
+from sessions import events
+
+THERAPIST = {'id': 7, 'email': 'therapist@example.com', 'role': 'therapist', 'is_active': True}
+
+@pytest.fixture
+def users(monkeypatch):
+    known = {THERAPIST['email']: dict(THERAPIST)}
+    monkeypatch.setattr(authh, 'get_cached_user_by_email', lambda email: known.get(email))
+    monkeypatch.setattr(app_module, 'get_cached_user_by_email', lambda email: known.get(email))
+    return known
+
+def test_ticket_can_be_redeemed_once():
+    ticket = authh.issue_stream_ticket('therapist@example.com')
+    assert authh.redeem_stream_ticket(ticket) == 'therapist@example.com'
+    assert authh.redeem_stream_ticket(ticket) is None
+
+def test_expired_ticket_is_rejected(monkeypatch):
+    monkeypatch.setattr(authh, 'STREAM_TICKET_TTL_SECONDS', 0)
+    assert authh.redeem_stream_ticket(authh.issue_stream_ticket('therapist@example.com')) is None
+
+def test_inactive_user_is_refused(users):
+    users[THERAPIST['email']]['is_active'] = False
+    with pytest.raises(HTTPException) as error:
+        authh.resolve_active_user(THERAPIST['email'])
+    assert error.value.status_code == 403
+
+def test_stream_rejects_access_token_in_query(users):
+    token = authh.create_access_token({'sub': '7', 'email': THERAPIST['email'], 'role': 'therapist'})
+    response = TestClient(app_module.app).get(f'/api/sessions/stream?token={token}')
+    assert response.status_code == 401
+
+def test_stream_rejects_unknown_ticket(users):
+    assert TestClient(app_module.app).get('/api/sessions/stream?ticket=nope').status_code == 401
+
+def test_ticket_for_inactive_user_is_refused(users):
+    ticket = authh.issue_stream_ticket(THERAPIST['email'])
+    users[THERAPIST['email']]['is_active'] = False
+    assert TestClient(app_module.app).get(f'/api/sessions/stream?ticket={ticket}').status_code == 403
+
+def test_stream_ends_once_the_user_is_no_longer_allowed(monkeypatch):
+    monkeypatch.setattr(events, 'HEARTBEAT_INTERVAL', 0.01)
+
+    async def not_disconnected():
+        return False
+
+    async def deactivated():
+        return False
+
+    async def collect():
+        return [chunk async for chunk in events.stream_session_events(7, not_disconnected, deactivated)]
+
+    chunks = asyncio.run(collect())
+    assert len(chunks) == 1 and chunks[0].startswith('event: ready')
+    assert events.broker.subscriber_count(7) == 0
@@ -0,0 +1,92 @@
+from authentication.throttle import InMemorySlidingWindow, LoginThrottle, LOGIN_ACCOUNT_LIMIT, LOGIN_IP_ACCOUNT_LIMIT
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def make_window(max_keys=100):
+    clock = FakeClock()
+    return InMemorySlidingWindow(max_keys=max_keys, clock=clock), clock
+
+def test_unknown_key_is_not_limited():
+    window, _ = make_window()
+    assert window.retry_after('ip:1', limit=3, window=60) == 0.0
+
+def test_limit_reached_reports_time_until_oldest_hit_leaves_the_window():
+    window, clock = make_window()
+    for _ in range(3):
+        window.hit('ip:1', 60)
+        clock.now += 10
+    # Hits at 1000, 1010, 1020; now 1030: the first leaves the window at 1060
+    assert window.retry_after('ip:1', limit=3, window=60) == 30.0
+    assert window.retry_after('ip:1', limit=4, window=60) == 0.0
+
+def test_hits_older_than_the_window_are_forgotten():
+    window, clock = make_window()
+    for _ in range(3):
+        window.hit('ip:1', 60)
+    clock.now += 60
+    assert window.retry_after('ip:1', limit=3, window=60) == 0.0
+
+def test_hits_exactly_one_window_old_no_longer_count():
+    window, clock = make_window()
+    window.hit('ip:1', 60)
+    clock.now += 60
+    assert window.retry_after('ip:1', limit=1, window=60) == 0.0
+
+def test_keys_are_independent_and_reset_clears_one():
+    window, _ = make_window()
+    window.hit('ip:1', 60)
+    window.hit('ip:2', 60)
+    window.reset('ip:1')
+    assert window.retry_after('ip:1', limit=1, window=60) == 0.0
+    assert window.retry_after('ip:2', limit=1, window=60) > 0
+
+def test_least_recently_hit_key_is_evicted_beyond_max_keys():
+    window, _ = make_window(max_keys=2)
+    window.hit('a', 60)
+    window.hit('b', 60)
+    window.hit('a', 60)
+    window.hit('c', 60)
+    assert window.retry_after('b', limit=1, window=60) == 0.0
+    assert window.retry_after('a', limit=2, window=60) > 0
+    assert window.retry_after('c', limit=1, window=60) > 0
+
+def test_failed_logins_lock_out_only_the_guessing_address():
+    window, _ = make_window()
+    throttle = LoginThrottle(window)
+    for _ in range(LOGIN_IP_ACCOUNT_LIMIT):
+        assert throttle.check('10.0.0.1', 'Parent@Example.com') == 0.0
+        throttle.record_failure('10.0.0.1', 'Parent@Example.com')
+    assert throttle.check('10.0.0.1', 'parent@example.com') > 0
+    assert throttle.check('10.0.0.2', 'parent@example.com') == 0.0
+
+def test_successful_login_clears_failures_for_that_address():
+    window, _ = make_window()
+    throttle = LoginThrottle(window)
+    for _ in range(LOGIN_IP_ACCOUNT_LIMIT - 1):
+        throttle.record_failure('10.0.0.1', 'parent@example.com')
+    throttle.record_success('10.0.0.1', 'parent@example.com')
+    throttle.record_failure('10.0.0.1', 'parent@example.com')
+    assert throttle.check('10.0.0.1', 'parent@example.com') == 0.0
+
+def test_failures_spread_over_many_addresses_hit_the_account_limit():
+    window, _ = make_window(max_keys=1000)
+    throttle = LoginThrottle(window)
+    for attempt in range(LOGIN_ACCOUNT_LIMIT):
+        ip = f"10.0.{attempt // 100}.{attempt % 100}"
+        assert throttle.check(ip, 'parent@example.com') == 0.0
+        throttle.record_failure(ip, 'parent@example.com')
+    assert throttle.check('192.168.1.1', 'parent@example.com') > 0
+    assert throttle.check('192.168.1.1', 'other@example.com') == 0.0
+
+def test_success_does_not_reset_the_account_limit():
+    window, _ = make_window(max_keys=1000)
+    throttle = LoginThrottle(window)
+    for attempt in range(LOGIN_ACCOUNT_LIMIT):
+        throttle.record_failure(f"10.0.0.{attempt}", 'parent@example.com')
+    throttle.record_success('192.168.1.1', 'parent@example.com')
+    assert throttle.check('192.168.1.1', 'parent@example.com') > 0
@@ -0,0 +1,35 @@
+import pytest
+
+from authentication import authh
+
+USER = {'id': 1, 'email': 'parent@example.com', 'role': 'parent', 'is_active': True,
+        'password_hash': '$2b$12$' + 'a' * 53, 'profile': {'id': 3, 'child_id': 9}}
+
+@pytest.fixture
+def lookups(monkeypatch):
+    calls = []
+
+    def get_user_by_email(email):
+        calls.append(email)
+        return {**USER, 'profile': dict(USER['profile'])}
+
+    monkeypatch.setattr(authh, 'get_user_by_email', get_user_by_email)
+    monkeypatch.setattr(authh, 'USER_CACHE_TTL_SECONDS', 30)
+    authh.invalidate_cached_user(USER['email'])
+    yield calls
+    authh.invalidate_cached_user(USER['email'])
+
+def test_cached_user_has_no_password_hash(lookups):
+    assert 'password_hash' not in authh.get_cached_user_by_email(USER['email'])
+    assert 'password_hash' not in authh.get_cached_user_by_email(USER['email'])
+    assert lookups == [USER['email']]
+
+def test_mutating_a_returned_user_does_not_change_the_cache(lookups):
+    first = authh.get_cached_user_by_email(USER['email'])
+    first['role'] = 'therapist'
+    first['profile']['child_id'] = None
+
+    second = authh.get_cached_user_by_email(USER['email'])
+    assert second['role'] == 'parent'
+    assert second['profile']['child_id'] == 9
+    assert lookups == [USER['email']]
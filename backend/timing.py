@@ -0,0 +1,107 @@
+"""
+Per-request timing: where a request's time goes.
+
+The HTTP middleware in app.py opens a RequestTimings for each request. The
+instrumented Supabase client (see db.py) records every query into it, and auth
+and response rendering record spans. The result goes out as a Server-Timing
+header and one structured log line per request, including the number of DB
+round trips so sequential multi-query paths stand out.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+import logging
+import os
+import time
+from fastapi.responses import JSONResponse
+
+logger = logging.getLogger("request_timing")
+
+# Set REQUEST_TIMING_LOG=0 to keep the Server-Timing header but skip the per-request log line
+REQUEST_TIMING_LOG = os.getenv("REQUEST_TIMING_LOG", "1") != "0"
+
+class RequestTimings:
+    """Mutable per-request record; shared with worker threads the request hands work to"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_calls: List[Tuple[str, float]] = []
+        self.spans: Dict[str, float] = {}
+        # Query shapes and start/end times, only collected with QUERY_DEBUG=1 (see query_debug.py)
+        self.queries: List = []
+
+    def add_span(self, name: str, ms: float) -> None:
+        self.spans[name] = self.spans.get(name, 0.0) + ms
+
+    @property
+    def db_ms(self) -> float:
+        return sum(ms for _, ms in self.db_calls)
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+    def server_timing_header(self) -> str:
+        count = len(self.db_calls)
+        parts = [f'db;dur={self.db_ms:.1f};desc="{count} {"query" if count == 1 else "queries"}"']
+        parts += [f"{name};dur={ms:.1f}" for name, ms in self.spans.items()]
+        parts.append(f"total;dur={self.elapsed_ms():.1f}")
+        return ", ".join(parts)
+
+    def summary(self) -> Dict:
+        return {
+            'total_ms': round(self.elapsed_ms(), 1),
+            'db_ms': round(self.db_ms, 1),
+            'db_calls': len(self.db_calls),
+            'queries': dict(Counter(label for label, _ in self.db_calls)),
+            **{f"{name}_ms": round(ms, 1) for name, ms in self.spans.items()}
+        }
+
+_current: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+def start_request_timings() -> RequestTimings:
+    timings = RequestTimings()
+    _current.set(timings)
+    return timings
+
+def current_timings() -> Optional[RequestTimings]:
+    return _current.get()
+
+@contextmanager
+def timings_scope():
+    """Collect timings for a block run outside the HTTP middleware (scripts, tests)"""
+    token = _current.set(RequestTimings())
+    try:
+        yield _current.get()
+    finally:
+        _current.reset(token)
+
+def record_db_call(label: str, ms: float) -> None:
+    timings = _current.get()
+    if timings is not None:
+        timings.db_calls.append((label, ms))
+
+@contextmanager
+def timed(span: str):
+    """Add the time spent in the block to the current request's span (no-op outside requests)"""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add_span(span, (time.perf_counter() - start) * 1000)
+
+def log_request_summary(method: str, path: str, status_code: int, timings: RequestTimings) -> None:
+    if REQUEST_TIMING_LOG:
+        # Fields are serialised by the log listener thread, not here
+        logger.info("request", extra={'fields': {'method': method, 'path': path, 'status': status_code, **timings.summary()}})
+
+class TimedJSONResponse(JSONResponse):
+    """JSONResponse that records JSON encoding of the body as the 'serialize' span"""
+
+    def render(self, content) -> bytes:
+        with timed("serialize"):
+            return super().render(content)
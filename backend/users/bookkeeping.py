@@ -0,0 +1,96 @@
+"""
+Write-behind buffer for user bookkeeping columns such as last_login.
+
+These writes record that something happened; nothing on the request path reads
+them back, so they need not delay the response. Updates are merged per user in
+memory (the latest timestamp wins) and written in batches through the
+apply_user_bookkeeping() function in others/schema.sql, every
+BOOKKEEPING_FLUSH_INTERVAL seconds and at shutdown.
+"""
+from typing import Any, Dict, Optional
+import asyncio
+import logging
+import os
+import threading
+from db import get_supabase_client
+
+logger = logging.getLogger(__name__)
+
+BOOKKEEPING_FLUSH_INTERVAL = float(os.getenv("BOOKKEEPING_FLUSH_INTERVAL", "5"))
+BOOKKEEPING_BATCH_SIZE = 500
+# users columns this writer may set; apply_user_bookkeeping() must list the same ones
+BOOKKEEPING_COLUMNS = {'last_login'}
+
+class UserBookkeepingWriter:
+    def __init__(self, interval: float = BOOKKEEPING_FLUSH_INTERVAL):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._pending: Dict[int, Dict[str, Any]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def record(self, user_id: int, **fields: Any) -> None:
+        """Queue bookkeeping values for a user; written immediately if the writer is not running"""
+        unknown = set(fields) - BOOKKEEPING_COLUMNS
+        if unknown:
+            raise ValueError(f"Not a bookkeeping column: {', '.join(sorted(unknown))}")
+
+        with self._lock:
+            self._merge(user_id, fields)
+        if self._task is None:
+            self.flush()
+
+    def _merge(self, user_id: int, fields: Dict[str, Any]) -> None:
+        # Timestamps are ISO strings in one format, so the larger one is the later one
+        pending = self._pending.setdefault(user_id, {})
+        for column, value in fields.items():
+            if value is not None and (pending.get(column) is None or value > pending[column]):
+                pending[column] = value
+
+    def flush(self) -> int:
+        """Write everything queued so far; blocking. Returns the number of users written"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        rows = [{'id': user_id, **fields} for user_id, fields in pending.items()]
+        written = 0
+        for start in range(0, len(rows), BOOKKEEPING_BATCH_SIZE):
+            batch = rows[start:start + BOOKKEEPING_BATCH_SIZE]
+            try:
+                supabase = get_supabase_client()
+                supabase.rpc('apply_user_bookkeeping', {'p_rows': batch}).execute()
+                written += len(batch)
+            except Exception as e:
+                logger.error("Error writing bookkeeping for %s users: %s", len(batch), e)
+                # Requeue behind anything recorded since, for the next flush
+                with self._lock:
+                    for row in batch:
+                        self._merge(row['id'], {k: v for k, v in row.items() if k != 'id'})
+
+        if written:
+            logger.info("Wrote bookkeeping for %s users", written)
+        return written
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await asyncio.to_thread(self.flush)
+
+    def start(self) -> None:
+        """Start periodic flushing in the running event loop"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop periodic flushing and write what is left"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await asyncio.to_thread(self.flush)
+
+user_bookkeeping = UserBookkeepingWriter()
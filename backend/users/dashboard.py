@@ -0,0 +1,48 @@
+from typing import Optional, Dict, Any, List
+from pydantic import BaseModel
+import asyncio
+import logging
+from users.profiles import parent_details_from_profile
+from students.students import get_student_by_id
+from sessions.sessions import list_completed_sessions_by_child_id, count_sessions_awaiting_feedback
+
+logger = logging.getLogger(__name__)
+
+# Completed sessions shown on the dashboard before the parent pages into history
+DASHBOARD_RECENT_SESSIONS = 5
+
+class ParentDashboardResponse(BaseModel):
+    parent: Dict[str, Any]
+    child: Optional[Dict[str, Any]] = None
+    recent_sessions: List[Dict[str, Any]] = []
+    pending_feedback_count: int = 0
+
+async def get_parent_dashboard(profile: Dict[str, Any], recent_limit: int = DASHBOARD_RECENT_SESSIONS) -> ParentDashboardResponse:
+    """
+    Build the parent app's landing data in one call
+    The child, session and feedback queries are independent, so they run
+    concurrently in worker threads (the Supabase client is synchronous)
+    """
+    try:
+        parent = parent_details_from_profile(profile)
+        child_id = profile.get("child_id")
+        if not child_id:
+            return ParentDashboardResponse(parent=parent)
+
+        child, recent_sessions, pending_feedback_count = await asyncio.gather(
+            asyncio.to_thread(get_student_by_id, child_id),
+            asyncio.to_thread(list_completed_sessions_by_child_id, child_id, recent_limit, 0),
+            asyncio.to_thread(count_sessions_awaiting_feedback, child_id)
+        )
+
+        logger.info("Built parent dashboard for child_id %s", child_id)
+        return ParentDashboardResponse(
+            parent=parent,
+            child=child,
+            recent_sessions=recent_sessions,
+            pending_feedback_count=pending_feedback_count
+        )
+
+    except Exception as e:
+        logger.error("Error building parent dashboard for parent %s: %s", profile.get('id'), e)
+        raise Exception(f"Database error: {str(e)}")
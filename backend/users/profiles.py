@@ -1,5 +1,5 @@
 # from db import get_db_connection
-from db import get_supabase_client, format_supabase_response, handle_supabase_error
+from db import get_supabase_client, format_supabase_response, handle_supabase_error, PreconditionFailed, make_etag
 from typing import Optional, Dict, Any
 import logging
 
@@ -18,7 +18,7 @@ def get_therapist_profile(user_id: int) -> Optional[Dict[str, Any]]:
             return profiles[0]
         return None
     except Exception as e:
-        logger.error(f"Error getting therapist profile for user {user_id}: {e}")
+        logger.error("Error getting therapist profile for user %s: %s", user_id, e)
         return None
 
 def get_parent_profile(user_id: int) -> Optional[Dict[str, Any]]:
@@ -34,11 +34,28 @@ def get_parent_profile(user_id: int) -> Optional[Dict[str, Any]]:
             return profiles[0]
         return None
     except Exception as e:
-        logger.error(f"Error getting parent profile for user {user_id}: {e}")
+        logger.error("Error getting parent profile for user %s: %s", user_id, e)
         return None
 
-def update_therapist_profile(user_id: int, **kwargs) -> Optional[Dict[str, Any]]:
-    """Update therapist profile using Supabase"""
+# Parent profile fields returned to the parent app
+PARENT_DETAIL_FIELDS = [
+    "id", "user_id", "parent_first_name", "parent_last_name", "child_first_name", "child_last_name",
+    "child_dob", "child_id", "email", "phone", "alternate_phone", "address_line1", "address_line2",
+    "city", "state", "postal_code", "country", "relation_to_child", "is_verified"
+]
+
+def parent_details_from_profile(profile: Dict[str, Any]) -> Dict[str, Any]:
+    """Shape a parents row the way /api/parent-details returns it"""
+    details = {field: profile.get(field) for field in PARENT_DETAIL_FIELDS}
+    details["created_at"] = str(profile.get("created_at", ""))
+    return details
+
+def update_therapist_profile(user_id: int, if_match: Optional[str] = None, **kwargs) -> Optional[Dict[str, Any]]:
+    """
+    Update therapist profile using Supabase
+    if_match is the updated_at the client last saw; when given the update is
+    conditional and PreconditionFailed is raised if the profile has changed
+    """
     try:
         client = get_supabase_client()
         
@@ -57,20 +74,33 @@ def update_therapist_profile(user_id: int, **kwargs) -> Optional[Dict[str, Any]]
         from datetime import datetime
         update_data['updated_at'] = datetime.utcnow().isoformat()
         
-        response = client.table('therapists').update(update_data).eq('user_id', user_id).execute()
+        query = client.table('therapists').update(update_data).eq('user_id', user_id)
+        if if_match:
+            query = query.eq('updated_at', if_match)
+        response = query.execute()
         handle_supabase_error(response)
         
         profiles = format_supabase_response(response)
         if profiles:
-            logger.info(f"Updated therapist profile for user {user_id}")
+            logger.info("Updated therapist profile for user %s", user_id)
             return profiles[0]
+        if if_match:
+            current = get_therapist_profile(user_id)
+            if current:
+                raise PreconditionFailed("Profile was modified by another request", etag=make_etag(current.get('updated_at')))
         return None
+    except PreconditionFailed:
+        raise
     except Exception as e:
-        logger.error(f"Error updating therapist profile for user {user_id}: {e}")
+        logger.error("Error updating therapist profile for user %s: %s", user_id, e)
         return None
 
-def update_parent_profile(user_id: int, **kwargs) -> Optional[Dict[str, Any]]:
-    """Update parent profile using Supabase"""
+def update_parent_profile(user_id: int, if_match: Optional[str] = None, **kwargs) -> Optional[Dict[str, Any]]:
+    """
+    Update parent profile using Supabase
+    if_match is the updated_at the client last saw; when given the update is
+    conditional and PreconditionFailed is raised if the profile has changed
+    """
     try:
         client = get_supabase_client()
         
@@ -89,16 +119,25 @@ def update_parent_profile(user_id: int, **kwargs) -> Optional[Dict[str, Any]]:
         from datetime import datetime
         update_data['updated_at'] = datetime.utcnow().isoformat()
         
-        response = client.table('parents').update(update_data).eq('user_id', user_id).execute()
+        query = client.table('parents').update(update_data).eq('user_id', user_id)
+        if if_match:
+            query = query.eq('updated_at', if_match)
+        response = query.execute()
         handle_supabase_error(response)
         
         profiles = format_supabase_response(response)
         if profiles:
-            logger.info(f"Updated parent profile for user {user_id}")
+            logger.info("Updated parent profile for user %s", user_id)
             return profiles[0]
+        if if_match:
+            current = get_parent_profile(user_id)
+            if current:
+                raise PreconditionFailed("Profile was modified by another request", etag=make_etag(current.get('updated_at')))
         return None
+    except PreconditionFailed:
+        raise
     except Exception as e:
-        logger.error(f"Error updating parent profile for user {user_id}: {e}")
+        logger.error("Error updating parent profile for user %s: %s", user_id, e)
         return None
 
 # COMMENTED OUT: Direct PostgreSQL versions (keeping for reference)
@@ -1,9 +1,9 @@
-import bcrypt
 # from db import get_db_connection
 # import psycopg2
 # from psycopg2 import sql
 from db import get_supabase_client, format_supabase_response, handle_supabase_error
 from typing import Optional
+from authentication.passwords import hash_password
 import logging
 
 logger = logging.getLogger(__name__)
@@ -31,7 +31,7 @@ def create_user(email: str, password: str, role: str, first_name: str = None, la
     if not last_name:
         last_name = ""
     
-    password_hash = bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+    password_hash = hash_password(password)
     client = get_supabase_client()
     
     try:
@@ -53,7 +53,7 @@ def create_user(email: str, password: str, role: str, first_name: str = None, la
             
         user = users[0]
         user_id = user["id"]
-        logger.info(f"Created user with ID: {user_id}, email: {email}, role: {role}")
+        logger.info("Created user with ID: %s, email: %s, role: %s", user_id, email, role)
         
         # Create corresponding therapist or parent record
         if role == "therapist":
@@ -73,7 +73,7 @@ def create_user(email: str, password: str, role: str, first_name: str = None, la
             profiles = format_supabase_response(profile_response)
             if profiles:
                 user["profile"] = profiles[0]
-                logger.info(f"Created therapist profile with ID: {profiles[0]['id']}")
+                logger.info("Created therapist profile with ID: %s", profiles[0]['id'])
                 
         elif role == "parent":
             # Use the new parent fields if provided, otherwise fall back to basic fields
@@ -107,16 +107,16 @@ def create_user(email: str, password: str, role: str, first_name: str = None, la
             profiles = format_supabase_response(profile_response)
             if profiles:
                 user["profile"] = profiles[0]
-                logger.info(f"Created parent profile with ID: {profiles[0]['id']}")
+                logger.info("Created parent profile with ID: %s", profiles[0]['id'])
         
         return user
         
     except Exception as e:
         error_msg = str(e).lower()
         if 'unique' in error_msg or 'duplicate' in error_msg:
-            logger.error(f"Email already exists: {email}")
+            logger.error("Email already exists: %s", email)
             raise ValueError("Email already exists")
-        logger.error(f"Error creating user {email}: {e}")
+        logger.error("Error creating user %s: %s", email, e)
         raise Exception(f"Failed to create user: {e}")
 
 # COMMENTED OUT: Direct PostgreSQL version (keeping for reference)
@@ -73,11 +73,10 @@ export const LoginPage: React.FC = () => {
       // Handle different error scenarios
       const errorMessage = error instanceof Error ? error.message : 'Login failed';
       
-      if (errorMessage.includes('User not found')) {
-        setLoginError('User not found. Would you like to register?');
-        setShowRegisterPrompt(true);
-      } else if (errorMessage.includes('Invalid email or password') || errorMessage.includes('Invalid password')) {
+      if (errorMessage.includes('Invalid email or password') || errorMessage.includes('Invalid password')) {
+        // The server no longer says whether the email exists, so offer registration either way
         setLoginError('Invalid email or password. Please check your credentials.');
+        setShowRegisterPrompt(true);
       } else if (errorMessage.includes('fetch')) {
         setLoginError('Unable to connect to server. Please check your internet connection.');
       } else {
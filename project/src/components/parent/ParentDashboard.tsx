@@ -57,7 +57,7 @@ export const ParentDashboard: React.FC<ParentDashboardProps> = ({ isProfileOpen
     }
   }, [isProfileOpen]);
 
-  // Function to get child ID and details from parent profile and children table
+  // Function to get parent and child details from the parent dashboard endpoint
   const getChildDataFromDatabase = async (): Promise<{ childData: ChildData | null, parentData: ParentData | null }> => {
     try {
       const token = localStorage.getItem('access_token');
@@ -66,70 +66,29 @@ export const ParentDashboard: React.FC<ParentDashboardProps> = ({ isProfileOpen
         return { childData: null, parentData: null };
       }
 
-      console.log('Fetching parent profile to get child ID...');
-      const parentResponse = await fetch(`http://localhost:8000/api/parent-details/${user.id}`, {
+      console.log('Fetching parent dashboard...');
+      // Parent details, child profile and recent sessions arrive in one response
+      const dashboardResponse = await fetch('http://localhost:8000/api/parent/dashboard', {
         headers: {
           'Authorization': `Bearer ${token}`
         }
       });
 
-      if (!parentResponse.ok) {
-        console.log('Failed to fetch parent details');
+      if (!dashboardResponse.ok) {
+        console.log('Failed to fetch parent dashboard');
         return { childData: null, parentData: null };
       }
 
-      const parentData = await parentResponse.json();
-      console.log('Parent data fetched:', parentData);
+      const dashboard = await dashboardResponse.json();
+      console.log('Parent dashboard fetched:', dashboard);
 
-      // Store parent information
-      const parentInfo: ParentData = {
-        id: parentData.id,
-        user_id: parentData.user_id,
-        parent_first_name: parentData.parent_first_name,
-        parent_last_name: parentData.parent_last_name,
-        child_first_name: parentData.child_first_name,
-        child_last_name: parentData.child_last_name,
-        child_dob: parentData.child_dob,
-        child_id: parentData.child_id,
-        email: parentData.email,
-        phone: parentData.phone,
-        alternate_phone: parentData.alternate_phone,
-        address_line1: parentData.address_line1,
-        address_line2: parentData.address_line2,
-        city: parentData.city,
-        state: parentData.state,
-        postal_code: parentData.postal_code,
-        country: parentData.country,
-        relation_to_child: parentData.relation_to_child,
-        is_verified: parentData.is_verified,
-        created_at: parentData.created_at
-      };
-
-      // Get child ID from parent profile
-      const childId = parentData.child_id;
-      if (!childId) {
-        console.log('No child ID found in parent profile');
+      const parentInfo: ParentData = dashboard.parent;
+      if (!dashboard.child) {
+        console.log('No child found for parent profile');
         return { childData: null, parentData: parentInfo };
       }
 
-      console.log('Found child ID:', childId, 'Now fetching child details...');
-
-      // Get actual child details from children table using child_id
-      const childResponse = await fetch(`http://localhost:8000/api/children/${childId}`, {
-        headers: {
-          'Authorization': `Bearer ${token}`
-        }
-      });
-
-      if (!childResponse.ok) {
-        console.error('Failed to fetch child details:', childResponse.status);
-        return { childData: null, parentData: parentInfo };
-      }
-
-      const childData = await childResponse.json();
-      console.log('Child data fetched:', childData);
-
-      return { childData, parentData: parentInfo };
+      return { childData: dashboard.child, parentData: parentInfo };
 
     } catch (error) {
       console.error('Error getting data from database:', error);
@@ -24,12 +24,27 @@ interface Session {
   therapist_name?: string;
 }
 
+interface WeeklyDigest {
+  child_id: number;
+  week_start: string;
+  week_end: string;
+  sessions_attended: number;
+  activities_planned: number;
+  activities_completed: number;
+  completion_rate?: number | null;
+  total_minutes: number;
+  note_excerpts: { session_id: number; session_date: string; note_title?: string; excerpt: string }[];
+  trends: Record<string, number | null>;
+  generated_at: string;
+}
+
 interface ProgressReportProps {
   // No longer need studentId since we get it from parent profile
 }
 
 const ProgressReport: React.FC<ProgressReportProps> = () => {
   const [sessions, setSessions] = useState<Session[]>([]);
+  const [digest, setDigest] = useState<WeeklyDigest | null>(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
   const [feedbackModalOpen, setFeedbackModalOpen] = useState(false);
@@ -72,6 +87,33 @@ const ProgressReport: React.FC<ProgressReportProps> = () => {
     fetchSessions();
   }, []); // No dependency on studentId anymore
 
+  useEffect(() => {
+    // Latest weekly summary, precomputed on the server
+    const fetchDigest = async () => {
+      try {
+        const token = localStorage.getItem('access_token');
+        const response = await fetch(`http://localhost:8000/api/parent/digests?weeks=1`, {
+          headers: {
+            'Authorization': `Bearer ${token}`
+          }
+        });
+        if (response.ok) {
+          const data: WeeklyDigest[] = await response.json();
+          setDigest(data[0] || null);
+        }
+      } catch (err) {
+        console.error('Error fetching weekly digest:', err);
+      }
+    };
+
+    fetchDigest();
+  }, []);
+
+  const formatTrend = (value?: number | null) => {
+    if (value === null || value === undefined || value === 0) return '';
+    return value > 0 ? ` (+${value})` : ` (${value})`;
+  };
+
   const openFeedbackModal = (session: Session) => {
     setSelectedSession(session);
     setFeedback(session.parent_feedback || ''); // Pre-fill existing feedback
@@ -195,6 +237,43 @@ const ProgressReport: React.FC<ProgressReportProps> = () => {
           </p>
         </div>
       </motion.div>
+      {digest && (
+        <motion.div
+          initial={{ opacity: 0, y: 20 }}
+          animate={{ opacity: 1, y: 0 }}
+          transition={{ delay: 0.2, duration: 0.6 }}
+          className="glass-card rounded-2xl p-6"
+        >
+          <h2 className="text-xl font-bold text-slate-800 dark:text-white mb-4">
+            Week of {formatDate(digest.week_start)}
+          </h2>
+          <div className="grid grid-cols-1 md:grid-cols-3 gap-4 mb-4">
+            <div className="p-3 bg-slate-50 dark:bg-slate-800/50 rounded-xl">
+              <p className="text-xs text-slate-500 dark:text-slate-400">Sessions attended</p>
+              <p className="font-semibold text-slate-800 dark:text-white text-sm">
+                {digest.sessions_attended}{formatTrend(digest.trends.sessions_attended)}
+              </p>
+            </div>
+            <div className="p-3 bg-slate-50 dark:bg-slate-800/50 rounded-xl">
+              <p className="text-xs text-slate-500 dark:text-slate-400">Activities completed</p>
+              <p className="font-semibold text-slate-800 dark:text-white text-sm">
+                {digest.activities_completed}/{digest.activities_planned}{formatTrend(digest.trends.activities_completed)}
+              </p>
+            </div>
+            <div className="p-3 bg-slate-50 dark:bg-slate-800/50 rounded-xl">
+              <p className="text-xs text-slate-500 dark:text-slate-400">Time in therapy</p>
+              <p className="font-semibold text-slate-800 dark:text-white text-sm">
+                {digest.total_minutes} min{formatTrend(digest.trends.total_minutes)}
+              </p>
+            </div>
+          </div>
+          {digest.note_excerpts.map((note) => (
+            <p key={`${note.session_id}-${note.excerpt}`} className="text-sm text-slate-600 dark:text-slate-400 mb-1">
+              <span className="font-medium">{formatDate(note.session_date)}:</span> {note.excerpt}
+            </p>
+          ))}
+        </motion.div>
+      )}
       <motion.div
         initial={{ opacity: 0, y: 20 }}
         animate={{ opacity: 1, y: 0 }}
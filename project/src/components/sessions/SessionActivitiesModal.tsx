@@ -84,10 +84,11 @@ export const SessionActivitiesModal: React.FC<SessionActivitiesModalProps> = ({
     }
   };
 
-  const fetchAvailableActivities = async () => {
+  const fetchSessionDetail = async () => {
     try {
       const token = localStorage.getItem('access_token');
-      const response = await fetch(`http://localhost:8000/api/students/${session.student_id}/activities`, {
+      // Session activities and the student's available activities in one request
+      const response = await fetch(`http://localhost:8000/api/sessions/${session.id}?include=activities,available_activities`, {
         headers: {
           'Authorization': `Bearer ${token}`
         }
@@ -95,17 +96,21 @@ export const SessionActivitiesModal: React.FC<SessionActivitiesModalProps> = ({
 
       if (response.ok) {
         const data = await response.json();
-        setAvailableActivities(data);
+        setSessionActivities(data.activities || []);
+        setAvailableActivities(data.available_activities || []);
+      } else {
+        setError('Failed to fetch session activities');
       }
     } catch (err) {
-      console.error('Available activities fetch error:', err);
+      setError('Error fetching session activities');
+      console.error('Session detail fetch error:', err);
     }
   };
 
   useEffect(() => {
     const loadData = async () => {
       setLoading(true);
-      await Promise.all([fetchSessionActivities(), fetchAvailableActivities()]);
+      await fetchSessionDetail();
       setLoading(false);
     };
 
@@ -34,7 +34,7 @@ interface Student {
 }
 
 export const SessionsList: React.FC = () => {
-  const { user } = useAuth();
+  const { user, refreshAccessToken } = useAuth();
   const [sessions, setSessions] = useState<Session[]>([]);
   const [students, setStudents] = useState<Student[]>([]);
   const [loading, setLoading] = useState(true);
@@ -153,6 +153,85 @@ export const SessionsList: React.FC = () => {
     }
   }, [user]);
 
+  // Refresh when the server pushes a session or activity change instead of polling
+  useEffect(() => {
+    if (!user || !localStorage.getItem('access_token')) return;
+
+    let events: EventSource | null = null;
+    let retryTimer: ReturnType<typeof setTimeout> | null = null;
+    let retryDelayMs = 1000;
+    let closed = false;
+
+    // EventSource cannot send an Authorization header, so each connection opens
+    // with a single-use ticket fetched with a current token. EventSource's own
+    // reconnects would reuse a spent ticket, so reconnect ourselves instead
+    const currentToken = async (): Promise<string | null> => {
+      const expiresAt = Number(localStorage.getItem('access_token_expires_at') || 0);
+      if (expiresAt && expiresAt - Date.now() < 30000) {
+        return refreshAccessToken();
+      }
+      return localStorage.getItem('access_token');
+    };
+
+    const streamTicket = async (token: string): Promise<string> => {
+      const response = await fetch('http://localhost:8000/api/sessions/stream-ticket', {
+        method: 'POST',
+        headers: {
+          'Authorization': `Bearer ${token}`
+        }
+      });
+      if (!response.ok) {
+        throw new Error(`Failed to get stream ticket: ${response.status}`);
+      }
+      const data = await response.json();
+      return data.ticket;
+    };
+
+    const reconnectLater = () => {
+      if (closed) return;
+      retryTimer = setTimeout(() => {
+        // Changes may have been missed while disconnected
+        fetchSessions();
+        connect();
+      }, retryDelayMs);
+      retryDelayMs = Math.min(retryDelayMs * 2, 30000);
+    };
+
+    const connect = async () => {
+      const token = await currentToken();
+      if (closed || !token) return;
+
+      let ticket: string;
+      try {
+        ticket = await streamTicket(token);
+      } catch (err) {
+        console.error('Session stream error:', err);
+        reconnectLater();
+        return;
+      }
+      if (closed) return;
+
+      events = new EventSource(`http://localhost:8000/api/sessions/stream?ticket=${encodeURIComponent(ticket)}`);
+      const refresh = () => { fetchSessions(); };
+      ['session.created', 'session.updated', 'session.deleted', 'activity.added', 'activity.removed', 'resync']
+        .forEach(type => events!.addEventListener(type, refresh));
+      events.addEventListener('ready', () => { retryDelayMs = 1000; });
+      events.onerror = () => {
+        events?.close();
+        events = null;
+        reconnectLater();
+      };
+    };
+
+    connect();
+
+    return () => {
+      closed = true;
+      if (retryTimer) clearTimeout(retryTimer);
+      events?.close();
+    };
+  }, [user, refreshAccessToken]);
+
   const getStatusColor = (status: string) => {
     switch (status) {
       case 'scheduled':
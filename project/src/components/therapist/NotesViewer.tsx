@@ -10,9 +10,10 @@ interface SessionNote {
   notes_id: number;
   therapist_id: number;
   session_date: string;
-  note_content: string;
   note_title: string | null;
   session_time: string | null;
+  note_length: number;
+  note_preview: string;
   created_at: string;
   last_edited_at: string;
 }
@@ -26,7 +27,10 @@ export const NotesViewer: React.FC<NotesViewerProps> = ({ open, onOpenChange })
   const { user } = useAuth();
   const [selectedDate, setSelectedDate] = React.useState<Date | undefined>(undefined);
   const [selectedNotes, setSelectedNotes] = React.useState<SessionNote[]>([]);
+  // Full note bodies, loaded on demand by notes_id
+  const [noteBodies, setNoteBodies] = React.useState<Record<number, string>>({});
   const [noteDates, setNoteDates] = React.useState<Date[]>([]);
+  const [displayMonth, setDisplayMonth] = React.useState<Date>(new Date());
   const [loading, setLoading] = React.useState(false);
   const [error, setError] = React.useState<string | null>(null);
   
@@ -39,10 +43,10 @@ export const NotesViewer: React.FC<NotesViewerProps> = ({ open, onOpenChange })
     session_time: ''
   });
 
-  // Fetch all dates that have notes for calendar highlighting
+  // Fetch the dates that have notes in the displayed month for calendar highlighting
   React.useEffect(() => {
     fetchNoteDates();
-  }, [user, open]);
+  }, [user, open, displayMonth]);
 
   React.useEffect(() => {
     fetchNotesForDate();
@@ -53,7 +57,8 @@ export const NotesViewer: React.FC<NotesViewerProps> = ({ open, onOpenChange })
     
     try {
       const token = localStorage.getItem('access_token');
-      const response = await fetch('http://localhost:8000/api/notes/dates/all', {
+      const month = `${displayMonth.getFullYear()}-${String(displayMonth.getMonth() + 1).padStart(2, '0')}`;
+      const response = await fetch(`http://localhost:8000/api/notes/dates?month=${month}`, {
         headers: {
           'Authorization': `Bearer ${token}`,
           'Content-Type': 'application/json',
@@ -82,7 +87,7 @@ export const NotesViewer: React.FC<NotesViewerProps> = ({ open, onOpenChange })
       const token = localStorage.getItem('access_token');
       const dateStr = selectedDate.toISOString().split('T')[0]; // Format as YYYY-MM-DD
       
-      const response = await fetch(`http://localhost:8000/api/notes/${dateStr}`, {
+      const response = await fetch(`http://localhost:8000/api/notes/${dateStr}?view=summary`, {
         headers: {
           'Authorization': `Bearer ${token}`,
           'Content-Type': 'application/json',
@@ -104,6 +109,28 @@ export const NotesViewer: React.FC<NotesViewerProps> = ({ open, onOpenChange })
     }
   };
 
+  const fetchNoteBody = async (notesId: number) => {
+    try {
+      const token = localStorage.getItem('access_token');
+      const response = await fetch(`http://localhost:8000/api/notes/${notesId}/content`, {
+        headers: {
+          'Authorization': `Bearer ${token}`,
+          'Content-Type': 'application/json',
+        },
+      });
+
+      if (response.ok) {
+        const note = await response.json();
+        setNoteBodies(prev => ({ ...prev, [notesId]: note.note_content }));
+      } else {
+        throw new Error('Failed to fetch note');
+      }
+    } catch (error) {
+      console.error('Error fetching note body:', error);
+      setError('Failed to load the full note');
+    }
+  };
+
   const createNote = async () => {
     if (!selectedDate || !formData.note_content.trim()) return;
 
@@ -255,6 +282,8 @@ export const NotesViewer: React.FC<NotesViewerProps> = ({ open, onOpenChange })
                         mode="single"
                         selected={selectedDate}
                         onSelect={setSelectedDate}
+                        month={displayMonth}
+                        onMonthChange={setDisplayMonth}
                         className="rounded-md"
                         modifiers={{ hasNotes: noteDates }}
                         modifiersClassNames={{
@@ -364,8 +393,16 @@ export const NotesViewer: React.FC<NotesViewerProps> = ({ open, onOpenChange })
                                         )}
                                       </div>
                                       <p className="text-sm text-slate-700 dark:text-slate-300 leading-relaxed mb-3">
-                                        {note.note_content}
+                                        {noteBodies[note.notes_id] ?? note.note_preview}
                                       </p>
+                                      {noteBodies[note.notes_id] === undefined && note.note_length > note.note_preview.length && (
+                                        <button
+                                          onClick={() => fetchNoteBody(note.notes_id)}
+                                          className="text-xs font-medium text-violet-600 dark:text-violet-400 hover:underline mb-3"
+                                        >
+                                          Show full note
+                                        </button>
+                                      )}
                                       <div className="flex items-center justify-between text-xs text-slate-500 dark:text-slate-400">
                                         <span>
                                           Created: {formatDate(note.created_at)}
@@ -8,6 +8,7 @@ interface AuthContextType {
   register: (userData: Partial<User> & { password: string }) => Promise<void>;
   isAuthenticated: boolean;
   fetchUserProfile: () => Promise<void>;
+  refreshAccessToken: () => Promise<string | null>;
 }
 
 const AuthContext = createContext<AuthContextType | undefined>(undefined);
@@ -71,6 +72,71 @@ export const AuthProvider: React.FC<AuthProviderProps> = ({ children }) => {
     }
   }, []); // Remove user dependency to prevent infinite loop
 
+  // Renew the access token shortly before it expires using the stored refresh token
+  const refreshTimer = React.useRef<ReturnType<typeof setTimeout> | null>(null);
+
+  const scheduleRefresh = useCallback((expiresInSeconds: number) => {
+    if (refreshTimer.current) {
+      clearTimeout(refreshTimer.current);
+    }
+    const delayMs = Math.max(expiresInSeconds - 60, 10) * 1000;
+    localStorage.setItem('access_token_expires_at', String(Date.now() + expiresInSeconds * 1000));
+    refreshTimer.current = setTimeout(() => {
+      refreshAccessToken();
+    }, delayMs);
+  }, []);
+
+  // Resolves to the new access token, or null if the session could not be renewed
+  const refreshAccessToken = useCallback(async (): Promise<string | null> => {
+    const refreshToken = localStorage.getItem('refresh_token');
+    if (!refreshToken) {
+      return null;
+    }
+
+    try {
+      const response = await fetch('http://localhost:8000/api/token/refresh', {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({ refresh_token: refreshToken }),
+      });
+
+      if (!response.ok) {
+        // Expired, revoked or reused: the user has to sign in again
+        setUser(null);
+        localStorage.removeItem('user_data');
+        localStorage.removeItem('access_token');
+        localStorage.removeItem('refresh_token');
+        localStorage.removeItem('access_token_expires_at');
+        return null;
+      }
+
+      const tokenData = await response.json();
+      localStorage.setItem('access_token', tokenData.access_token);
+      localStorage.setItem('refresh_token', tokenData.refresh_token);
+      scheduleRefresh(tokenData.expires_in);
+      return tokenData.access_token;
+    } catch (error) {
+      console.error('Failed to refresh access token:', error);
+      return null;
+    }
+  }, [scheduleRefresh]);
+
+  // Resume the refresh schedule after a page reload
+  React.useEffect(() => {
+    if (!localStorage.getItem('refresh_token')) {
+      return;
+    }
+    const expiresAt = Number(localStorage.getItem('access_token_expires_at') || 0);
+    scheduleRefresh(Math.max((expiresAt - Date.now()) / 1000, 0));
+    return () => {
+      if (refreshTimer.current) {
+        clearTimeout(refreshTimer.current);
+      }
+    };
+  }, [scheduleRefresh]);
+
   // Fetch profile data when component mounts if user exists and name is not set
   React.useEffect(() => {
     if (user && user.name === user.email) {
@@ -102,6 +168,10 @@ export const AuthProvider: React.FC<AuthProviderProps> = ({ children }) => {
       // Store JWT token and user data
       localStorage.setItem('access_token', loginData.access_token);
       localStorage.setItem('user_data', JSON.stringify(loginData.user));
+      if (loginData.refresh_token) {
+        localStorage.setItem('refresh_token', loginData.refresh_token);
+        scheduleRefresh(loginData.expires_in);
+      }
       
       // Convert backend user format to frontend User type
       const frontendUser: User = {
@@ -145,9 +215,27 @@ export const AuthProvider: React.FC<AuthProviderProps> = ({ children }) => {
   };
 
   const logout = () => {
+    const refreshToken = localStorage.getItem('refresh_token');
+    if (refreshToken) {
+      // Revoke server-side; local sign-out does not wait for it
+      const accessToken = localStorage.getItem('access_token');
+      fetch('http://localhost:8000/api/logout', {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+          ...(accessToken ? { 'Authorization': `Bearer ${accessToken}` } : {}),
+        },
+        body: JSON.stringify({ refresh_token: refreshToken }),
+      }).catch(error => console.warn('Could not revoke refresh token:', error));
+    }
+    if (refreshTimer.current) {
+      clearTimeout(refreshTimer.current);
+    }
     setUser(null);
     localStorage.removeItem('user_data');
     localStorage.removeItem('access_token');
+    localStorage.removeItem('refresh_token');
+    localStorage.removeItem('access_token_expires_at');
   };
 
   const register = async (userData: Partial<User> & { password: string }) => {
@@ -199,7 +287,7 @@ export const AuthProvider: React.FC<AuthProviderProps> = ({ children }) => {
   const isAuthenticated = !!user;
 
   return (
-    <AuthContext.Provider value={{ user, login, logout, register, isAuthenticated, fetchUserProfile }}>
+    <AuthContext.Provider value={{ user, login, logout, register, isAuthenticated, fetchUserProfile, refreshAccessToken }}>
       {children}
     </AuthContext.Provider>
   );